@@ -6,7 +6,10 @@ Production-ready AI assistant with multilingual support
 import os
 import sys
 import json
+import re
 import threading
+import concurrent.futures
+import multiprocessing
 import time
 import webbrowser
 import subprocess
@@ -27,430 +30,23 @@ if sys.platform == 'win32':
     except:
         pass
 
-# Core imports
-import speech_recognition as sr
-import pyttsx3
-from groq import Groq
-
 # GUI imports
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QPainter, QColor, QRadialGradient, QFont
 from PyQt6.QtWidgets import QApplication, QWidget
 
 # Optional imports
-try:
-    from langdetect import detect, DetectorFactory
-    DetectorFactory.seed = 0
-    LANGDETECT_AVAILABLE = True
-except:
-    LANGDETECT_AVAILABLE = False
-
-try:
-    import wikipedia
-    WIKIPEDIA_AVAILABLE = True
-except:
-    WIKIPEDIA_AVAILABLE = False
-
 try:
     import pyautogui
     SCREENSHOT_AVAILABLE = True
 except:
     SCREENSHOT_AVAILABLE = False
 
-
-# ============================================================================
-# CONFIGURATION
-# ============================================================================
-class Config:
-    """Centralized configuration"""
-    # API Keys - REPLACE THIS WITH YOUR KEY!
-    GROQ_API_KEY = "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"
-    
-    # Paths
-    BASE_DIR = Path.home() / ".edi_assistant"
-    MEMORY_FILE = BASE_DIR / "memory.json"
-    LOG_FILE = BASE_DIR / "assistant.log"
-    EMAIL_SETTINGS_FILE = BASE_DIR / "email_settings.json"
-    MESSAGES_FILE = BASE_DIR / "messages.json"
-    
-    # Speech settings
-    SPEECH_RATE = 180
-    SPEECH_VOLUME = 1.0
-    LISTEN_TIMEOUT = 6
-    PHRASE_TIME_LIMIT = 12
-    CONTINUOUS_SESSION_ENABLED = True
-    CONTINUOUS_SESSION_STOP_WORDS = [
-        "stop listening",
-        "stop session",
-        "that's all",
-        "nothing else",
-        "cancel",
-        "exit",
-        "bye",
-        "goodbye",
-        "thank you",
-        "thanks"
-    ]
-    
-    # GUI settings
-    ORB_DIAMETER = 180
-    WINDOW_WIDTH = 480
-    WINDOW_HEIGHT = 500
-    
-    # Model settings
-    GROQ_MODEL = "llama-3.3-70b-versatile"
-    
-    @classmethod
-    def ensure_dirs(cls):
-        """Create necessary directories"""
-        cls.BASE_DIR.mkdir(parents=True, exist_ok=True)
-
-
-# ============================================================================
-# UTILITIES
-# ============================================================================
-class Logger:
-    """Simple logging utility"""
-    @staticmethod
-    def log(message, level="INFO"):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_msg = f"[{timestamp}] [{level}] {message}"
-        print(log_msg)
-        try:
-            with open(Config.LOG_FILE, 'a', encoding='utf-8') as f:
-                f.write(log_msg + "\n")
-        except:
-            pass
-
-    @staticmethod
-    def error(message):
-        Logger.log(message, "ERROR")
-
-    @staticmethod
-    def info(message):
-        Logger.log(message, "INFO")
-
-
-class Memory:
-    """Persistent memory management"""
-    def __init__(self):
-        self.data = self.load()
-    
-    def load(self):
-        """Load memory from disk"""
-        try:
-            if Config.MEMORY_FILE.exists():
-                with open(Config.MEMORY_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            Logger.error(f"Failed to load memory: {e}")
-        return {}
-    
-    def save(self):
-        """Save memory to disk"""
-        try:
-            with open(Config.MEMORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            Logger.error(f"Failed to save memory: {e}")
-    
-    def get(self, key, default=None):
-        return self.data.get(key, default)
-    
-    def set(self, key, value):
-        self.data[key] = value
-        self.save()
-
-
-# ============================================================================
-# TEXT-TO-SPEECH
-# ============================================================================
-class TTSEngine:
-    """Thread-safe Text-to-Speech engine"""
-    def __init__(self):
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', Config.SPEECH_RATE)
-        self.engine.setProperty('volume', Config.SPEECH_VOLUME)
-        self._setup_voice()
-        self.lock = threading.Lock()
-        self.is_speaking = False
-    
-    def _setup_voice(self):
-        """Set up female voice if available"""
-        try:
-            voices = self.engine.getProperty('voices')
-            for voice in voices:
-                name = (voice.name or "").lower()
-                if any(k in name for k in ['female', 'zira', 'hazel']):
-                    self.engine.setProperty('voice', voice.id)
-                    Logger.info(f"Using voice: {voice.name}")
-                    return
-        except Exception as e:
-            Logger.error(f"Voice setup error: {e}")
-    
-    def speak(self, text):
-        """Speak text synchronously (main thread)"""
-        with self.lock:
-            self.is_speaking = True
-            try:
-                Logger.info(f"Speaking: {text}")
-                self.engine.say(text)
-                self.engine.runAndWait()
-            except Exception as e:
-                Logger.error(f"TTS error: {e}")
-            finally:
-                self.is_speaking = False
-    
-    def stop(self):
-        """Stop speaking"""
-        try:
-            self.engine.stop()
-        except:
-            pass
-
-
-# ============================================================================
-# SPEECH-TO-TEXT
-# ============================================================================
-class STTEngine:
-    """Speech recognition engine with error handling"""
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.recognizer.pause_threshold = 1.0
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.dynamic_energy_threshold = True
-    
-    def listen(self):
-        """Listen and return (text, language)"""
-        try:
-            with sr.Microphone() as source:
-                Logger.info("Adjusting for ambient noise...")
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                
-                Logger.info("Listening...")
-                audio = self.recognizer.listen(
-                    source,
-                    timeout=Config.LISTEN_TIMEOUT,
-                    phrase_time_limit=Config.PHRASE_TIME_LIMIT
-                )
-                
-                Logger.info("Recognizing...")
-                text = self.recognizer.recognize_google(audio)
-                Logger.info(f"Recognized: {text}")
-                
-                # Detect language
-                lang = self._detect_language(text)
-                return text.strip(), lang
-                
-        except sr.WaitTimeoutError:
-            Logger.info("No speech detected (timeout)")
-            return "", "en"
-        except sr.UnknownValueError:
-            Logger.info("Could not understand audio")
-            return "", "en"
-        except sr.RequestError as e:
-            Logger.error(f"Recognition service error: {e}")
-            return "", "en"
-        except Exception as e:
-            Logger.error(f"Unexpected STT error: {e}")
-            return "", "en"
-    
-    def _detect_language(self, text):
-        """Detect language of text"""
-        if not LANGDETECT_AVAILABLE or not text:
-            return "en"
-        
-        try:
-            detected = detect(text)
-            lang_map = {
-                'hi': 'hi',
-                'mr': 'mr',
-                'gu': 'gu',
-                'pa': 'pa',
-            }
-            return lang_map.get(detected, 'en')
-        except:
-            return "en"
-
-
-# ============================================================================
-# AI ASSISTANT CORE
-# ============================================================================
-class AIAssistant:
-    """Core AI assistant logic"""
-    def __init__(self):
-        self.groq_client = None
-        self._init_groq()
-        self.memory = Memory()
-    
-    def _init_groq(self):
-        """Initialize Groq client"""
-        try:
-            self.groq_client = Groq(api_key=Config.GROQ_API_KEY)
-            Logger.info("Groq API initialized")
-        except Exception as e:
-            Logger.error(f"Failed to initialize Groq: {e}")
-            self.groq_client = None
-    
-    def get_intent(self, text):
-        """Analyze user intent using AI"""
-        if not self.groq_client:
-            return self._fallback_intent(text)
-        
-        prompt = f"""Analyze this command and return JSON with intent and extracted info.
-Possible intents: open_app, system_command, ask_info, set_name, weather, time, date, screenshot, send_email, file_search, read_messages, music_control, email_check, unknown
-
-User command: "{text}"
-
-Return format:
-{{"intent": "intent_name", "entity": "extracted_value", "query": "original_text"}}"""
-
-        try:
-            response = self.groq_client.chat.completions.create(
-                model=Config.GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=200
-            )
-            result = json.loads(response.choices[0].message.content)
-            Logger.info(f"Intent detected: {result}")
-            return result
-        except Exception as e:
-            Logger.error(f"Intent detection error: {e}")
-            return self._fallback_intent(text)
-    
-    def _fallback_intent(self, text):
-        """Simple keyword-based intent detection"""
-        text_lower = text.lower()
-        
-        if any(k in text_lower for k in ['shutdown', 'restart', 'sleep', 'lock']):
-            return {"intent": "system_command", "query": text}
-        
-        if any(k in text_lower for k in ['open', 'start', 'launch', 'kholo']):
-            return {"intent": "open_app", "query": text}
-        
-        if any(k in text_lower for k in ['my name is', 'call me', 'mera naam']):
-            return {"intent": "set_name", "query": text}
-        
-        if any(k in text_lower for k in ['send email', 'write email', 'email bhejo']):
-            return {"intent": "send_email", "query": text}
-        
-        if any(k in text_lower for k in ['what', 'who', 'where', 'when', 'how', 'why', 'tell me']):
-            return {"intent": "ask_info", "query": text}
-        
-        if any(k in text_lower for k in ['time', 'clock', 'samay']):
-            return {"intent": "time", "query": text}
-        if any(k in text_lower for k in ['date', 'today', 'tareekh']):
-            return {"intent": "date", "query": text}
-        
-        if any(k in text_lower for k in ['weather', 'temperature', 'mausam']):
-            return {"intent": "weather", "query": text}
-        
-        if 'screenshot' in text_lower:
-            return {"intent": "screenshot", "query": text}
-        
-        if any(k in text_lower for k in ['search files', 'find file', 'locate file', 'file search']):
-            return {"intent": "file_search", "query": text}
-        
-        if any(k in text_lower for k in ['read my messages', 'read messages', 'message reader', 'check messages']):
-            return {"intent": "read_messages", "query": text}
-        
-        if any(k in text_lower for k in ['turn on music', 'play music', 'pause music', 'resume music', 'next song', 'previous song']):
-            return {"intent": "music_control", "query": text}
-        
-        if any(k in text_lower for k in ['run email check', 'check my email', 'email status', 'check emails']):
-            return {"intent": "email_check", "query": text}
-        
-        return {"intent": "ask_info", "query": text}
-    
-    def get_ai_response(self, query, lang="en"):
-        """Get AI response for information queries"""
-        if not self.groq_client:
-            return self._fallback_info(query)
-        
-        prompt = f"""Answer this question concisely in {lang} language. 
-Be helpful, accurate, and conversational. Keep response under 50 words.
-
-Question: {query}"""
-
-        try:
-            response = self.groq_client.chat.completions.create(
-                model=Config.GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=150
-            )
-            answer = response.choices[0].message.content.strip()
-            Logger.info(f"AI Response: {answer}")
-            return answer
-        except Exception as e:
-            Logger.error(f"AI response error: {e}")
-            return self._fallback_info(query)
-    
-    def compose_email_body(self, subject):
-        """Generate a short, properly formatted email body from the subject"""
-        default_body = "\n".join([
-            "Hello,",
-            "",
-            f"I'm reaching out regarding \"{subject}\" and wanted to share some context for you to review. "
-            f"This note covers the background, current status, and the next steps I'm proposing. "
-            "Please take a moment to read through the details below so we can stay aligned.",
-            "",
-            "First, here is the latest summary of events and relevant information. "
-            "I've outlined the key motivations for the change, the progress we've made, "
-            "the roadblocks that surfaced, the timelines we are targeting, "
-            "and any dependencies we should watch. "
-            "Each point reflects what we gathered in the most recent discussions.",
-            "",
-            "Second, I'd love your perspective on how we should approach the next phase. "
-            "I'm proposing that we finalize the requirements, assign owners for the remaining deliverables, "
-            "set check-in milestones, identify the support you might need, "
-            "track any risks that emerge, and capture feedback after each milestone. "
-            "Your approval on this plan would help us move forward smoothly.",
-            "",
-            "Thanks in advance for your time and guidance.",
-            f"{self.memory.get('user_name', 'Your Name')}"
-        ])
-        
-        if not self.groq_client:
-            return default_body
-        
-        prompt = f"""You are an AI email writer. Draft a formal Gmail-ready email about "{subject}" with this exact format:
-1. Proper greeting line (e.g., Hello Team,).
-2. Paragraph 1: at least 6 sentences (each on its own line) explaining the background/context in a professional tone.
-3. Blank line.
-4. Paragraph 2: at least 6 sentences (each on its own line) covering next steps, requests, or actions needed.
-5. Blank line.
-6. Closing line with a professional sign-off (e.g., Thanks, Best regards) followed by a name (no placeholders).
-
-Additional rules:
-- Each sentence must be on its own line (no bullet points).
-- Total length should be roughly 180-240 words.
-- Keep the language clear, polite, and actionable.
-- Do not include quoted subject text or placeholders like [Name]."""
-        
-        try:
-            response = self.groq_client.chat.completions.create(
-                model=Config.GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=220
-            )
-            body = response.choices[0].message.content.strip()
-            return body or default_body
-        except Exception as e:
-            Logger.error(f"AI email compose error: {e}")
-            return default_body
-    
-    def _fallback_info(self, query):
-        """Fallback to Wikipedia or web search"""
-        if WIKIPEDIA_AVAILABLE:
-            try:
-                summary = wikipedia.summary(query, sentences=2)
-                return summary
-            except:
-                pass
-        return f"I'll search for information about {query}."
+from edi_core import Config, Logger, Tracer
+from edi_storage import ConversationHistory, FileIndex, ContentIndex, walk_search
+from edi_speech import TTSEngine, STTEngine, MicrophoneStream, WakeWordDetector
+from edi_llm import AIAssistant
+from edi_tools import run_cli
 
 
 # ============================================================================
@@ -495,17 +91,17 @@ class CommandHandler:
         text_lower = text.lower()
         
         if any(k in text_lower for k in ['youtube', 'youtube kholo']):
-            self.tts.speak("Opening YouTube")
+            self.tts.speak_async("Opening YouTube")
             webbrowser.open("https://www.youtube.com")
             return True
         
         if any(k in text_lower for k in ['google', 'google kholo']):
-            self.tts.speak("Opening Google")
+            self.tts.speak_async("Opening Google")
             webbrowser.open("https://www.google.com")
             return True
         
         if any(k in text_lower for k in ['gmail', 'email']):
-            self.tts.speak("Opening Gmail in your browser.")
+            self.tts.speak_async("Opening Gmail in your browser.")
             webbrowser.open("https://mail.google.com/mail/u/0/#inbox")
             return True
         
@@ -519,7 +115,7 @@ class CommandHandler:
         for app_name, app_path in apps.items():
             if app_name in text_lower:
                 if os.path.exists(app_path):
-                    self.tts.speak(f"Opening {app_name}")
+                    self.tts.speak_async(f"Opening {app_name}")
                     subprocess.Popen(app_path)
                     return True
         
@@ -603,7 +199,7 @@ class CommandHandler:
         text_lower = text.lower()
         
         if any(k in text_lower for k in ['turn on music', 'play music', 'start music', 'music on']):
-            self.tts.speak("Turning on music in your browser.")
+            self.tts.speak_async("Turning on music in your browser.")
             webbrowser.open("https://music.youtube.com/")
             return True
         
@@ -675,15 +271,126 @@ class AssistantController:
         self.ai = AIAssistant()
         self.handler = CommandHandler(self.ai, self.tts)
         self._stop_keywords = [kw.lower() for kw in Config.CONTINUOUS_SESSION_STOP_WORDS]
+        if isinstance(self.stt.mic, MicrophoneStream):
+            # Also keeps the tail of a spoken prompt out of the next pre-roll
+            self.stt.mic.speech_active = lambda: self.tts.is_speaking
+            if Config.VOICE_BARGE_IN:
+                self.stt.mic.voice_listeners.append(self.tts.barge_in)
+        self.wake_word = self._init_wake_word()
+        self._prefetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="intent-prefetch")
+        self._draft_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-draft")
+        self.status_listeners = []
+        self._last_preview = 0.0
+        self._prefetched = {}
+        self._prefetch_timer = None
+        self._prefetch_lock = threading.Lock()
+        if Config.PREFETCH_INTENT_ON_PARTIAL and self.stt.backend.streaming:
+            self.stt.partial_listeners.append(self._prefetch_intent)
+        self.file_index = None
+        self.content_index = None
+        if Config.FILE_INDEX_ENABLED:
+            try:
+                self.file_index = FileIndex()
+                if Config.CONTENT_INDEX_ENABLED:
+                    self.content_index = ContentIndex()
+                    self.file_index.refresh_listeners.append(self._refresh_content_index)
+                self.file_index.start()
+            except Exception as e:
+                Logger.error(f"File index disabled: {e}")
+        self.history = None
+        self._turn_speech = None
+        if Config.HISTORY_ENABLED:
+            try:
+                self.history = ConversationHistory()
+                self.tts.on_speak = self._capture_speech
+            except Exception as e:
+                Logger.error(f"Conversation history disabled: {e}")
         Logger.info("Assistant initialized")
     
-    def _prompt_for_input(self, prompt_text, max_retries=2):
+    def _init_wake_word(self):
+        """Start the wake-word detector when templates and a live mic exist"""
+        if not Config.WAKE_WORD_ENABLED or not isinstance(self.stt.mic, MicrophoneStream):
+            return None
+        templates = WakeWordDetector.load_templates()
+        if not templates:
+            Logger.info("No wake word enrolled; tap the orb to start")
+            return None
+        detector = WakeWordDetector(templates, self.stt.mic.sample_rate, self.stt.mic.chunk_seconds)
+        detector.enabled = lambda: not self.tts.is_speaking
+        detector.start(self.stt.mic)
+        Logger.info(f"Wake word detector running with {len(templates)} templates")
+        return detector
+    
+    @staticmethod
+    def _normalize_utterance(text):
+        return " ".join(re.findall(r"\w+", (text or "").lower()))
+    
+    def _prefetch_intent(self, partial):
+        """Schedule intent detection for a partial transcript once it stops changing
+        
+        Every change restarts the timer, so only a partial that stands for
+        PREFETCH_STABLE_SECONDS (usually the end of the utterance) reaches
+        the LLM instead of each word as it is recognized.
+        """
+        key = self._normalize_utterance(partial)
+        with self._prefetch_lock:
+            if self._prefetch_timer is not None:
+                self._prefetch_timer.cancel()
+                self._prefetch_timer = None
+            if len(key.split()) < 2 or key in self._prefetched:
+                return
+            timer = threading.Timer(Config.PREFETCH_STABLE_SECONDS, self._start_prefetch,
+                                    (partial, key, Tracer.current()))
+            timer.daemon = True
+            self._prefetch_timer = timer
+            timer.start()
+    
+    def _start_prefetch(self, partial, key, trace):
+        with self._prefetch_lock:
+            if self._prefetch_timer is not threading.current_thread():
+                return
+            self._prefetch_timer = None
+            # One request in flight at a time
+            if any(not future.done() for future in self._prefetched.values()):
+                return
+            
+            def detect():
+                with Tracer.activate(trace):
+                    return self.ai.get_intent(partial, self.stt.language.detect(partial), prefetch=True)
+            
+            self._prefetched = {key: self._prefetch_pool.submit(detect)}
+    
+    def _detect_intent(self, text, lang="en", with_answer=None):
+        """Use a prefetched intent when the final transcript matches it"""
+        with self._prefetch_lock:
+            if self._prefetch_timer is not None:
+                self._prefetch_timer.cancel()
+                self._prefetch_timer = None
+            prefetched, self._prefetched = self._prefetched, {}
+        future = prefetched.get(self._normalize_utterance(text))
+        if future is not None:
+            try:
+                intent_data = future.result(timeout=Config.LISTEN_TIMEOUT)
+                # None: the prefetch could not ask the LLM, so the final transcript does
+                if intent_data is not None:
+                    Tracer.annotate(intent_prefetched=True)
+                    return dict(intent_data, query=text)
+            except Exception as e:
+                Logger.error(f"Prefetched intent failed: {e}")
+        return self.ai.get_intent(text, lang, with_answer)
+    
+    def _capture_speech(self, text):
+        """Collect what was spoken during a turn for the history record"""
+        if self._turn_speech is not None:
+            self._turn_speech.append(text)
+    
+    def _prompt_for_input(self, prompt_text, max_retries=2, mode="dictation"):
         """Speak a prompt and capture voice input with retry logic"""
         for attempt in range(max_retries + 1):
             self.tts.speak(prompt_text)
-            time.sleep(0.8)  # Give more time for TTS to finish
+            time.sleep(Config.PROMPT_SETTLE_SECONDS)
             Logger.info(f"Listening for input (attempt {attempt + 1})...")
-            text, _ = self.stt.listen()
+            text, _ = self.stt.listen(mode=mode)
             text = text.strip()
             if text:
                 Logger.info(f"Captured input: {text}")
@@ -691,14 +398,12 @@ class AssistantController:
             else:
                 if attempt < max_retries:
                     self.tts.speak("I didn't catch that. Please repeat.")
-                    time.sleep(0.5)
         return ""
     
     def _handle_send_email(self):
         """Voice-guided Gmail compose that auto-writes body from AI"""
         Logger.info("Starting AI email composition flow")
         self.tts.speak("Sure. Tell me the subject for your email.")
-        time.sleep(0.4)
         
         # Only capture subject; user will enter recipient later in Gmail
         subject = self._prompt_for_input("What should be the subject of the email?")
@@ -707,30 +412,66 @@ class AssistantController:
             Logger.error("Failed to get email subject")
             return
         
+        captured = time.perf_counter()
         Logger.info(f"Email subject: {subject}")
-        self.tts.speak(f"Subject is {subject}.")
-        self.tts.speak("Great. Let me draft the email for you.")
-        body = self.ai.compose_email_body(subject)
-        Logger.info("Generated AI email body.")
         
-        # Build Gmail compose URL (recipient left blank for user to fill)
-        params = {
-            "view": "cm",
-            "fs": "1",
-            "su": subject,
-            "body": body
-        }
-        query = urllib.parse.urlencode(params, doseq=True, quote_via=urllib.parse.quote)
-        compose_url = f"https://mail.google.com/mail/?{query}"
+        # Draft in the background while the confirmations are spoken
+        on_partial = self._preview_draft if Config.EMAIL_DRAFT_PREVIEW and self.status_listeners else None
+        trace = Tracer.current()
+        
+        def draft():
+            with Tracer.activate(trace):
+                return self.ai.compose_email_body(subject, on_partial)
+        
+        future = self._draft_pool.submit(draft)
+        self.tts.speak_async(f"Subject is {subject}.")
+        confirmation = self.tts.speak_async("Great. Let me draft the email for you.")
+        body = future.result()
+        Logger.info("Generated AI email body.")
+        compose_url = self._gmail_compose_url(subject, body)
         
         # Open in default browser
         try:
             webbrowser.open(compose_url)
-            Logger.info(f"Opened Gmail compose URL: {compose_url}")
+            elapsed_ms = (time.perf_counter() - captured) * 1000
+            Tracer.record_metric("email.subject_to_browser", elapsed_ms)
+            Logger.info(f"Opened Gmail compose URL {elapsed_ms:.0f} ms after the subject: {compose_url}")
+            confirmation.wait()
             self.tts.speak("All set. I've opened Gmail with your subject and a drafted email. Just enter the recipient and hit send when you're ready.")
         except Exception as e:
             Logger.error(f"Failed to open Gmail: {e}")
+            confirmation.wait()
             self.tts.speak("I drafted your email but couldn't open Gmail automatically. Please try again.")
+        finally:
+            self._notify_status(None)
+    
+    @staticmethod
+    def _gmail_compose_url(subject, body):
+        """Build the Gmail compose URL (recipient left blank for user to fill)"""
+        params = {
+            "view": "cm",
+            "fs": "1",
+            "su": subject,
+            "body": body
+        }
+        query = urllib.parse.urlencode(params, doseq=True, quote_via=urllib.parse.quote)
+        return f"https://mail.google.com/mail/?{query}"
+    
+    def _notify_status(self, text):
+        """Tell the GUI what to show; None restores its default"""
+        for listener in self.status_listeners:
+            try:
+                listener(text)
+            except Exception as e:
+                Logger.error(f"Status listener error: {e}")
+    
+    def _preview_draft(self, text):
+        now = time.perf_counter()
+        if now - self._last_preview < 0.2:
+            return
+        self._last_preview = now
+        tail = " ".join(text.split())[-60:]
+        self._notify_status(f"Drafting: ...{tail}")
     
     def _handle_file_search(self, text):
         """Search common directories for files matching a keyword"""
@@ -741,47 +482,75 @@ class AssistantController:
             if match:
                 term = match.group(1).strip()
         if not term:
-            term = self._prompt_for_input("What file name should I search for? You can say part of the name.")
+            term = self._prompt_for_input("What file name should I search for? You can say part of the name.", mode="command")
         if not term:
             self.tts.speak("I couldn't get a file name. Cancelling search.")
             return
         
-        self.tts.speak(f"Searching for files containing {term}.")
+        searching = self.tts.speak_async(f"Searching for files containing {term}.")
         matches = self._search_directories(term.lower())
+        searching.wait()
         if not matches:
-            self.tts.speak(f"I couldn't find any files matching {term} on your Desktop, Documents, or Downloads.")
+            roots = self.file_index.roots if self.file_index else FileIndex.default_roots()
+            names = [root.name for root in roots]
+            places = names[0] if len(names) == 1 else ", ".join(names[:-1]) + f", or {names[-1]}"
+            self.tts.speak(f"I couldn't find any files matching {term} in {places}.")
             return
         
         max_report = min(len(matches), 3)
-        self.tts.speak(f"I found {len(matches)} matching files. Here are the first {max_report}.")
+        self.tts.speak(f"I found {len(matches)} matching files. Here are the best {max_report}.")
         for idx, path in enumerate(matches[:max_report], start=1):
-            self.tts.speak(f"{idx}. {path.name} in {path.parent.name}.")
+            if not self.tts.speak(f"{idx}. {path.name} in {path.parent.name}."):
+                return
         if len(matches) > max_report:
             self.tts.speak("Ask me to search again if you'd like me to open one of them.")
     
+    def _refresh_content_index(self):
+        """Re-read documents that changed since the last file index sweep"""
+        started = time.perf_counter()
+        stats = self.content_index.refresh(self.file_index.paths(Config.CONTENT_INDEX_EXTENSIONS))
+        if stats["indexed"] or stats["removed"]:
+            Logger.info(
+                f"Content index: {stats['indexed']} documents read ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+                f"{stats['removed']} removed in {time.perf_counter() - started:.1f}s"
+            )
+    
+    def _handle_content_search(self, text):
+        """Find documents whose text mentions what the user asked about"""
+        if self.content_index is None:
+            self.tts.speak("Searching inside documents is turned off.")
+            return
+        if not ContentIndex.query_terms(text):
+            text = self._prompt_for_input("What should the document mention?", mode="command")
+            if not text or not ContentIndex.query_terms(text):
+                self.tts.speak("I couldn't get what to look for. Cancelling search.")
+                return
+        topic = " ".join(ContentIndex.query_terms(text))
+        
+        hits = self.content_index.search(text)
+        if not hits:
+            if not self.content_index.ready:
+                self.tts.speak("I'm still reading your documents. Please ask me again in a minute.")
+            else:
+                self.tts.speak(f"I couldn't find a document that mentions {topic}.")
+            return
+        
+        path, snippet = hits[0]
+        if not self.tts.speak(f"The best match is {path.name} in {path.parent.name}. It says: {snippet}"):
+            return
+        if len(hits) > 1:
+            others = " and ".join(p.name for p, _ in hits[1:])
+            self.tts.speak(f"{others} also mention {topic}.")
+    
     def _search_directories(self, term, max_results=5):
-        """Search desktop, documents, and downloads for matches"""
-        search_dirs = [
-            Path.home() / "Desktop",
-            Path.home() / "Documents",
-            Path.home() / "Downloads",
-        ]
-        matches = []
-        for base in search_dirs:
-            if not base.exists():
-                continue
+        """Search the indexed folders for matches, ranked by relevance"""
+        if self.file_index is not None and self.file_index.ready:
             try:
-                for root, _, files in os.walk(base):
-                    for filename in files:
-                        if term in filename.lower():
-                            matches.append(Path(root) / filename)
-                            if len(matches) >= max_results:
-                                return matches
-                    if len(matches) >= max_results:
-                        break
+                return self.file_index.search(term, max_results)
             except Exception as e:
-                Logger.error(f"File search error in {base}: {e}")
-        return matches
+                Logger.error(f"File index search failed: {e}")
+        roots = self.file_index.roots if self.file_index else FileIndex.default_roots()
+        return walk_search(roots, term, max_results)
     
     def _handle_read_messages(self):
         """Read stored messages aloud"""
@@ -797,9 +566,11 @@ class AssistantController:
             timestamp = message.get("time", "")
             body = message.get("text", "")
             if timestamp:
-                self.tts.speak(f"From {sender} at {timestamp}. {body}")
+                spoken = self.tts.speak(f"From {sender} at {timestamp}. {body}")
             else:
-                self.tts.speak(f"From {sender}. {body}")
+                spoken = self.tts.speak(f"From {sender}. {body}")
+            if not spoken:
+                break
     
     def _load_messages(self):
         """Load messages from disk"""
@@ -853,7 +624,8 @@ class AssistantController:
                     msg = email.message_from_bytes(raw_email)
                     subject = self._decode_header_value(msg.get("Subject", "No subject"))
                     sender_name = parseaddr(msg.get("From", "Unknown"))[0] or "Unknown sender"
-                    self.tts.speak(f"From {sender_name}. Subject: {subject}.")
+                    if not self.tts.speak(f"From {sender_name}. Subject: {subject}."):
+                        break
             imap.close()
             imap.logout()
         except Exception as e:
@@ -889,12 +661,43 @@ class AssistantController:
                 decoded_segments.append(segment)
         return " ".join(decoded_segments).strip()
     
+    def _handle_recall_history(self, text):
+        """Answer questions about earlier turns from the history index"""
+        if not self.history:
+            self.tts.speak("Conversation history is turned off.")
+            return
+        
+        label, start_ts, end_ts, topic = ConversationHistory.parse_recall(text)
+        self.history.flush(timeout=0.5)
+        exclude = ("recall_history",)
+        if topic:
+            rows = self.history.search(topic, start_ts, end_ts, Config.HISTORY_RECALL_LIMIT, exclude)
+        else:
+            rows = self.history.recent(start_ts, end_ts, Config.HISTORY_RECALL_LIMIT, exclude)
+        
+        if not rows:
+            about = f" about {topic}" if topic else ""
+            self.tts.speak(f"I don't have anything you asked{about} {label}.")
+            return
+        
+        self.tts.speak(f"Here is what you asked {label}, most recent first.")
+        for row in rows:
+            when = datetime.fromtimestamp(row["ts"]).strftime("%A at %I:%M %p")
+            if not self.tts.speak(f"On {when}, you asked: {row['text']}."):
+                break
+    
     def start_voice_session(self, initial_text, initial_lang):
         """Process first command and optionally stay in continuous voice mode"""
         if not Config.CONTINUOUS_SESSION_ENABLED:
             self.process_command(initial_text, initial_lang)
+            self.ai.end_conversation()
             return
-        self._run_continuous_session(initial_text, initial_lang)
+        self.ai.start_keepalive()
+        try:
+            self._run_continuous_session(initial_text, initial_lang)
+        finally:
+            self.ai.stop_keepalive()
+            self.ai.end_conversation()
     
     def _run_continuous_session(self, initial_text, initial_lang):
         """Keep listening for follow-up commands until user says stop"""
@@ -914,15 +717,19 @@ class AssistantController:
                 first_turn = False
             else:
                 prompt = "I'm still listening. Say stop if you're done."
+            # The next turn starts with the prompt and the listen that follows it
+            Tracer.begin_turn(source="session")
             self.tts.speak(prompt)
-            time.sleep(0.4)
+            time.sleep(Config.PROMPT_SETTLE_SECONDS)
             
             text, lang = self.stt.listen()
             text = text.strip()
             if not text:
+                Tracer.end_turn(intent="none")
                 self.tts.speak("Okay, ending voice session. Tap the orb again when you need me.")
                 break
             if self._is_stop_command(text):
+                Tracer.end_turn(intent="stop")
                 self.tts.speak("All set. Just tap the orb when you need me again.")
                 break
     
@@ -940,15 +747,53 @@ class AssistantController:
     
     def process_command(self, text, lang="en"):
         """Process user command"""
+        self._turn_speech = []
+        started = time.time()
+        with Tracer.turn(source="command", lang=lang) as trace:
+            intent_data = self._process_command(text, lang)
+        spoken, self._turn_speech = self._turn_speech, None
+        
+        if self.history and intent_data:
+            timings = dict(trace.stage_ms) if trace else {}
+            timings["total"] = round((time.time() - started) * 1000, 3)
+            self.history.record(
+                text, lang,
+                intent=intent_data.get("intent", "unknown"),
+                entity=intent_data.get("entity"),
+                answer=" ".join(spoken),
+                timings=timings,
+                ts=started
+            )
+    
+    def _process_command(self, text, lang):
         if not text:
             self.tts.speak("I didn't hear anything. Please try again.")
-            return
+            return None
         
         Logger.info(f"Processing: {text} (lang: {lang})")
         
-        intent_data = self.ai.get_intent(text)
+        speculation = None
+        if Config.SPECULATIVE_ANSWER and self.ai.needs_llm_intent(text):
+            speculation = self.ai.speculate_answer(text, lang)
+        
+        intent_data = self._detect_intent(text, lang, with_answer=False if speculation else None)
         intent = intent_data.get("intent", "unknown")
+        Tracer.annotate(intent=intent)
         
+        if speculation is not None:
+            if intent in AIAssistant.ANSWER_INTENTS and not intent_data.get("answer"):
+                saved_ms = speculation.use()
+                Logger.info(f"Using speculative answer, started {saved_ms:.0f} ms early")
+            else:
+                speculation.discard()
+                speculation = None
+        
+        with Tracer.span("handler", intent=intent):
+            self._dispatch(intent, text, lang, intent_data.get("answer"), speculation)
+        return intent_data
+    
+    def _dispatch(self, intent, text, lang, answer=None, speculation=None):
+        """Route a detected intent to its handler"""
         if intent == "system_command":
             self.handler.handle_system_command(text)
         
@@ -977,6 +822,9 @@ class AssistantController:
         elif intent == "file_search":
             self._handle_file_search(text)
         
+        elif intent == "content_search":
+            self._handle_content_search(text)
+        
         elif intent == "read_messages":
             self._handle_read_messages()
         
@@ -986,13 +834,54 @@ class AssistantController:
         elif intent == "email_check":
             self._handle_email_check()
         
+        elif intent == "recall_history":
+            self._handle_recall_history(text)
+        
         elif intent == "ask_info":
-            answer = self.ai.get_ai_response(text, lang)
-            self.tts.speak(answer)
+            self._speak_answer(text, lang, answer, speculation)
         
         else:
-            answer = self.ai.get_ai_response(text, lang)
+            self._speak_answer(text, lang, answer, speculation)
+    
+    def _speak_answer(self, text, lang, answer=None, speculation=None):
+        """Speak an AI answer, streaming it sentence by sentence when enabled"""
+        started = time.perf_counter()
+        if answer:
+            # Already returned with the intent, so no second request is needed
+            Tracer.count("round_trips_saved")
+            Logger.info(f"AI Response (combined): {answer}")
+            self.tts.speak(answer)
+            self.ai.remember_turn(text, answer)
+            return
+        
+        if not Config.STREAM_ANSWERS:
+            if speculation is not None:
+                answer = " ".join(speculation)
+            else:
+                answer = self.ai.get_ai_response(text, lang)
+            Tracer.record_metric("answer.ttfa", (time.perf_counter() - started) * 1000, mode="blocking")
             self.tts.speak(answer)
+            self.ai.remember_turn(text, answer)
+            return
+        
+        handle = None
+        spoken = []
+        sentences = speculation if speculation is not None else self.ai.stream_ai_response(text, lang)
+        for sentence in sentences:
+            if handle is None:
+                ttfa_ms = (time.perf_counter() - started) * 1000
+                Tracer.record_metric("answer.ttfa", ttfa_ms, mode="speculative" if speculation else "streaming")
+                Logger.info(f"Time to first audio: {ttfa_ms:.0f} ms")
+            elif handle.cancelled:
+                if speculation is not None:
+                    speculation.cancel.set()
+                break
+            # Queue without waiting so later sentences keep generating meanwhile
+            handle = self.tts.speak_async(sentence)
+            spoken.append(sentence)
+        if handle is not None:
+            handle.wait()
+        self.ai.remember_turn(text, " ".join(spoken))
 
 
 # ============================================================================
@@ -1002,6 +891,7 @@ class OrbSignals(QObject):
     """Signals for thread-safe GUI updates"""
     status_changed = pyqtSignal(str)
     listening_changed = pyqtSignal(bool)
+    wake_word_detected = pyqtSignal()
 
 
 class OrbGUI(QWidget):
@@ -1014,6 +904,7 @@ class OrbGUI(QWidget):
         self.phase = 0.0
         self.pulse = 0.0
         self.is_listening = False
+        self._interaction_active = False
         self.status = "Tap the orb to speak"
         
         self._setup_window()
@@ -1021,6 +912,10 @@ class OrbGUI(QWidget):
         
         self.signals.status_changed.connect(self._update_status)
         self.signals.listening_changed.connect(self._update_listening)
+        self.signals.wake_word_detected.connect(lambda: self._start_interaction("wake_word"))
+        if controller.wake_word is not None:
+            controller.wake_word.listeners.append(self.signals.wake_word_detected.emit)
+        controller.status_listeners.append(lambda text: self.signals.status_changed.emit(text or "Processing..."))
         
         Logger.info("GUI initialized")
     
@@ -1072,8 +967,19 @@ class OrbGUI(QWidget):
         distance_sq = (x - cx) ** 2 + (y - cy) ** 2
         radius_sq = (Config.ORB_DIAMETER / 2.0) ** 2
         
-        if distance_sq <= radius_sq and not self.is_listening:
-            threading.Thread(target=self._voice_interaction, daemon=True).start()
+        if distance_sq > radius_sq:
+            return
+        if self.controller.tts.is_speaking:
+            # Tapping while E.D.I is talking interrupts it
+            self.controller.tts.barge_in()
+        self._start_interaction("orb")
+    
+    def _start_interaction(self, source):
+        """Begin a voice session from a tap or the wake word (GUI thread)"""
+        if self._interaction_active or self.is_listening:
+            return
+        self._interaction_active = True
+        threading.Thread(target=self._voice_interaction, args=(source,), daemon=True).start()
     
     def paintEvent(self, event):
         """Draw the orb"""
@@ -1120,18 +1026,20 @@ class OrbGUI(QWidget):
         
         painter.end()
     
-    def _voice_interaction(self):
+    def _voice_interaction(self, source="orb"):
         """Handle voice interaction"""
         try:
             self.signals.listening_changed.emit(True)
             self.signals.status_changed.emit("Listening...")
             
+            Tracer.begin_turn(source=source)
             self.controller.tts.speak("Yes?")
-            time.sleep(0.5)
+            time.sleep(Config.PROMPT_SETTLE_SECONDS)
             
             text, lang = self.controller.stt.listen()
             
             if not text:
+                Tracer.end_turn(intent="none")
                 self.controller.tts.speak("I didn't catch that. Please try again.")
                 self.signals.status_changed.emit("Tap the orb to speak")
                 self.signals.listening_changed.emit(False)
@@ -1145,6 +1053,7 @@ class OrbGUI(QWidget):
             self.controller.tts.speak("Sorry, something went wrong.")
         
         finally:
+            self._interaction_active = False
             self.signals.status_changed.emit("Tap the orb to speak")
             self.signals.listening_changed.emit(False)
 
@@ -1154,6 +1063,9 @@ class OrbGUI(QWidget):
 # ============================================================================
 def main():
     """Main entry point"""
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
+        sys.exit(run_cli(sys.argv[1:]))
+    
     Logger.info("Starting E.D.I Voice Assistant")
     
     app = QApplication(sys.argv)
@@ -1163,11 +1075,27 @@ def main():
     gui = OrbGUI(controller)
     gui.show()
     
-    controller.tts.speak("Hello, I'm E.D.I. Tap the orb once to start and keep talking until you say stop.")
+    if Config.GROQ_PRECONNECT:
+        # Connection setup overlaps the greeting instead of the first command
+        threading.Thread(target=controller.ai.warm_up, name="llm-preconnect", daemon=True).start()
+    controller.tts.speak(Config.STARTUP_GREETING)
+    # Fill the phrase cache while the assistant sits idle after the greeting
+    threading.Thread(target=controller.tts.prerender, name="tts-prerender", daemon=True).start()
     
     Logger.info("Application started successfully")
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    controller.tts.close()
+    controller.ai.close()
+    if controller.file_index is not None:
+        controller.file_index.stop()
+    if controller.wake_word is not None:
+        controller.wake_word.stop()
+    controller.stt.close()
+    Logger.shutdown()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
+    # Content-index workers are spawned processes on Windows; frozen builds need this first
+    multiprocessing.freeze_support()
     main()
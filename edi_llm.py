@@ -0,0 +1,1234 @@
+"""
+E.D.I - Language understanding: local intent classifier, resilient LLM access and the AI assistant core
+"""
+
+import json
+import re
+import ssl
+import queue
+import threading
+import concurrent.futures
+import time
+from contextlib import contextmanager
+from collections import deque
+
+# Core imports
+from groq import Groq
+
+# Optional imports
+try:
+    import wikipedia
+    WIKIPEDIA_AVAILABLE = True
+except:
+    WIKIPEDIA_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except:
+    HTTPX_AVAILABLE = False
+
+from edi_core import Config, Logger, Memory, Tracer, percentile
+from edi_storage import NUMPY_AVAILABLE, ResponseCache, SemanticCache, KnowledgeIndex
+
+
+# ============================================================================
+# INTENT CLASSIFIER
+# ============================================================================
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every phrase in a single pass"""
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for phrase, value in phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append((len(phrase), value))
+        
+        # Depth-one states keep the root as their failure link
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in self.goto[state].items():
+                pending.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+    
+    def find(self, text):
+        """Yield (start, end, value) for every phrase occurrence"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in output[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class IntentClassifier:
+    """Local intent scoring over one compiled keyword automaton
+    
+    Phrases are matched on word boundaries, matches nested inside a longer
+    match are dropped, and the remaining weights are summed per intent.
+    Confidence reflects both the winning score and its margin over the
+    runner-up, so a lone weak keyword defers to the LLM. Commands that act
+    on the machine only score on whole command phrases ("restart my pc"),
+    never on a bare "sleep" or "lock".
+    """
+    # Side effects the user cannot undo: the LLM confirms these whenever it can be asked
+    GUARDED_INTENTS = {"system_command"}
+    KEYWORDS = {
+        "system_command": [
+            ("shutdown", 0.5), ("restart", 0.5), ("reboot", 0.5), ("sleep", 0.2), ("lock", 0.2),
+            ("shutdown the computer", 4), ("shut down the computer", 4), ("shutdown my pc", 4),
+            ("shut down my pc", 4), ("shutdown the pc", 4), ("shutdown the system", 4),
+            ("restart the computer", 4), ("restart my pc", 4), ("restart the pc", 4), ("restart the system", 4),
+            ("reboot the computer", 4), ("reboot my pc", 4), ("reboot the pc", 4), ("reboot the system", 4),
+            ("computer to sleep", 4), ("pc to sleep", 4), ("system to sleep", 4),
+            ("lock the computer", 4), ("lock my pc", 4), ("lock the pc", 4), ("lock screen", 4),
+            ("lock the screen", 4), ("computer band kar", 4), ("pc band kar", 4), ("system band kar", 4),
+        ],
+        "open_app": [
+            ("open", 2.5), ("launch", 3), ("start", 1.2), ("kholo", 3), ("khol do", 3),
+            ("youtube", 1), ("google", 1), ("gmail", 1), ("notepad", 1), ("calculator", 1),
+            ("paint", 1), ("chrome", 1),
+        ],
+        "set_name": [
+            ("my name is", 4), ("call me", 3.5), ("mera naam", 4), ("naam hai", 1.5),
+        ],
+        "send_email": [
+            ("send email", 4), ("send an email", 4), ("write email", 4), ("write an email", 4),
+            ("compose email", 4), ("compose an email", 4), ("draft an email", 4), ("email bhejo", 4),
+            ("mail bhejo", 4), ("email to", 1.5),
+        ],
+        "recall_history": [
+            ("what did i ask", 5), ("did i ask", 4), ("what did we talk", 5), ("what was i asking", 5),
+            ("maine kya pucha", 5), ("what did i say", 4.5), ("earlier i asked", 4),
+            ("last time i asked", 4.5),
+        ],
+        "ask_info": [
+            ("what", 0.5), ("who", 1), ("where", 0.8), ("when", 0.5), ("how", 0.5), ("why", 1),
+            ("tell me", 0.8), ("tell me about", 2), ("who is", 2.5), ("what is", 1.2), ("explain", 2.5),
+            ("define", 2.5), ("meaning of", 2.5), ("kaun hai", 2.5), ("kya hai", 1.2), ("batao", 0.5),
+            # When something happens is a question, not a clock lookup
+            ("what time does", 4), ("what time do", 4), ("what time will", 4), ("what time is the", 4),
+        ],
+        "time": [
+            ("time", 1), ("what time", 3), ("the time", 2.5), ("what is the time", 4), ("clock", 2), ("samay", 2.5),
+            ("kitne baje", 3.5), ("time kya hai", 3),
+        ],
+        "date": [
+            ("date", 2.5), ("today's date", 3.5), ("what day is it", 3.5), ("which day", 2.5),
+            ("tareekh", 3), ("aaj kya din", 3.5), ("today", 1),
+        ],
+        "weather": [
+            ("weather", 3.5), ("temperature", 3), ("mausam", 3.5), ("forecast", 3), ("raining", 2.5),
+            ("rain today", 3), ("how hot", 2.5), ("how cold", 2.5),
+        ],
+        "screenshot": [
+            ("screenshot", 4), ("screen shot", 4), ("capture the screen", 4), ("capture screen", 4),
+        ],
+        "file_search": [
+            ("search files", 4), ("search for file", 4), ("find file", 4), ("find the file", 4),
+            ("find my file", 4), ("locate file", 4), ("file search", 4), ("where is the file", 4),
+            ("file dhundo", 4),
+        ],
+        "content_search": [
+            ("that mentions", 5), ("that mention", 5), ("mentions", 3), ("mentioning", 3.5),
+            ("talks about", 3), ("contains the word", 5), ("containing the word", 5), ("search inside", 4.5),
+            ("inside my files", 4.5), ("inside my documents", 4.5), ("which document", 3), ("which file", 3),
+            ("document that", 2.5), ("documents that", 2.5),
+        ],
+        "read_messages": [
+            ("read my messages", 4.5), ("read messages", 4.5), ("message reader", 4),
+            ("check messages", 4), ("check my messages", 4.5), ("any new messages", 4),
+        ],
+        "music_control": [
+            ("turn on music", 4), ("play music", 4), ("start music", 4), ("music on", 4),
+            ("pause music", 4), ("stop music", 4), ("music pause", 4), ("resume music", 4),
+            ("continue music", 4), ("next song", 4), ("next track", 4), ("previous song", 4),
+            ("previous track", 4), ("back song", 4), ("music", 1),
+        ],
+        "email_check": [
+            ("run email check", 4.5), ("check my email", 4.5), ("check my emails", 4.5),
+            ("email status", 4), ("check emails", 4.5), ("check email", 4.5), ("new emails", 3.5),
+            ("unread emails", 4),
+        ],
+    }
+    
+    def __init__(self, keywords=None):
+        keywords = keywords or self.KEYWORDS
+        self.automaton = KeywordAutomaton(
+            (f" {phrase} ", (intent, weight))
+            for intent, phrases in keywords.items()
+            for phrase, weight in phrases
+        )
+    
+    @staticmethod
+    def normalize(text):
+        return " " + " ".join(re.findall(r"[\w']+", (text or "").lower())) + " "
+    
+    def scores(self, text):
+        """Sum the weights of outermost phrase matches per intent"""
+        matches = sorted(self.automaton.find(self.normalize(text)), key=lambda m: (m[0], m[0] - m[1]))
+        totals = {}
+        covered_end = 0
+        for start, end, (intent, weight) in matches:
+            if end <= covered_end:
+                continue
+            covered_end = end
+            totals[intent] = totals.get(intent, 0.0) + weight
+        return totals
+    
+    def classify(self, text):
+        """Return intent data with a confidence between 0 and 1"""
+        totals = self.scores(text)
+        if not totals:
+            return {"intent": "ask_info", "query": text, "confidence": 0.0}
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = (best - runner_up) / (best + 1.0)
+        return {"intent": intent, "query": text, "confidence": round(confidence, 3)}
+
+
+# ============================================================================
+# LLM RESILIENCE
+# ============================================================================
+class LLMUnavailable(Exception):
+    """Raised instead of calling the LLM when it is known to be unhealthy"""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, timeout=0.0, reserve=0):
+        """Take one token, waiting up to timeout seconds; False if none came
+        
+        With a reserve the token is only taken while that many more stay in
+        the bucket, so optional work never starves the calls that follow it.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return True
+                wait = (1 + reserve - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial after a cool-down"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, failure_threshold, reset_after):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.opened_until:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+    
+    def release(self):
+        """Give back a half-open trial that was never sent"""
+        with self.lock:
+            self.trial_in_flight = False
+    
+    def record_success(self):
+        with self.lock:
+            if self.state != self.CLOSED:
+                Logger.info("LLM circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+    
+    def record_failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold or retry_after:
+                self.state = self.OPEN
+                self.opened_until = time.monotonic() + max(self.reset_after, retry_after or 0)
+                self.trial_in_flight = False
+                Logger.error(f"LLM circuit open for {self.opened_until - time.monotonic():.0f}s")
+
+
+class DeadlineStream:
+    """A streamed completion cut off once its call's total deadline passes
+    
+    The client timeout only bounds each read, so a server dripping tokens
+    could hold a stream open far past the deadline. A timer closes the
+    response at the deadline and iteration then raises TimeoutError.
+    """
+    def __init__(self, stream, deadline, on_timeout=None):
+        self.stream = stream
+        self.deadline = deadline
+        self.on_timeout = on_timeout
+        self.expired = False
+        self._timer = threading.Timer(max(0.0, deadline), self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _expire(self):
+        self.expired = True
+        self.close()
+    
+    def close(self):
+        self._timer.cancel()
+        if hasattr(self.stream, "close"):
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+    
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                if self.expired:
+                    break
+                yield chunk
+        except Exception:
+            # Closing the response under a blocked read surfaces as a transport error
+            if not self.expired:
+                raise
+        finally:
+            self._timer.cancel()
+        if self.expired:
+            if self.on_timeout is not None:
+                self.on_timeout()
+            raise TimeoutError(f"LLM stream exceeded its {self.deadline:.1f}s deadline")
+
+
+class LLMGateway:
+    """Deadline-bound, rate-limited, circuit-broken access to chat completions
+    
+    Every call gets a per-kind deadline. While the breaker is open, or when
+    the local rate limit is exhausted, LLMUnavailable is raised at once so
+    callers drop to their local fallbacks without touching the network.
+    Optionally a hedged duplicate is sent when the first request outlives
+    the recent p95 for its kind.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.bucket = TokenBucket(Config.LLM_RATE_PER_SECOND, Config.LLM_RATE_BURST)
+        self.breaker = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET)
+        self.latencies = {}
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "short_circuits": 0, "rate_limited": 0,
+                      "hedges": 0, "hedge_wins": 0}
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-call")
+    
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+        Tracer.count(f"llm_{stat}")
+    
+    def healthy(self):
+        return self.breaker.state != CircuitBreaker.OPEN or time.monotonic() >= self.breaker.opened_until
+    
+    def _hedge_delay(self, kind):
+        with self.lock:
+            samples = sorted(self.latencies.get(kind, ()))
+        if not Config.LLM_HEDGE_ENABLED or len(samples) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(samples, 95)
+    
+    def _observe(self, kind, seconds):
+        with self.lock:
+            self.latencies.setdefault(kind, deque(maxlen=50)).append(seconds)
+    
+    def create(self, kind, reserve=0, **request):
+        """chat.completions.create with resilience; raises on failure or short circuit
+        
+        A reserve marks the call as optional: it never waits for the rate
+        limit and only runs while that many tokens are left for others.
+        """
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            raise LLMUnavailable("LLM circuit is open")
+        if not self.bucket.acquire(0 if reserve else Config.LLM_RATE_WAIT, reserve):
+            self._count("rate_limited")
+            self.breaker.release()
+            raise LLMUnavailable("local LLM rate limit reached")
+        
+        deadline = Config.LLM_DEADLINES.get(kind, 10.0)
+        self._count("calls")
+        started = time.monotonic()
+        try:
+            if request.get("stream"):
+                stream = self.client.chat.completions.create(timeout=deadline, **request)
+                result = DeadlineStream(stream, deadline - (time.monotonic() - started), self._stream_timed_out)
+            else:
+                result = self._call_with_retry(kind, deadline, request)
+        except Exception as e:
+            self._count("failures")
+            if not self.is_outage(e):
+                # The service answered; the request itself (prompt, key) was at fault
+                self.breaker.release()
+                raise
+            retry_after = None
+            if getattr(e, "status_code", None) == 429:
+                try:
+                    retry_after = float(e.response.headers.get("retry-after"))
+                except Exception:
+                    retry_after = Config.LLM_BREAKER_RESET
+            self.breaker.record_failure(retry_after)
+            raise
+        self._observe(kind, time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+    
+    @staticmethod
+    def is_outage(error):
+        """Timeouts, connection errors, 429 and 5xx count against the breaker; other 4xx do not"""
+        status = getattr(error, "status_code", None)
+        if status is None:
+            return True
+        return status == 429 or status >= 500
+    
+    def _stream_timed_out(self):
+        self._count("failures")
+        self.breaker.record_failure()
+    
+    def _call_with_retry(self, kind, deadline, request):
+        """Retry a server error once if at least half the deadline is left"""
+        started = time.monotonic()
+        try:
+            return self._call_with_hedge(kind, deadline, request)
+        except Exception as e:
+            remaining = deadline - (time.monotonic() - started)
+            if (getattr(e, "status_code", None) or 0) < 500 or remaining < deadline / 2:
+                raise
+            self._count("retries")
+            return self._call_with_hedge(kind, remaining, request)
+    
+    def _call_with_hedge(self, kind, deadline, request):
+        hedge_after = self._hedge_delay(kind)
+        if hedge_after is None or hedge_after >= deadline:
+            return self.client.chat.completions.create(timeout=deadline, **request)
+        
+        trace = Tracer.current()
+        started = time.monotonic()
+        
+        def attempt(budget):
+            with Tracer.activate(trace):
+                return self.client.chat.completions.create(timeout=budget, **request)
+        
+        futures = [self._pool.submit(attempt, deadline)]
+        done, _ = concurrent.futures.wait(futures, timeout=hedge_after)
+        if not done and self.bucket.acquire(0):
+            self._count("hedges")
+            futures.append(self._pool.submit(attempt, max(0.1, deadline - hedge_after)))
+        
+        errors = []
+        pending = set(futures)
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = concurrent.futures.wait(pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    return future.result()
+                errors.append(future.exception())
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"LLM {kind} call exceeded its {deadline}s deadline")
+
+
+# ============================================================================
+# AI ASSISTANT CORE
+# ============================================================================
+def estimate_tokens(text):
+    """Rough token count for usage accounting (about four characters per token)"""
+    return max(1, len(text or "") // 4)
+
+
+class SpeculativeAnswer:
+    """Answer stream started in parallel with intent detection
+    
+    Sentences are buffered until the intent is known; the caller then
+    either iterates the answer or discards it, which cancels the request
+    and records the tokens that were generated for nothing.
+    """
+    def __init__(self, ai, query, lang):
+        self.prompt = "".join(m["content"] for m in ai._answer_messages(query, lang))
+        self.started = time.perf_counter()
+        self.cancel = threading.Event()
+        self.sentences = queue.Queue()
+        self.received = []
+        self._done = object()
+        trace = Tracer.current()
+        
+        def run():
+            with Tracer.activate(trace):
+                try:
+                    for sentence in ai.stream_ai_response(query, lang, cancel=self.cancel):
+                        self.received.append(sentence)
+                        self.sentences.put(sentence)
+                finally:
+                    self.sentences.put(self._done)
+        
+        threading.Thread(target=run, name="llm-speculate", daemon=True).start()
+    
+    def use(self):
+        """Adopt the speculation; returns how far ahead of a serial request it started"""
+        saved_ms = (time.perf_counter() - self.started) * 1000
+        Tracer.annotate(speculation="used")
+        Tracer.record_metric("speculation.saved", saved_ms)
+        return saved_ms
+    
+    def discard(self):
+        self.cancel.set()
+        wasted = estimate_tokens(self.prompt) + estimate_tokens(" ".join(self.received))
+        Tracer.annotate(speculation="discarded")
+        Tracer.count("speculation_wasted_tokens", wasted)
+        Logger.info(f"Discarded speculative answer (~{wasted} tokens)")
+        return wasted
+    
+    def __iter__(self):
+        while True:
+            item = self.sentences.get()
+            if item is self._done:
+                return
+            yield item
+
+
+class ConversationContext:
+    """Recent question/answer turns kept within a token budget
+    
+    Token counts are estimated once per turn and kept as a running total.
+    When the recent turns outgrow the budget, the oldest are folded into a
+    rolling summary on a background worker; prompts meanwhile use the last
+    finished summary, so building one never waits on the LLM.
+    """
+    def __init__(self, summarize=None, budget=None, summary_tokens=None):
+        self.summarize = summarize
+        self.budget = budget or Config.CONTEXT_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens or Config.CONTEXT_SUMMARY_TOKENS
+        self.lock = threading.Lock()
+        self.turns = deque()
+        self.tokens = 0
+        self.summary = ""
+        self.generation = 0
+        self._worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+    
+    def active(self):
+        with self.lock:
+            return bool(self.turns or self.summary)
+    
+    def add(self, question, answer):
+        """Remember a finished turn and fold old turns away if over budget"""
+        if not question or not answer:
+            return
+        turn_tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self.lock:
+            self.turns.append((question, answer, turn_tokens))
+            self.tokens += turn_tokens
+            evicted = []
+            # Keep the latest turn verbatim even when it alone exceeds the budget
+            while self.tokens > self.budget - self.summary_tokens and len(self.turns) > 1:
+                old = self.turns.popleft()
+                self.tokens -= old[2]
+                evicted.append(old)
+            generation = self.generation
+        if evicted:
+            self._worker.submit(self._fold, generation, evicted)
+    
+    def _fold(self, generation, evicted):
+        # Read the summary now, not at submit time: earlier folds queued on the
+        # single worker may have finished since, and this one must build on them
+        with self.lock:
+            if generation != self.generation:
+                return
+            previous = self.summary
+        lines = [f"User: {q}\nAssistant: {a}" for q, a, _ in evicted]
+        summary = None
+        if self.summarize is not None:
+            try:
+                summary = self.summarize(previous, "\n".join(lines), self.summary_tokens)
+            except Exception as e:
+                Logger.error(f"Context summary failed: {e}")
+        if not summary:
+            # Extractive fallback: keep the questions, newest last
+            summary = " ".join(filter(None, [previous] + [f"Asked: {q}." for q, _, _ in evicted]))
+        limit = self.summary_tokens * 4
+        if len(summary) > limit:
+            summary = summary[-limit:].split(" ", 1)[-1]
+        with self.lock:
+            if generation == self.generation:
+                self.summary = summary
+    
+    def messages(self, prompt):
+        """Chat messages for prompt with the summary and recent turns before it"""
+        with self.lock:
+            summary = self.summary
+            turns = list(self.turns)
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Earlier in this conversation: {summary}"})
+        for question, answer, _ in turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def prompt_tokens(self):
+        with self.lock:
+            return self.tokens + (estimate_tokens(self.summary) if self.summary else 0)
+    
+    def reset(self):
+        """Forget the session; summaries still in flight are dropped"""
+        with self.lock:
+            self.turns.clear()
+            self.tokens = 0
+            self.summary = ""
+            self.generation += 1
+    
+    def wait_idle(self, timeout=5.0):
+        """Block until queued summaries have finished (used by benchmarks)"""
+        try:
+            self._worker.submit(lambda: None).result(timeout)
+        except Exception:
+            pass
+
+
+class SentenceSplitter:
+    """Split a token stream into speakable sentences as it arrives"""
+    BOUNDARY = re.compile(r'([.!?\u0964\u0965]+["\')\]]*)(\s+)')
+    ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no"}
+    
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars
+        self.buffer = ""
+    
+    def feed(self, chunk):
+        """Add streamed text and return any sentences now complete"""
+        self.buffer += chunk
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            end = match.end(1)
+            candidate = self.buffer[start:end].strip()
+            last_word = candidate.rsplit(None, 1)[-1].rstrip('.!?"\')]').lower() if candidate else ""
+            if len(candidate) < self.min_chars or last_word in self.ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = match.end(2)
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self):
+        """Return whatever text is left at the end of the stream"""
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class ConnectionMonitor:
+    """Times LLM HTTP requests and labels them first, after idle, or steady
+    
+    Installed as httpx event hooks, so the time is measured to response
+    headers, which covers connection setup plus time to first byte.
+    """
+    def __init__(self, idle_after=None):
+        self.idle_after = idle_after or Config.GROQ_KEEPALIVE_EXPIRY
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_response = None
+        self.samples = {}
+        self._local = threading.local()
+    
+    @contextmanager
+    def labelled(self, label):
+        """Attribute requests made in this block to label instead of a phase"""
+        previous = getattr(self._local, "label", None)
+        self._local.label = label
+        try:
+            yield
+        finally:
+            self._local.label = previous
+    
+    def on_request(self, request):
+        with self.lock:
+            self.pending[id(request)] = time.perf_counter()
+    
+    def on_response(self, response):
+        now = time.perf_counter()
+        with self.lock:
+            started = self.pending.pop(id(response.request), None)
+            if started is None:
+                return
+            if self.last_response is None:
+                phase = "first"
+            elif started - self.last_response > self.idle_after:
+                phase = "after_idle"
+            else:
+                phase = "steady"
+            self.last_response = now
+            label = getattr(self._local, "label", None) or phase
+            elapsed_ms = (now - started) * 1000
+            self.samples.setdefault(label, []).append(elapsed_ms)
+        Tracer.record_metric(f"llm.http.{label}", elapsed_ms)
+        Logger.debug("LLM request %s took %.0f ms", label, elapsed_ms)
+    
+    def idle_seconds(self):
+        with self.lock:
+            if self.last_response is None:
+                return None
+            return time.perf_counter() - self.last_response
+
+
+class AIAssistant:
+    """Core AI assistant logic"""
+    def __init__(self):
+        self.groq_client = None
+        self._init_groq()
+        self.memory = Memory()
+        self.classifier = IntentClassifier()
+        self.context = ConversationContext(self._summarize) if Config.CONTEXT_ENABLED else None
+        self.knowledge = None
+        if Config.KNOWLEDGE_ENABLED:
+            try:
+                self.knowledge = KnowledgeIndex()
+            except Exception as e:
+                Logger.error(f"Knowledge index disabled: {e}")
+        self.cache = None
+        if Config.RESPONSE_CACHE_ENABLED:
+            try:
+                self.cache = ResponseCache()
+            except Exception as e:
+                Logger.error(f"Response cache disabled: {e}")
+        self.semantic_cache = None
+        if Config.SEMANTIC_CACHE_ENABLED and self.cache and NUMPY_AVAILABLE:
+            self.semantic_cache = SemanticCache()
+    
+    def _init_groq(self):
+        """Initialize Groq client on a keep-alive connection pool"""
+        self.http_client = None
+        self.llm = None
+        self.connections = ConnectionMonitor()
+        self._keepalive_stop = None
+        try:
+            # Retries are left to LLMGateway so a failing call never outlives its deadline
+            options = {"api_key": Config.GROQ_API_KEY, "max_retries": 0}
+            if Config.GROQ_BASE_URL:
+                options["base_url"] = Config.GROQ_BASE_URL
+            if HTTPX_AVAILABLE:
+                verify = True
+                if Config.GROQ_CA_BUNDLE:
+                    # Trusted in addition to the default CAs; a path alone would replace them
+                    verify = ssl.create_default_context()
+                    verify.load_verify_locations(Config.GROQ_CA_BUNDLE)
+                self.http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=Config.GROQ_POOL_CONNECTIONS * 2,
+                        max_keepalive_connections=Config.GROQ_POOL_CONNECTIONS,
+                        keepalive_expiry=Config.GROQ_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=Config.GROQ_CONNECT_TIMEOUT),
+                    verify=verify,
+                    event_hooks={
+                        "request": [self.connections.on_request],
+                        "response": [self.connections.on_response],
+                    }
+                )
+                options["http_client"] = self.http_client
+            self.groq_client = Groq(**options)
+            self.llm = LLMGateway(self.groq_client)
+            Logger.info("Groq API initialized")
+        except Exception as e:
+            Logger.error(f"Failed to initialize Groq: {e}")
+            self.groq_client = None
+            self.llm = None
+    
+    def warm_up(self):
+        """Open a pooled connection (DNS, TCP, TLS) before the first real request"""
+        if not self.groq_client:
+            return None
+        started = time.perf_counter()
+        try:
+            with self.connections.labelled("warmup"):
+                self.groq_client.models.list()
+        except Exception as e:
+            Logger.error(f"LLM pre-connection failed: {e}")
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        Logger.info(f"LLM connection warmed in {elapsed_ms:.0f} ms")
+        return elapsed_ms
+    
+    def start_keepalive(self):
+        """Ping the endpoint while a session is active so the connection stays warm"""
+        if not self.groq_client or self._keepalive_stop is not None:
+            return
+        stop = threading.Event()
+        self._keepalive_stop = stop
+        
+        def run():
+            while not stop.wait(Config.GROQ_KEEPALIVE_INTERVAL):
+                idle = self.connections.idle_seconds()
+                if idle is not None and idle < Config.GROQ_KEEPALIVE_INTERVAL:
+                    continue
+                try:
+                    with self.connections.labelled("keepalive"):
+                        self.groq_client.models.list()
+                except Exception as e:
+                    Logger.error(f"LLM keep-alive failed: {e}")
+        
+        threading.Thread(target=run, name="llm-keepalive", daemon=True).start()
+    
+    def stop_keepalive(self):
+        stop, self._keepalive_stop = self._keepalive_stop, None
+        if stop is not None:
+            stop.set()
+    
+    def close(self):
+        self.stop_keepalive()
+        if self.http_client is not None:
+            self.http_client.close()
+    
+    ANSWER_INTENTS = ("ask_info", "unknown")
+    
+    def get_intent(self, text, lang="en", with_answer=None, prefetch=False):
+        """Analyze user intent, asking the LLM only when the local classifier is unsure
+        
+        In combined mode the same completion also carries a ready-to-speak
+        answer for ask_info/unknown, saving the follow-up request. A prefetch
+        (a guess from a partial transcript) asks for the intent alone, leaves
+        the cache untouched, only spends spare rate-limit tokens and returns
+        None instead of a fallback when the LLM cannot be asked.
+        """
+        if prefetch:
+            with_answer = False
+        elif with_answer is None:
+            # A combined answer cannot see the conversation, so follow-ups use the answer call
+            with_answer = Config.COMBINED_INTENT_ANSWER and not self._has_context()
+        if Config.LOCAL_INTENT_ENABLED:
+            local = self.classifier.classify(text)
+            if (local["confidence"] >= Config.LOCAL_INTENT_THRESHOLD
+                    and local["intent"] not in self.classifier.GUARDED_INTENTS):
+                Tracer.annotate(intent_source="local", intent_confidence=local["confidence"])
+                Logger.info(f"Intent detected locally: {local}")
+                return local
+        
+        cache_key = None
+        if self.cache and not prefetch:
+            cache_key = self.cache.key("intent", text, lang, int(with_answer))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                Tracer.annotate(intent_source="cache")
+                Logger.info(f"Intent from cache: {cached}")
+                result = dict(cached, query=text)
+                result.pop("answer", None)
+                # The answer has its own, shorter TTL; it is only reused while that is live
+                if with_answer and result.get("intent") in self.ANSWER_INTENTS:
+                    answer = self.cache.get(self.cache.key("answer", text, lang))
+                    if answer is not None:
+                        result["answer"] = answer
+                return result
+        
+        if not self.groq_client:
+            return None if prefetch else self._fallback_intent(text)
+        Tracer.annotate(intent_source="llm")
+        
+        prompt = f"""Analyze this command and return JSON with intent and extracted info.
+Possible intents: open_app, system_command, ask_info, set_name, weather, time, date, screenshot, send_email, file_search, content_search, read_messages, music_control, email_check, recall_history, unknown
+
+User command: "{text}"
+
+Return format:
+{{"intent": "intent_name", "entity": "extracted_value", "query": "original_text"}}"""
+        request = {"temperature": 0.3, "max_tokens": 200}
+        if with_answer:
+            prompt += f"""
+
+If the intent is ask_info or unknown, also include an "answer" field: answer the command concisely in {lang} language.
+Be helpful, accurate, and conversational. Keep the answer under 50 words. For any other intent set "answer" to "".
+Respond with the JSON object only."""
+            request = {"temperature": 0.5, "max_tokens": 300, "response_format": {"type": "json_object"}}
+
+        try:
+            with Tracer.span("intent"):
+                response = self.llm.create(
+                    "intent",
+                    reserve=Config.PREFETCH_RESERVE_TOKENS if prefetch else 0,
+                    model=Config.GROQ_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    **request
+                )
+            Tracer.count("llm_round_trips")
+            result = self._parse_intent_json(response.choices[0].message.content)
+            if result is None:
+                Tracer.annotate(intent_json_failed=True)
+                return None if prefetch else self._fallback_intent(text)
+            Tracer.annotate(intent_json_failed=False)
+            if result.get("intent") not in self.ANSWER_INTENTS or not isinstance(result.get("answer"), str):
+                result.pop("answer", None)
+            Logger.info(f"Intent detected: {result}")
+            if cache_key is not None:
+                self._cache_intent(cache_key, text, lang, result)
+            return result
+        except Exception as e:
+            Logger.error(f"Intent detection error: {e}")
+            return None if prefetch else self._fallback_intent(text)
+    
+    def _cache_intent(self, cache_key, text, lang, result):
+        """Store an intent; a combined answer goes under its own key with the answer TTL"""
+        stored = dict(result)
+        answer = stored.pop("answer", None)
+        if answer and self.cache.ttl_for(stored["intent"], text) > 0:
+            self._store_answer(self.cache.key("answer", text, lang), text, answer, lang)
+        self.cache.put(cache_key, stored, self.cache.ttl_for("intent", text), "intent")
+    
+    def _cached_answer(self, query, lang):
+        """Return (cache key, cached answer or None)"""
+        if not self.cache or self._has_context():
+            return None, None
+        key = self.cache.key("answer", query, lang)
+        cached = self.cache.get(key)
+        # A near-duplicate of "who won the match" must not answer "who won the match today"
+        if cached is None and self.semantic_cache is not None and self.cache.ttl_for("ask_info", query) > 0:
+            cached, similarity = self.semantic_cache.lookup(query, lang)
+            if cached is not None:
+                Tracer.count("semantic_cache_hits")
+                Logger.info(f"Semantic cache hit ({similarity:.2f}) for: {query}")
+        return key, cached
+    
+    def _store_answer(self, key, query, answer, lang="en"):
+        if self.cache and key and answer:
+            ttl = self.cache.ttl_for("ask_info", query)
+            self.cache.put(key, answer, ttl, "answer")
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(query, answer, ttl, lang)
+    
+    @staticmethod
+    def _parse_intent_json(content):
+        """Parse the intent object, tolerating prose or code fences around it"""
+        content = (content or "").strip()
+        try:
+            result = json.loads(content)
+        except ValueError:
+            match = re.search(r"\{.*\}", content, re.DOTALL)
+            try:
+                result = json.loads(match.group(0)) if match else None
+            except ValueError:
+                result = None
+        if not isinstance(result, dict) or not result.get("intent"):
+            Logger.error(f"Unparseable intent response: {content[:200]!r}")
+            return None
+        return result
+    
+    def _fallback_intent(self, text):
+        """Best local guess when the LLM is unavailable"""
+        Tracer.annotate(intent_source="fallback")
+        result = self.classifier.classify(text)
+        # A weak guess is not enough to shut the machine down
+        if result["intent"] in self.classifier.GUARDED_INTENTS and result["confidence"] < Config.LOCAL_INTENT_THRESHOLD:
+            return {"intent": "ask_info", "query": text, "confidence": 0.0}
+        return result
+    
+    def _answer_prompt(self, query, lang):
+        return f"""Answer this question concisely in {lang} language. 
+Be helpful, accurate, and conversational. Keep response under 50 words.
+
+Question: {query}"""
+    
+    def _has_context(self):
+        return self.context is not None and self.context.active()
+    
+    def _answer_messages(self, query, lang):
+        prompt = self._answer_prompt(query, lang)
+        if self.context is None:
+            return [{"role": "user", "content": prompt}]
+        Tracer.annotate(context_tokens=self.context.prompt_tokens())
+        return self.context.messages(prompt)
+    
+    def remember_turn(self, question, answer):
+        if self.context is not None:
+            self.context.add(question, answer)
+    
+    def end_conversation(self):
+        if self.context is not None:
+            self.context.reset()
+    
+    def _summarize(self, previous, transcript, max_tokens):
+        """Fold older turns into the rolling summary"""
+        if not self.groq_client:
+            return None
+        prompt = f"""Update this conversation summary with the new exchanges.
+Keep names, facts and what each pronoun refers to; drop pleasantries. Under {max_tokens * 3 // 4} words.
+
+Current summary: {previous or "(none)"}
+
+New exchanges:
+{transcript}"""
+        response = self.llm.create(
+            "summary",
+            model=Config.GROQ_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
+    
+    def get_ai_response(self, query, lang="en"):
+        """Get AI response for information queries"""
+        cache_key, cached = self._cached_answer(query, lang)
+        if cached is not None:
+            Logger.info(f"AI Response (cached): {cached}")
+            return cached
+        
+        if not self.groq_client:
+            return self._fallback_info(query)
+        
+        messages = self._answer_messages(query, lang)
+
+        try:
+            with Tracer.span("llm.answer"):
+                Tracer.count("llm_round_trips")
+                response = self.llm.create(
+                    "answer",
+                    model=Config.GROQ_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=150
+                )
+            answer = response.choices[0].message.content.strip()
+            Logger.info(f"AI Response: {answer}")
+            self._store_answer(cache_key, query, answer, lang)
+            return answer
+        except Exception as e:
+            Logger.error(f"AI response error: {e}")
+            return self._fallback_info(query)
+    
+    def stream_ai_response(self, query, lang="en", cancel=None):
+        """Yield the answer sentence by sentence while it is still generating
+        
+        Uses the same prompt and sampling settings as get_ai_response. The
+        stream is read on a background thread so generation keeps flowing
+        while the caller speaks earlier sentences. Setting the optional
+        cancel event closes the request early.
+        """
+        cache_key, cached = self._cached_answer(query, lang)
+        if cached is not None:
+            Logger.info(f"AI Response (cached): {cached}")
+            yield cached
+            return
+        
+        if not self.groq_client:
+            yield self._fallback_info(query)
+            return
+        
+        sentences = queue.Queue()
+        done = object()
+        trace = Tracer.current()
+        messages = self._answer_messages(query, lang)
+        
+        def produce():
+            splitter = SentenceSplitter()
+            parts = []
+            with Tracer.activate(trace):
+                try:
+                    with Tracer.span("llm.stream"):
+                        Tracer.count("llm_round_trips")
+                        stream = self.llm.create(
+                            "stream",
+                            model=Config.GROQ_MODEL,
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=150,
+                            stream=True
+                        )
+                        for chunk in stream:
+                            if cancel is not None and cancel.is_set():
+                                if hasattr(stream, "close"):
+                                    stream.close()
+                                break
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content or ""
+                            parts.append(delta)
+                            for sentence in splitter.feed(delta):
+                                sentences.put(sentence)
+                    if cancel is not None and cancel.is_set():
+                        Logger.info("AI response cancelled")
+                        return
+                    for sentence in splitter.flush():
+                        sentences.put(sentence)
+                    answer = ''.join(parts).strip()
+                    Logger.info(f"AI Response: {answer}")
+                    self._store_answer(cache_key, query, answer, lang)
+                except Exception as e:
+                    Logger.error(f"AI streaming error: {e}")
+                    if not parts:
+                        sentences.put(e)
+                finally:
+                    sentences.put(done)
+        
+        threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+        while True:
+            item = sentences.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                yield self._fallback_info(query)
+                return
+            yield item
+    
+    def needs_llm_intent(self, text):
+        """True when intent detection for text would go to the network"""
+        if not self.groq_client or not self.llm.healthy():
+            return False
+        if Config.LOCAL_INTENT_ENABLED and self.classifier.classify(text)["confidence"] >= Config.LOCAL_INTENT_THRESHOLD:
+            return False
+        return True
+    
+    def speculate_answer(self, query, lang="en"):
+        """Start streaming an answer before the intent is known"""
+        return SpeculativeAnswer(self, query, lang)
+    
+    def compose_email_body(self, subject, on_partial=None):
+        """Generate a short, properly formatted email body from the subject
+        
+        When on_partial is given the draft is streamed and the callback
+        receives the text generated so far after each chunk.
+        """
+        default_body = "\n".join([
+            "Hello,",
+            "",
+            f"I'm reaching out regarding \"{subject}\" and wanted to share some context for you to review. "
+            f"This note covers the background, current status, and the next steps I'm proposing. "
+            "Please take a moment to read through the details below so we can stay aligned.",
+            "",
+            "First, here is the latest summary of events and relevant information. "
+            "I've outlined the key motivations for the change, the progress we've made, "
+            "the roadblocks that surfaced, the timelines we are targeting, "
+            "and any dependencies we should watch. "
+            "Each point reflects what we gathered in the most recent discussions.",
+            "",
+            "Second, I'd love your perspective on how we should approach the next phase. "
+            "I'm proposing that we finalize the requirements, assign owners for the remaining deliverables, "
+            "set check-in milestones, identify the support you might need, "
+            "track any risks that emerge, and capture feedback after each milestone. "
+            "Your approval on this plan would help us move forward smoothly.",
+            "",
+            "Thanks in advance for your time and guidance.",
+            f"{self.memory.get('user_name', 'Your Name')}"
+        ])
+        
+        cache_key = None
+        if self.cache:
+            # The signature depends on the stored user name, so it is part of the key
+            cache_key = self.cache.key("email", subject, "en", self.memory.get('user_name', ''))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                Logger.info("Email body from cache")
+                return cached
+        
+        if not self.groq_client:
+            return default_body
+        
+        prompt = f"""You are an AI email writer. Draft a formal Gmail-ready email about "{subject}" with this exact format:
+1. Proper greeting line (e.g., Hello Team,).
+2. Paragraph 1: at least 6 sentences (each on its own line) explaining the background/context in a professional tone.
+3. Blank line.
+4. Paragraph 2: at least 6 sentences (each on its own line) covering next steps, requests, or actions needed.
+5. Blank line.
+6. Closing line with a professional sign-off (e.g., Thanks, Best regards) followed by a name (no placeholders).
+
+Additional rules:
+- Each sentence must be on its own line (no bullet points).
+- Total length should be roughly 180-240 words.
+- Keep the language clear, polite, and actionable.
+- Do not include quoted subject text or placeholders like [Name]."""
+        
+        try:
+            with Tracer.span("llm.email", streamed=on_partial is not None):
+                response = self.llm.create(
+                    "email",
+                    model=Config.GROQ_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.7,
+                    max_tokens=220,
+                    stream=on_partial is not None
+                )
+                if on_partial is None:
+                    body = response.choices[0].message.content.strip()
+                else:
+                    parts = []
+                    for chunk in response:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                            try:
+                                on_partial("".join(parts))
+                            except Exception as e:
+                                Logger.error(f"Draft preview error: {e}")
+                    body = "".join(parts).strip()
+            if body and cache_key:
+                self.cache.put(cache_key, body, self.cache.ttl_for("email", subject), "email")
+            return body or default_body
+        except Exception as e:
+            Logger.error(f"AI email compose error: {e}")
+            return default_body
+    
+    def _fallback_info(self, query):
+        """Fallback to the offline knowledge index, then live Wikipedia"""
+        if self.knowledge is not None:
+            try:
+                with Tracer.span("knowledge.lookup"):
+                    summary = self.knowledge.lookup(query)
+                if summary:
+                    Tracer.annotate(fallback_source="knowledge")
+                    return summary
+            except Exception as e:
+                Logger.error(f"Knowledge lookup failed: {e}")
+        if WIKIPEDIA_AVAILABLE and Config.KNOWLEDGE_LIVE_FALLBACK:
+            try:
+                with Tracer.span("wikipedia.lookup"):
+                    summary = wikipedia.summary(query, sentences=2)
+                Tracer.annotate(fallback_source="wikipedia")
+                if self.knowledge is not None and Config.KNOWLEDGE_SAVE_LOOKUPS:
+                    terms = KnowledgeIndex.query_terms(query)
+                    if terms:
+                        self.knowledge.add(" ".join(terms).title(), summary)
+                return summary
+            except:
+                pass
+        return f"I'll search for information about {query}."
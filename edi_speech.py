@@ -0,0 +1,1431 @@
+"""
+E.D.I - Speech: text-to-speech, speech recognition, language detection and wake word
+"""
+
+import os
+import json
+import re
+import wave
+import hashlib
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.error
+import urllib.request
+from pathlib import Path
+from collections import deque, OrderedDict
+
+# Core imports
+import speech_recognition as sr
+import pyttsx3
+
+# Optional imports
+try:
+    from langdetect import detect, DetectorFactory
+    DetectorFactory.seed = 0
+    LANGDETECT_AVAILABLE = True
+except:
+    LANGDETECT_AVAILABLE = False
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except:
+    PYAUDIO_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+try:
+    import audioop
+except:
+    audioop = None
+
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except:
+    VOSK_AVAILABLE = False
+
+from edi_core import Config, Logger, Tracer, percentile
+
+
+# ============================================================================
+# TEXT-TO-SPEECH
+# ============================================================================
+class AudioCache:
+    """Content-addressed on-disk cache of rendered speech waveforms
+    
+    Entries are keyed by text, voice, rate and volume, and the least
+    recently played files are evicted once the cache exceeds its size cap.
+    """
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = Path(cache_dir or Config.AUDIO_CACHE_DIR)
+        self.max_bytes = max_bytes or Config.AUDIO_CACHE_MAX_BYTES
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.entries = {}
+        for path in self.cache_dir.glob("*.wav"):
+            stat = path.stat()
+            self.entries[path.stem] = [stat.st_size, stat.st_mtime]
+    
+    @staticmethod
+    def key(text, voice, rate, volume):
+        raw = f"{text}\0{voice}\0{rate}\0{volume}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+    
+    def path_for(self, key):
+        return self.cache_dir / f"{key}.wav"
+    
+    def lookup(self, key):
+        """Return the cached file for key and mark it recently used"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry[1] = time.time()
+        path = self.path_for(key)
+        try:
+            os.utime(path, (entry[1], entry[1]))
+        except OSError:
+            with self.lock:
+                self.entries.pop(key, None)
+            return None
+        return path
+    
+    def add(self, key, rendered_path):
+        """Move a freshly rendered file into the cache and enforce the cap"""
+        path = self.path_for(key)
+        os.replace(rendered_path, path)
+        with self.lock:
+            self.entries[key] = [path.stat().st_size, time.time()]
+            total = sum(size for size, _ in self.entries.values())
+            victims = []
+            for victim, (size, _) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes or victim == key:
+                    break
+                victims.append(victim)
+                total -= size
+            for victim in victims:
+                del self.entries[victim]
+        for victim in victims:
+            try:
+                self.path_for(victim).unlink()
+            except OSError:
+                pass
+        return path
+
+
+class SpeechHandle:
+    """A queued utterance the caller can wait on or cancel"""
+    def __init__(self, text, priority, kind="say"):
+        self.text = text
+        self.priority = priority
+        self.kind = kind
+        self.cancelled = False
+        self.trace = Tracer.current()
+        self._done = threading.Event()
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """Block until spoken; returns False if it was cancelled"""
+        self._done.wait(timeout)
+        return self._done.is_set() and not self.cancelled
+    
+    def _finish(self):
+        self._done.set()
+
+
+class TTSEngine:
+    """Text-to-Speech worker with a priority queue and barge-in
+    
+    A dedicated thread owns the pyttsx3 engine. Callers either block with
+    speak() or get a SpeechHandle from speak_async() and carry on while the
+    utterance plays; barge_in() flushes the queue and cuts off current speech.
+    """
+    PRIORITY_URGENT = 0
+    PRIORITY_NORMAL = 5
+    PRIORITY_BACKGROUND = 9
+    
+    def __init__(self):
+        self.engine = None
+        self.lock = threading.Lock()
+        self.queue = queue.PriorityQueue()
+        self._seq = 0
+        self._current = None
+        self._ready = threading.Event()
+        self.is_speaking = False
+        self.on_speak = None
+        self.audio_cache = None
+        self._pyaudio = None
+        self._stop_playback = threading.Event()
+        if Config.AUDIO_CACHE_ENABLED and PYAUDIO_AVAILABLE:
+            try:
+                self.audio_cache = AudioCache()
+            except Exception as e:
+                Logger.error(f"Audio cache disabled: {e}")
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self.engine is None:
+            raise RuntimeError("Text-to-speech engine failed to start")
+    
+    def _init_engine(self):
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', Config.SPEECH_RATE)
+        self.engine.setProperty('volume', Config.SPEECH_VOLUME)
+        self._setup_voice()
+    
+    def _setup_voice(self):
+        """Set up female voice if available"""
+        try:
+            voices = self.engine.getProperty('voices')
+            for voice in voices:
+                name = (voice.name or "").lower()
+                if any(k in name for k in ['female', 'zira', 'hazel']):
+                    self.engine.setProperty('voice', voice.id)
+                    Logger.info(f"Using voice: {voice.name}")
+                    return
+        except Exception as e:
+            Logger.error(f"Voice setup error: {e}")
+    
+    def _enqueue(self, handle):
+        with self.lock:
+            self._seq += 1
+            self.queue.put((handle.priority, self._seq, handle))
+        return handle
+    
+    def speak_async(self, text, priority=PRIORITY_NORMAL):
+        """Queue text and return a SpeechHandle immediately"""
+        if self.on_speak:
+            self.on_speak(text)
+        return self._enqueue(SpeechHandle(text, priority))
+    
+    def speak(self, text, priority=PRIORITY_NORMAL):
+        """Speak text and wait until it finishes; False if interrupted"""
+        return self.speak_async(text, priority).wait()
+    
+    def barge_in(self):
+        """Drop all queued speech and stop the utterance in progress"""
+        flushed = []
+        with self.lock:
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[2] is None or item[2].kind != "say":
+                    flushed.append(item)
+                    continue
+                item[2].cancel()
+                item[2]._finish()
+            # Shutdown and pre-render jobs are not speech; keep them queued
+            for item in flushed:
+                self.queue.put(item)
+            current = self._current
+        if current is not None and current.kind == "say":
+            current.cancel()
+            Logger.info("Barge-in: stopping speech")
+            self.stop()
+    
+    def close(self):
+        """Stop the worker after the speech already queued"""
+        with self.lock:
+            self._seq += 1
+            self.queue.put((self.PRIORITY_BACKGROUND + 1, self._seq, None))
+        self._thread.join(5)
+    
+    def _run(self):
+        try:
+            self._init_engine()
+        except Exception as e:
+            Logger.error(f"TTS init error: {e}")
+            self.engine = None
+        finally:
+            self._ready.set()
+        if self.engine is None:
+            return
+        while True:
+            _, _, handle = self.queue.get()
+            if handle is None:
+                return
+            if handle.cancelled:
+                handle._finish()
+                continue
+            self._current = handle
+            try:
+                with Tracer.activate(handle.trace):
+                    if handle.kind == "render":
+                        self._render(handle.text)
+                    else:
+                        self.is_speaking = True
+                        with Tracer.span("tts", chars=len(handle.text or "")):
+                            self._say(handle.text)
+            except Exception as e:
+                Logger.error(f"TTS error: {e}")
+            finally:
+                self.is_speaking = False
+                self._current = None
+                handle._finish()
+    
+    def _say(self, text):
+        Logger.debug("Speaking: %s", text)
+        cached = self._cached_audio(text)
+        if cached is None or not self._play_wav(cached):
+            self.engine.say(text)
+            self.engine.runAndWait()
+    
+    def _cache_key(self, text):
+        return AudioCache.key(
+            text,
+            self.engine.getProperty('voice'),
+            self.engine.getProperty('rate'),
+            self.engine.getProperty('volume')
+        )
+    
+    def _cached_audio(self, text):
+        if self.audio_cache is None:
+            return None
+        return self.audio_cache.lookup(self._cache_key(text))
+    
+    def _play_wav(self, path):
+        """Play a cached waveform directly; returns False to fall back to synthesis"""
+        self._stop_playback.clear()
+        try:
+            if self._pyaudio is None:
+                self._pyaudio = pyaudio.PyAudio()
+            with wave.open(str(path), 'rb') as wav:
+                stream = self._pyaudio.open(
+                    format=self._pyaudio.get_format_from_width(wav.getsampwidth()),
+                    channels=wav.getnchannels(),
+                    rate=wav.getframerate(),
+                    output=True
+                )
+                try:
+                    chunk = wav.readframes(1024)
+                    while chunk and not self._stop_playback.is_set():
+                        stream.write(chunk)
+                        chunk = wav.readframes(1024)
+                finally:
+                    stream.stop_stream()
+                    stream.close()
+            return True
+        except Exception as e:
+            Logger.error(f"Cached audio playback failed: {e}")
+            return False
+    
+    def prerender(self, phrases=None):
+        """Render fixed phrases into the audio cache (install or idle time)"""
+        if self.audio_cache is None:
+            return 0
+        handles = [
+            self._enqueue(SpeechHandle(text, self.PRIORITY_BACKGROUND, kind="render"))
+            for text in (phrases or Config.PRERENDERED_PHRASES)
+        ]
+        before = len(self.audio_cache.entries)
+        for handle in handles:
+            handle.wait()
+        rendered = max(0, len(self.audio_cache.entries) - before)
+        if rendered:
+            Logger.info(f"Pre-rendered {rendered} phrases into the audio cache")
+        return rendered
+    
+    def _render(self, text):
+        """Render one phrase to the cache (runs on the worker thread)"""
+        key = self._cache_key(text)
+        if self.audio_cache.lookup(key) is not None:
+            return
+        tmp_path = self.audio_cache.cache_dir / f"{key}.tmp.wav"
+        try:
+            self.engine.save_to_file(text, str(tmp_path))
+            self.engine.runAndWait()
+            if tmp_path.exists() and tmp_path.stat().st_size > 44:
+                self.audio_cache.add(key, tmp_path)
+        except Exception as e:
+            Logger.error(f"Failed to pre-render '{text}': {e}")
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    def stop(self):
+        """Stop speaking"""
+        self._stop_playback.set()
+        try:
+            self.engine.stop()
+        except:
+            pass
+
+
+# ============================================================================
+# AUDIO ANALYSIS
+# ============================================================================
+def frame_energies(raw, sample_width, frame_samples):
+    """RMS energy of consecutive frames of little-endian PCM audio"""
+    frame_bytes = frame_samples * sample_width
+    count = len(raw) // frame_bytes
+    if count == 0:
+        return []
+    if NUMPY_AVAILABLE and sample_width in (1, 2, 4):
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[sample_width]
+        samples = np.frombuffer(raw, dtype=dtype, count=count * frame_samples).astype(np.float64)
+        if sample_width == 1:
+            samples -= 128.0
+        frames = samples.reshape(count, frame_samples)
+        return np.sqrt(np.mean(frames * frames, axis=1)).tolist()
+    if audioop is not None:
+        return [
+            audioop.rms(raw[i * frame_bytes:(i + 1) * frame_bytes], sample_width)
+            for i in range(count)
+        ]
+    return [0.0] * count
+
+
+def chunk_rms(chunk, sample_width):
+    """RMS energy of a single chunk of PCM audio"""
+    if audioop is not None:
+        return audioop.rms(chunk, sample_width)
+    energies = frame_energies(chunk, sample_width, max(1, len(chunk) // sample_width))
+    return energies[0] if energies else 0.0
+
+
+def voiced_runs(energies, threshold):
+    """Return (start, end) frame index pairs of consecutive voiced frames"""
+    runs = []
+    start = None
+    for index, energy in enumerate(energies):
+        if energy > threshold and start is None:
+            start = index
+        elif energy <= threshold and start is not None:
+            runs.append((start, index))
+            start = None
+    if start is not None:
+        runs.append((start, len(energies)))
+    return runs
+
+
+# ============================================================================
+# SPEECH-TO-TEXT
+# ============================================================================
+class EndpointModel:
+    """Learns pause lengths and the noise floor to pick end-of-utterance timing
+    
+    Internal pauses inside captured utterances tell us how long this user
+    hesitates mid-sentence; the trailing-silence threshold is set just above
+    that, within per-mode limits, so short commands end quickly while
+    dictation is allowed longer pauses.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pauses = {mode: deque(maxlen=200) for mode in Config.ENDPOINT_LIMITS}
+        self.noise_floor = None
+        self.energy_threshold = None
+    
+    def pause_threshold(self, mode):
+        """Seconds of silence that end an utterance in this mode"""
+        low, initial, high = Config.ENDPOINT_LIMITS.get(mode, Config.ENDPOINT_LIMITS["command"])
+        with self.lock:
+            pauses = sorted(self.pauses.get(mode, ()))
+        if len(pauses) < 5:
+            return initial
+        typical = percentile(pauses, 90) * Config.ENDPOINT_PAUSE_MARGIN
+        return min(high, max(low, typical))
+    
+    def calibrated(self, threshold):
+        """Smooth a fresh ambient calibration with what the session has seen"""
+        with self.lock:
+            if self.energy_threshold is None:
+                self.energy_threshold = threshold
+            else:
+                self.energy_threshold = 0.7 * self.energy_threshold + 0.3 * threshold
+            return self.energy_threshold
+    
+    def observe(self, audio, threshold, mode):
+        """Learn from a captured utterance; returns trailing silence in ms"""
+        frame_samples = max(1, int(audio.sample_rate * Config.ENDPOINT_FRAME_MS / 1000))
+        energies = frame_energies(audio.frame_data, audio.sample_width, frame_samples)
+        runs = voiced_runs(energies, threshold)
+        if not runs:
+            return None
+        frame_s = frame_samples / float(audio.sample_rate)
+        gaps = [(runs[i + 1][0] - runs[i][1]) * frame_s for i in range(len(runs) - 1)]
+        quiet = [e for e in energies[:runs[0][0]] + energies[runs[-1][1]:] if e <= threshold]
+        with self.lock:
+            # Ignore gaps too short to be pauses (plosives, syllable breaks)
+            self.pauses.setdefault(mode, deque(maxlen=200)).extend(g for g in gaps if g >= 0.12)
+            if quiet:
+                level = sorted(quiet)[len(quiet) // 2]
+                self.noise_floor = level if self.noise_floor is None else 0.9 * self.noise_floor + 0.1 * level
+        return (len(energies) - runs[-1][1]) * frame_s * 1000
+
+
+class MicrophoneStream:
+    """Long-lived capture stream feeding a ring buffer and subscribers
+    
+    The device is opened and the noise floor calibrated once; afterwards
+    the floor tracks quiet chunks in the background. Listeners get a
+    pre-roll from the ring buffer so speech that starts early is not
+    clipped; chunks read while our own speech was playing, and for
+    PROMPT_SETTLE_SECONDS after it, are left out of the pre-roll.
+    """
+    def __init__(self):
+        self.source = None
+        self.sample_rate = Config.MIC_SAMPLE_RATE
+        self.sample_width = 2
+        self.chunk = Config.MIC_CHUNK
+        self.chunk_seconds = self.chunk / float(self.sample_rate)
+        self.ring = deque(maxlen=max(1, int(Config.MIC_RING_SECONDS / self.chunk_seconds)))
+        self.chunks_read = 0
+        self.speech_chunk = None  # Last chunk read while speech_active() held
+        self.noise_floor = None
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.voice_listeners = []
+        self.speech_active = lambda: False
+        self._running = False
+        self._loud_chunks = 0
+        self._thread = None
+    
+    @property
+    def energy_threshold(self):
+        floor = self.noise_floor or 0.0
+        return max(Config.MIC_MIN_ENERGY, floor * Config.MIC_ENERGY_RATIO)
+    
+    def start(self):
+        """Open the device, calibrate once and start the reader thread"""
+        self.source = sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.chunk)
+        self.source.__enter__()
+        self.sample_rate = self.source.SAMPLE_RATE
+        self.sample_width = self.source.SAMPLE_WIDTH
+        self.chunk = self.source.CHUNK
+        self.chunk_seconds = self.chunk / float(self.sample_rate)
+        
+        levels = []
+        for _ in range(max(1, int(Config.MIC_CALIBRATION_SECONDS / self.chunk_seconds))):
+            data = self.source.stream.read(self.chunk)
+            levels.append(chunk_rms(data, self.sample_width))
+            self.ring.append(data)
+            self.chunks_read += 1
+        self.noise_floor = sorted(levels)[len(levels) // 2]
+        Logger.info(f"Microphone calibrated (noise floor {self.noise_floor:.0f})")
+        
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="mic-reader", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(2)
+        if self.source is not None:
+            try:
+                self.source.__exit__(None, None, None)
+            except Exception:
+                pass
+            self.source = None
+    
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self.source.stream.read(self.chunk)
+            except Exception as e:
+                Logger.error(f"Microphone read error: {e}")
+                time.sleep(0.1)
+                continue
+            energy = chunk_rms(data, self.sample_width)
+            threshold = self.energy_threshold
+            speaking = self.speech_active()
+            with self.lock:
+                self.ring.append(data)
+                self.chunks_read += 1
+                if speaking:
+                    self.speech_chunk = self.chunks_read
+                echo = self.chunks_read <= self._echo_end()
+                subscribers = list(self.subscribers)
+            for subscriber in subscribers:
+                try:
+                    subscriber.put_nowait((data, energy, echo))
+                except queue.Full:
+                    pass
+            if energy <= threshold:
+                # Quiet chunks keep the noise floor current
+                self.noise_floor = 0.98 * self.noise_floor + 0.02 * energy
+            self._check_voice(energy, threshold)
+    
+    def _check_voice(self, energy, threshold):
+        """Fire voice listeners when sustained speech starts over our own speech"""
+        if not self.voice_listeners or not self.speech_active():
+            self._loud_chunks = 0
+            return
+        if energy > threshold * Config.BARGE_IN_ENERGY_RATIO:
+            self._loud_chunks += 1
+        else:
+            self._loud_chunks = 0
+        # Fire once per onset, when the loud run first reaches the minimum length
+        if self._loud_chunks == max(1, int(Config.BARGE_IN_MIN_MS / 1000.0 / self.chunk_seconds)):
+            for listener in self.voice_listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    Logger.error(f"Voice listener error: {e}")
+    
+    def subscribe(self, maxsize=0):
+        """Return a queue that receives (chunk, energy, echo) as they are read
+        
+        echo is True for chunks read while our own speech (or its tail) played.
+        """
+        subscriber = queue.Queue(maxsize)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+    
+    def _echo_end(self):
+        """Index of the last chunk that may still carry our own speech (lock held)"""
+        if self.speech_chunk is None:
+            return 0
+        return self.speech_chunk + int(round(Config.PROMPT_SETTLE_SECONDS / self.chunk_seconds))
+    
+    def recent(self, seconds):
+        """The last few seconds of audio from the ring buffer, minus any of our own speech"""
+        count = max(0, int(seconds / self.chunk_seconds))
+        with self.lock:
+            count = min(count, max(0, self.chunks_read - self._echo_end()))
+            return list(self.ring)[-count:] if count else []
+    
+    def capture(self, timeout, phrase_time_limit, pause_threshold, on_chunk=None):
+        """Record one utterance, including a pre-roll from before speech began
+        
+        on_chunk, if given, receives each chunk as it is captured so a
+        streaming recognizer can decode while the user is still talking.
+        """
+        subscriber = self.subscribe()
+        try:
+            pre_roll = deque(
+                self.recent(Config.MIC_PRE_ROLL_SECONDS),
+                maxlen=max(1, int(Config.MIC_PRE_ROLL_SECONDS / self.chunk_seconds))
+            )
+            waited = 0.0
+            while True:
+                data, energy, echo = subscriber.get(timeout=max(1.0, timeout or 1.0))
+                waited += self.chunk_seconds
+                if energy > self.energy_threshold:
+                    break
+                if echo:
+                    pre_roll.clear()
+                else:
+                    pre_roll.append(data)
+                if timeout and waited > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            
+            frames = list(pre_roll) + [data]
+            if on_chunk:
+                for frame in frames:
+                    on_chunk(frame)
+            spoken = self.chunk_seconds
+            silence = 0.0
+            while silence < pause_threshold:
+                if phrase_time_limit and spoken >= phrase_time_limit:
+                    break
+                data, energy, _ = subscriber.get(timeout=2.0)
+                frames.append(data)
+                if on_chunk:
+                    on_chunk(data)
+                spoken += self.chunk_seconds
+                silence = silence + self.chunk_seconds if energy <= self.energy_threshold else 0.0
+            return sr.AudioData(b"".join(frames), self.sample_rate, self.sample_width)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class RecognitionStream:
+    """Incremental recognition session; buffers audio for batch backends"""
+    def __init__(self, backend, sample_rate, sample_width):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.chunks = []
+    
+    def feed(self, chunk):
+        """Add audio; returns the current partial hypothesis (or None)"""
+        self.chunks.append(chunk)
+        return None
+    
+    def finish(self):
+        audio = sr.AudioData(b"".join(self.chunks), self.sample_rate, self.sample_width)
+        return self.backend.recognize(audio)
+
+
+class RecognizerBackend:
+    """Speech recognizer interface
+    
+    recognize() returns the transcript of a finished utterance and raises
+    sr.UnknownValueError / sr.RequestError like speech_recognition does.
+    Streaming backends decode incrementally through open_stream().
+    """
+    name = "base"
+    streaming = False
+    
+    def recognize(self, audio):
+        raise NotImplementedError
+    
+    def open_stream(self, sample_rate, sample_width):
+        return RecognitionStream(self, sample_rate, sample_width)
+
+
+def compact_audio(audio, target_rate=None, margin=None, threshold=None):
+    """Trim silence and convert to mono 16-bit at the recognizer's rate
+    
+    Returns a new AudioData; the original is returned when nothing
+    voiced is found so recognition still gets a chance.
+    """
+    target_rate = target_rate or Config.STT_TARGET_RATE
+    margin = Config.STT_TRIM_MARGIN if margin is None else margin
+    raw = audio.get_raw_data(convert_width=2)
+    frame_samples = max(1, int(audio.sample_rate * Config.ENDPOINT_FRAME_MS / 1000))
+    energies = frame_energies(raw, 2, frame_samples)
+    if threshold is None and energies:
+        threshold = max(Config.MIC_MIN_ENERGY, percentile(sorted(energies), 10) * Config.MIC_ENERGY_RATIO)
+    runs = voiced_runs(energies, threshold or 0)
+    if runs:
+        pad = int(margin * audio.sample_rate / frame_samples)
+        start = max(0, runs[0][0] - pad) * frame_samples * 2
+        end = min(len(energies), runs[-1][1] + pad) * frame_samples * 2
+        raw = raw[start:end]
+    trimmed = sr.AudioData(raw, audio.sample_rate, 2)
+    if audio.sample_rate > target_rate:
+        trimmed = sr.AudioData(trimmed.get_raw_data(convert_rate=target_rate), target_rate, 2)
+    return trimmed
+
+
+class GoogleBackend(RecognizerBackend):
+    """Cloud recognition through the Google speech endpoint
+    
+    With COMPACT_STT_PAYLOAD the utterance is trimmed and resampled before
+    it is FLAC-encoded once and posted here, so bytes on the wire can be
+    measured; otherwise speech_recognition's recognize_google is used.
+    """
+    name = "google"
+    
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.bytes_per_second = None
+        self.last_report = {}
+    
+    def recognize(self, audio, threshold=None):
+        if not Config.COMPACT_STT_PAYLOAD:
+            return self.recognizer.recognize_google(audio)
+        
+        with Tracer.span("stt.prepare"):
+            compact = compact_audio(audio, threshold=threshold)
+            flac = compact.get_flac_data()
+        original_seconds = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+        compact_seconds = len(compact.frame_data) / float(compact.sample_rate * 2)
+        # Estimate the untrimmed, full-rate FLAC from this encode's bytes per sample
+        per_sample = len(flac) / max(1.0, compact_seconds * compact.sample_rate)
+        original_flac = int(original_seconds * audio.sample_rate * per_sample)
+        
+        started = time.perf_counter()
+        text = self._post(flac, compact.sample_rate)
+        elapsed = time.perf_counter() - started
+        rate = len(flac) / elapsed if elapsed > 0 else None
+        if rate:
+            self.bytes_per_second = rate if self.bytes_per_second is None else 0.8 * self.bytes_per_second + 0.2 * rate
+        saved_bytes = max(0, original_flac - len(flac))
+        saved_ms = saved_bytes / self.bytes_per_second * 1000 if self.bytes_per_second else 0.0
+        self.last_report = {
+            "bytes_sent": len(flac),
+            "bytes_saved": saved_bytes,
+            "kept_ratio": round(compact_seconds / max(0.001, original_seconds), 3),
+            "time_saved_ms": round(saved_ms, 1),
+        }
+        # An estimate, not a measured stage, so it stays out of the latency percentiles
+        Tracer.annotate(stt_payload=self.last_report)
+        Logger.info(f"STT payload {len(flac)} bytes (saved ~{saved_bytes} bytes, ~{saved_ms:.0f} ms)")
+        return text
+    
+    def _post(self, flac, sample_rate):
+        """Send FLAC to the v2 recognize endpoint and return the best transcript"""
+        query = urllib.parse.urlencode({
+            "client": "chromium",
+            "lang": Config.GOOGLE_STT_LANGUAGE,
+            "key": Config.GOOGLE_STT_KEY,
+            "pFilter": 0,
+        })
+        request = urllib.request.Request(
+            f"{Config.GOOGLE_STT_ENDPOINT}?{query}",
+            data=flac,
+            headers={"Content-Type": f"audio/x-flac; rate={sample_rate}"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=Config.GOOGLE_STT_TIMEOUT) as response:
+                body = response.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as e:
+            raise sr.RequestError(f"recognition request failed: {e.reason}")
+        except urllib.error.URLError as e:
+            raise sr.RequestError(f"recognition connection failed: {e.reason}")
+        except TimeoutError:
+            raise sr.RequestError("recognition request timed out")
+        
+        for line in body.split("\n"):
+            if not line.strip():
+                continue
+            try:
+                results = json.loads(line).get("result", [])
+                alternatives = results[0].get("alternative", []) if results else []
+            except (ValueError, AttributeError, KeyError, TypeError):
+                # An HTML error or captcha page instead of JSON
+                raise sr.RequestError(f"unexpected recognition response: {line[:80]!r}")
+            if not alternatives:
+                continue
+            best = max(alternatives, key=lambda alt: alt.get("confidence", 0), default=None)
+            if best and best.get("transcript"):
+                return best["transcript"]
+        raise sr.UnknownValueError()
+
+
+class VoskStream(RecognitionStream):
+    """Incremental Kaldi decoding with partial hypotheses"""
+    def __init__(self, backend, sample_rate, sample_width):
+        super().__init__(backend, sample_rate, sample_width)
+        self.kaldi = vosk.KaldiRecognizer(backend.model, sample_rate)
+        self.segments = []
+    
+    def feed(self, chunk):
+        if self.kaldi.AcceptWaveform(chunk):
+            text = json.loads(self.kaldi.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            partial = ""
+        else:
+            partial = json.loads(self.kaldi.PartialResult()).get("partial", "")
+        return " ".join(self.segments + [partial]).strip() or None
+    
+    def finish(self):
+        text = json.loads(self.kaldi.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        transcript = " ".join(self.segments).strip()
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline CPU recognition with the Vosk (Kaldi) engine"""
+    name = "vosk"
+    streaming = True
+    
+    def __init__(self, model_path):
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(str(model_path))
+    
+    def open_stream(self, sample_rate, sample_width):
+        if sample_width != 2:
+            return RecognitionStream(self, sample_rate, sample_width)
+        return VoskStream(self, sample_rate, sample_width)
+    
+    def recognize(self, audio):
+        stream = VoskStream(self, 16000, 2)
+        stream.feed(audio.get_raw_data(convert_rate=16000, convert_width=2))
+        return stream.finish()
+
+
+class FileAudioSource:
+    """Replays WAV files in name order in place of a live microphone"""
+    def __init__(self, directory, realtime=False):
+        self.directory = Path(directory)
+        self.files = sorted(self.directory.glob("*.wav"))
+        self.realtime = realtime
+        self.position = 0
+        self.sample_rate = Config.MIC_SAMPLE_RATE
+        self.sample_width = 2
+        self.chunk = Config.MIC_CHUNK
+        self.energy_threshold = Config.MIC_MIN_ENERGY
+        self.current = None
+        self.current_bytes = 0
+    
+    def capture(self, timeout, phrase_time_limit, pause_threshold, on_chunk=None):
+        if self.position >= len(self.files):
+            raise sr.WaitTimeoutError("no more recorded utterances")
+        self.current = self.files[self.position]
+        self.position += 1
+        with wave.open(str(self.current), 'rb') as wav:
+            self.sample_rate = wav.getframerate()
+            self.sample_width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            raw = wav.readframes(wav.getnframes())
+        if channels > 1:
+            # Average the channels into 16-bit mono, as for wake-word clips
+            samples, self.sample_rate = read_wav_samples(self.current)
+            raw = samples.tobytes()
+            self.sample_width = 2
+        self.current_bytes = len(raw)
+        step = self.chunk * self.sample_width
+        for offset in range(0, len(raw), step):
+            if on_chunk:
+                on_chunk(raw[offset:offset + step])
+            if self.realtime:
+                time.sleep(self.chunk / float(self.sample_rate))
+        audio = sr.AudioData(raw, self.sample_rate, self.sample_width)
+        audio.source_path = self.current
+        return audio
+
+
+class FileStream(RecognitionStream):
+    """Reveals the stand-in transcript word by word as audio is fed"""
+    def __init__(self, backend, sample_rate, sample_width, source):
+        super().__init__(backend, sample_rate, sample_width)
+        self.source = source
+        self.words = None
+        self.fed = 0
+    
+    def _load(self):
+        # The source only knows which file is playing once capture starts
+        if self.words is None:
+            current = self.source.current
+            self.words = self.backend.transcript_for(current).split() if current else []
+    
+    def feed(self, chunk):
+        self._load()
+        self.fed += len(chunk)
+        total = self.source.current_bytes
+        if not self.words or not total:
+            return None
+        shown = int(len(self.words) * min(1.0, self.fed / float(total)))
+        return " ".join(self.words[:shown]) or None
+    
+    def finish(self):
+        self._load()
+        if not self.words:
+            raise sr.UnknownValueError()
+        return " ".join(self.words)
+
+
+class FileBackend(RecognizerBackend):
+    """Stand-in recognizer that reads transcripts stored next to WAV files"""
+    name = "file"
+    streaming = True
+    
+    def __init__(self, source):
+        self.source = source
+    
+    @staticmethod
+    def transcript_for(path):
+        transcript = Path(path).with_suffix(".txt")
+        if not transcript.exists():
+            return ""
+        return transcript.read_text(encoding='utf-8').strip()
+    
+    def open_stream(self, sample_rate, sample_width):
+        return FileStream(self, sample_rate, sample_width, self.source)
+    
+    def recognize(self, audio):
+        text = self.transcript_for(audio.source_path) if hasattr(audio, "source_path") else ""
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class STTEngine:
+    """Speech recognition engine with error handling"""
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+        self.recognizer.pause_threshold = Config.ENDPOINT_LIMITS["command"][1]
+        self.recognizer.energy_threshold = 4000
+        self.recognizer.dynamic_energy_threshold = True
+        self.endpoint = EndpointModel()
+        self.partial_listeners = []
+        self.mic = None
+        if Config.STT_BACKEND == "file":
+            self.mic = FileAudioSource(Config.STT_FILE_DIR, Config.STT_FILE_REALTIME)
+        elif Config.PERSISTENT_MIC:
+            try:
+                self.mic = MicrophoneStream()
+                self.mic.start()
+            except Exception as e:
+                Logger.error(f"Persistent microphone unavailable, opening per listen: {e}")
+                self.mic = None
+        self.backend = self._create_backend()
+        self.language = LanguageDetector()
+        Logger.info(f"Speech recognizer backend: {self.backend.name}")
+    
+    def _create_backend(self):
+        """Pick the configured recognizer, falling back to Google"""
+        if Config.STT_BACKEND == "file":
+            return FileBackend(self.mic)
+        if Config.STT_BACKEND == "vosk":
+            if not VOSK_AVAILABLE:
+                Logger.error("vosk is not installed; using Google recognition")
+            elif not Path(Config.VOSK_MODEL_PATH).exists():
+                Logger.error(f"Vosk model not found at {Config.VOSK_MODEL_PATH}; using Google recognition")
+            else:
+                try:
+                    return VoskBackend(Config.VOSK_MODEL_PATH)
+                except Exception as e:
+                    Logger.error(f"Failed to load Vosk model: {e}")
+        return GoogleBackend(self.recognizer)
+    
+    def close(self):
+        if isinstance(self.mic, MicrophoneStream):
+            self.mic.stop()
+    
+    def _notify_partial(self, stream, chunk, last):
+        partial = stream.feed(chunk)
+        if partial and partial != last[0]:
+            last[0] = partial
+            for listener in self.partial_listeners:
+                try:
+                    listener(partial)
+                except Exception as e:
+                    Logger.error(f"Partial result listener error: {e}")
+    
+    def _capture(self, mode, stream=None):
+        """Record one utterance and return (audio, energy threshold)"""
+        pause = self.endpoint.pause_threshold(mode)
+        Logger.info(f"Listening ({mode}, endpoint {pause:.2f}s)...")
+        if self.mic is not None:
+            on_chunk = None
+            if stream is not None:
+                last = [None]
+                on_chunk = lambda chunk: self._notify_partial(stream, chunk, last)
+            with Tracer.span("stt.capture", mode=mode, pause_threshold=pause):
+                try:
+                    audio = self.mic.capture(Config.LISTEN_TIMEOUT, Config.PHRASE_TIME_LIMIT, pause, on_chunk)
+                except queue.Empty:
+                    raise sr.WaitTimeoutError("microphone stream stalled")
+            return audio, self.mic.energy_threshold
+        
+        with sr.Microphone() as source:
+            Logger.info("Adjusting for ambient noise...")
+            with Tracer.span("stt.calibrate"):
+                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                self.recognizer.energy_threshold = self.endpoint.calibrated(self.recognizer.energy_threshold)
+            
+            self.recognizer.pause_threshold = pause
+            self.recognizer.non_speaking_duration = min(0.3, pause)
+            with Tracer.span("stt.capture", mode=mode, pause_threshold=pause):
+                audio = self.recognizer.listen(
+                    source,
+                    timeout=Config.LISTEN_TIMEOUT,
+                    phrase_time_limit=Config.PHRASE_TIME_LIMIT
+                )
+        return audio, self.recognizer.energy_threshold
+    
+    def listen(self, mode="command"):
+        """Listen and return (text, language)
+        
+        mode is "command" for short requests or "dictation" for free text
+        such as email subjects, which tolerates longer pauses.
+        """
+        try:
+            with Tracer.span("stt"):
+                stream = None
+                if self.mic is not None and self.backend.streaming:
+                    stream = self.backend.open_stream(self.mic.sample_rate, self.mic.sample_width)
+                audio, threshold = self._capture(mode, stream)
+                endpoint_ms = self.endpoint.observe(audio, threshold, mode)
+                if endpoint_ms is not None:
+                    Tracer.record_metric("stt.endpoint", endpoint_ms, mode=mode)
+                
+                Logger.info("Recognizing...")
+                with Tracer.span("stt.recognize", backend=self.backend.name):
+                    if stream is not None:
+                        text = stream.finish()
+                    elif isinstance(self.backend, GoogleBackend):
+                        text = self.backend.recognize(audio, threshold)
+                    else:
+                        text = self.backend.recognize(audio)
+                Logger.debug("Recognized: %s", text)
+                
+                # Detect language
+                with Tracer.span("stt.language"):
+                    lang = self._detect_language(text)
+                return text.strip(), lang
+                
+        except sr.WaitTimeoutError:
+            Logger.info("No speech detected (timeout)")
+            return "", "en"
+        except sr.UnknownValueError:
+            Logger.info("Could not understand audio")
+            return "", "en"
+        except sr.RequestError as e:
+            Logger.error(f"Recognition service error: {e}")
+            return "", "en"
+        except Exception as e:
+            Logger.error(f"Unexpected STT error: {e}")
+            return "", "en"
+    
+    def _detect_language(self, text):
+        """Detect language of text"""
+        return self.language.detect(text)
+
+
+# ============================================================================
+# LANGUAGE DETECTION
+# ============================================================================
+def langdetect_language(text):
+    """Full langdetect pass, keeping only the languages the assistant speaks"""
+    if not LANGDETECT_AVAILABLE or not text:
+        return "en"
+    
+    try:
+        detected = detect(text)
+        lang_map = {
+            'hi': 'hi',
+            'mr': 'mr',
+            'gu': 'gu',
+            'pa': 'pa',
+        }
+        return lang_map.get(detected, 'en')
+    except:
+        return "en"
+
+
+class LanguageDetector:
+    """Script and keyword language detection with an LRU memo
+    
+    Native-script text is decided by its Unicode block, romanized text by
+    Hinglish-style keyword tables; langdetect only runs when neither is
+    conclusive.
+    """
+    SCRIPTS = (
+        ("deva", 0x0900, 0x097F),
+        ("gu", 0x0A80, 0x0AFF),
+        ("pa", 0x0A00, 0x0A7F),
+    )
+    # Devanagari is shared by Hindi and Marathi; these words tip it to Marathi
+    MARATHI_MARKERS = {
+        "आहे", "आहेत", "नाही", "काय", "मला", "तुला", "तुम्ही", "आणि", "करा", "सांग",
+        "उघडा", "लाव", "कसा", "कशी", "किती", "माझे", "माझा", "होते", "पाहिजे",
+    }
+    HINDI_MARKERS = {
+        "है", "हैं", "नहीं", "क्या", "मुझे", "और", "करो", "बताओ", "खोलो", "कैसे",
+        "मेरा", "मेरे", "का", "की", "के", "में", "हूँ", "चलाओ", "चाहिए", "था",
+    }
+    ROMANIZED = {
+        "hi": {
+            "kya", "hai", "hain", "nahi", "nahin", "mujhe", "mera", "meri", "karo", "kardo",
+            "batao", "bataiye", "kholo", "chalao", "bajao", "kaise", "kaun", "kitna", "kitne",
+            "abhi", "aaj", "yaar", "accha", "acha", "theek", "thik", "gaana", "gana", "mausam",
+            "chahiye", "kijiye", "dikhao", "bhejo", "karna", "hoga", "wala", "aap",
+        },
+        "mr": {
+            "aahe", "ahe", "kay", "mala", "tula", "kara", "ughad", "ughada", "lav", "vajav",
+            "sanga", "kiti", "aata", "udya", "kasa", "kashi", "majha", "mazha", "pahije",
+        },
+        "gu": {
+            "che", "chhe", "shu", "kem", "majama", "tame", "mane", "aapo", "vagado", "jovo",
+            "kyare", "karjo", "kholjo", "batavo", "hatu", "nathi", "maru", "tamaru",
+        },
+        "pa": {
+            "tusi", "tussi", "kiddan", "kidda", "mainu", "dasso", "kithe",
+            "haanji", "assi", "tuhada", "sanu", "karde", "kive", "hoya", "dasna",
+        },
+    }
+    # \w stops at Indic vowel signs, so split on spacing and punctuation instead
+    WORD_RE = re.compile(r"[^\s\d.,!?;:'\"()\[\]{}\-।]+")
+    
+    def __init__(self, memo_size=None, fallback=langdetect_language):
+        self.memo_size = Config.LANG_MEMO_SIZE if memo_size is None else memo_size
+        self.fallback = fallback
+        self.memo = OrderedDict()
+        self.lock = threading.Lock()
+        self.fallbacks = 0
+    
+    def detect(self, text):
+        if not text:
+            return "en"
+        key = text.strip().lower()
+        with self.lock:
+            lang = self.memo.get(key)
+            if lang is not None:
+                self.memo.move_to_end(key)
+                return lang
+        lang = self._classify(key)
+        if lang is None:
+            self.fallbacks += 1
+            lang = self.fallback(text)
+        if self.memo_size:
+            with self.lock:
+                self.memo[key] = lang
+                if len(self.memo) > self.memo_size:
+                    self.memo.popitem(last=False)
+        return lang
+    
+    def _classify(self, text):
+        """Return a language code, or None when the text is ambiguous"""
+        counts = {}
+        latin = 0
+        for ch in text:
+            code = ord(ch)
+            if code < 0x80:
+                if ch.isalpha():
+                    latin += 1
+                continue
+            for name, low, high in self.SCRIPTS:
+                if low <= code <= high:
+                    counts[name] = counts.get(name, 0) + 1
+                    break
+        
+        if counts:
+            script = max(counts, key=counts.get)
+            if script != "deva":
+                return script
+            words = set(self.WORD_RE.findall(text))
+            marathi = len(words & self.MARATHI_MARKERS)
+            hindi = len(words & self.HINDI_MARKERS)
+            if marathi > hindi:
+                return "mr"
+            if hindi > marathi:
+                return "hi"
+            return None
+        
+        if not latin:
+            return None
+        words = self.WORD_RE.findall(text)
+        if not words:
+            return "en"
+        hits = {}
+        for lang, table in self.ROMANIZED.items():
+            hits[lang] = sum(1 for word in words if word in table)
+        best = max(hits, key=hits.get)
+        score = hits[best]
+        if score == 0:
+            # Plain ASCII with no romanized markers is English for this assistant
+            return "en" if text.isascii() else None
+        if sorted(hits.values())[-2] == score:
+            return None
+        if score >= 2 or score * 3 >= len(words):
+            return best
+        return None
+
+
+# ============================================================================
+# WAKE WORD
+# ============================================================================
+class KeywordFeatures:
+    """Vectorized MFCC extraction for keyword spotting"""
+    def __init__(self, sample_rate, n_fft=512, n_mels=26, n_mfcc=13):
+        self.sample_rate = sample_rate
+        self.frame = int(0.025 * sample_rate)
+        self.hop = int(0.010 * sample_rate)
+        self.n_fft = max(n_fft, self.frame)
+        self.window = np.hamming(self.frame).astype(np.float32)
+        self.mel = self._mel_filterbank(sample_rate, self.n_fft, n_mels)
+        k = np.arange(n_mels)
+        self.dct = np.cos(np.pi / n_mels * (k[None, :] + 0.5) * np.arange(n_mfcc)[:, None]).astype(np.float32)
+    
+    @staticmethod
+    def _mel_filterbank(sample_rate, n_fft, n_mels):
+        to_mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+        to_hz = lambda mel: 700.0 * (10 ** (mel / 2595.0) - 1.0)
+        points = to_hz(np.linspace(to_mel(60.0), to_mel(sample_rate / 2.0), n_mels + 2))
+        bins = np.floor((n_fft + 1) * points / sample_rate).astype(int)
+        bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+        for m in range(1, n_mels + 1):
+            left, center, right = bins[m - 1], bins[m], bins[m + 1]
+            if center > left:
+                bank[m - 1, left:center] = (np.arange(left, center) - left) / float(center - left)
+            if right > center:
+                bank[m - 1, center:right] = (right - np.arange(center, right)) / float(right - center)
+        return bank
+    
+    def __call__(self, samples):
+        """MFCC matrix (frames x coefficients) with mean normalization"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) < self.frame:
+            return np.zeros((0, self.dct.shape[0]), dtype=np.float32)
+        count = 1 + (len(samples) - self.frame) // self.hop
+        index = np.arange(self.frame)[None, :] + self.hop * np.arange(count)[:, None]
+        spectrum = np.abs(np.fft.rfft(samples[index] * self.window, self.n_fft)) ** 2
+        mfcc = np.log(spectrum @ self.mel.T + 1e-10) @ self.dct.T
+        return (mfcc - mfcc.mean(axis=0)).astype(np.float32)
+
+
+def dtw_distance(template, segment):
+    """Slope-constrained DTW with cosine frame cost, normalized by template length
+    
+    Each template frame advances the segment by 0, 1 or 2 frames, so every
+    row depends only on the previous one and is computed as one vector op.
+    """
+    rows, cols = len(template), len(segment)
+    if rows == 0 or cols == 0 or cols > 2 * rows or 2 * cols < rows:
+        return float("inf")
+    a = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-9)
+    b = segment / (np.linalg.norm(segment, axis=1, keepdims=True) + 1e-9)
+    cost = 1.0 - a @ b.T
+    previous = np.full(cols, np.inf, dtype=np.float32)
+    previous[0] = cost[0, 0]
+    for i in range(1, rows):
+        best = previous.copy()
+        best[1:] = np.minimum(best[1:], previous[:-1])
+        best[2:] = np.minimum(best[2:], previous[:-2])
+        previous = cost[i] + best
+    return float(previous[-1] / rows)
+
+
+class WakeWordDetector:
+    """Low-CPU local wake-word spotting on the continuous microphone stream
+    
+    A cheap energy gate collects voiced segments; only those are turned
+    into MFCCs and matched against enrolled templates with DTW. A CPU
+    allowance that accrues at WAKE_WORD_CPU_BUDGET per wall-clock second
+    is spent on each evaluation, and segments are skipped once it runs out.
+    """
+    def __init__(self, templates, sample_rate, chunk_seconds):
+        self.templates = [np.asarray(t, dtype=np.float32) for t in templates]
+        self.features = KeywordFeatures(sample_rate)
+        self.chunk_seconds = chunk_seconds
+        self.listeners = []
+        self.enabled = lambda: True
+        self.segment = []
+        self.silence = 0.0
+        self.cpu_allowance = 0.0
+        self.cpu_used = 0.0
+        self.skipped = 0
+        self.last_detection = 0.0
+        self.audio_time = 0.0
+        self._running = False
+        self._thread = None
+    
+    @staticmethod
+    def load_templates(path=None):
+        path = Path(path or Config.WAKE_WORD_TEMPLATES_FILE)
+        if not NUMPY_AVAILABLE or not path.exists():
+            return []
+        with np.load(path) as data:
+            return [data[name] for name in data.files]
+    
+    def process_chunk(self, chunk, energy, threshold):
+        """Feed one chunk of int16 audio; returns True when the wake word ends"""
+        self.audio_time += self.chunk_seconds
+        self.cpu_allowance = min(
+            self.cpu_allowance + Config.WAKE_WORD_CPU_BUDGET * self.chunk_seconds,
+            Config.WAKE_WORD_CPU_BUDGET * 5.0
+        )
+        if energy > threshold:
+            self.segment.append(chunk)
+            self.silence = 0.0
+        elif self.segment:
+            self.segment.append(chunk)
+            self.silence += self.chunk_seconds
+        else:
+            return False
+        
+        length = len(self.segment) * self.chunk_seconds
+        if self.silence < Config.WAKE_WORD_END_SILENCE and length < Config.WAKE_WORD_MAX_SECONDS:
+            return False
+        segment, self.segment, self.silence = self.segment, [], 0.0
+        if length >= Config.WAKE_WORD_MAX_SECONDS:
+            # Too long to be the wake word; wait for the speaker to pause
+            self.segment = [] if energy <= threshold else [chunk]
+            return False
+        if self.cpu_allowance <= 0.0:
+            self.skipped += 1
+            return False
+        
+        started = time.thread_time()
+        detected = self._matches(b"".join(segment))
+        spent = time.thread_time() - started
+        self.cpu_used += spent
+        self.cpu_allowance -= spent
+        return detected
+    
+    def _matches(self, raw):
+        samples = np.frombuffer(raw, dtype=np.int16)
+        mfcc = self.features(samples)
+        best = min((dtw_distance(t, mfcc) for t in self.templates), default=float("inf"))
+        Logger.debug("Wake word score %.3f", best)
+        return best <= Config.WAKE_WORD_THRESHOLD
+    
+    def start(self, mic):
+        """Run on a subscriber of the shared microphone stream"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(mic,), name="wake-word", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(2)
+    
+    def _run(self, mic):
+        subscriber = mic.subscribe(maxsize=int(2.0 / mic.chunk_seconds))
+        try:
+            while self._running:
+                try:
+                    chunk, energy, _ = subscriber.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if not self.enabled():
+                    self.segment, self.silence = [], 0.0
+                    continue
+                if not self.process_chunk(chunk, energy, mic.energy_threshold):
+                    continue
+                now = time.monotonic()
+                if now - self.last_detection < Config.WAKE_WORD_COOLDOWN:
+                    continue
+                self.last_detection = now
+                Logger.info("Wake word detected")
+                for listener in self.listeners:
+                    try:
+                        listener()
+                    except Exception as e:
+                        Logger.error(f"Wake word listener error: {e}")
+        finally:
+            mic.unsubscribe(subscriber)
+
+
+def read_wav_samples(wav_file, target_rate=None):
+    """Read a WAV clip as mono 16-bit samples, resampled to target_rate when given
+    
+    Converts with numpy alone (the wake word needs it anyway), since
+    audioop is gone from Python 3.13. Returns (int16 array, rate).
+    """
+    with wave.open(str(wav_file), 'rb') as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        raw = wav.readframes(wav.getnframes())
+    if width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        samples = np.where(values >= 1 << 23, values - (1 << 24), values) / 256.0
+    else:
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float64)
+        samples = (samples - 128.0) * 256.0 if width == 1 else samples / (1 << (8 * (width - 2)))
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    if target_rate and target_rate != rate:
+        count = int(len(samples) * target_rate / rate)
+        samples = np.interp(np.arange(count) * (rate / float(target_rate)), np.arange(len(samples)), samples)
+        rate = target_rate
+    return np.clip(np.round(samples), -32768, 32767).astype(np.int16), rate
+
+
+def enroll_wake_word(wav_files, path=None):
+    """Build wake-word templates from recorded clips of the keyword"""
+    templates = []
+    for wav_file in wav_files:
+        samples, _ = read_wav_samples(wav_file, Config.MIC_SAMPLE_RATE)
+        raw = samples.tobytes()
+        # Trim leading and trailing silence with the same energy gate the detector uses
+        frame = int(Config.MIC_SAMPLE_RATE * 0.01)
+        energies = frame_energies(raw, 2, frame)
+        runs = voiced_runs(energies, max(Config.MIC_MIN_ENERGY, percentile(sorted(energies), 20) * Config.MIC_ENERGY_RATIO))
+        if runs:
+            raw = raw[runs[0][0] * frame * 2:runs[-1][1] * frame * 2]
+        templates.append(KeywordFeatures(Config.MIC_SAMPLE_RATE)(np.frombuffer(raw, dtype=np.int16)))
+    np.savez(str(path or Config.WAKE_WORD_TEMPLATES_FILE), *templates)
+    return len(templates)
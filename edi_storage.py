@@ -0,0 +1,1175 @@
+"""
+E.D.I - Local storage: conversation history, response caches, knowledge and file indexes
+"""
+
+import os
+import json
+import re
+import sqlite3
+import gzip
+import mmap
+import hashlib
+import queue
+import atexit
+import threading
+import concurrent.futures
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from collections import OrderedDict
+
+# Optional imports
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+from edi_core import Config, Logger, Tracer
+
+
+# ============================================================================
+# CONVERSATION HISTORY
+# ============================================================================
+class ConversationHistory:
+    """SQLite-backed record of every turn with full-text recall
+    
+    Turns are queued by the voice thread and inserted in batched
+    transactions by a background writer, so recording adds no latency.
+    """
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS turns (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            text TEXT NOT NULL,
+            lang TEXT,
+            intent TEXT,
+            entity TEXT,
+            answer TEXT,
+            timings TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_turns_ts ON turns(ts)",
+        "CREATE INDEX IF NOT EXISTS idx_turns_intent_ts ON turns(intent, ts)",
+    ]
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+            text, answer, content='turns', content_rowid='id'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS turns_ai AFTER INSERT ON turns BEGIN
+            INSERT INTO turns_fts(rowid, text, answer) VALUES (new.id, new.text, new.answer);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS turns_ad AFTER DELETE ON turns BEGIN
+            INSERT INTO turns_fts(turns_fts, rowid, text, answer) VALUES ('delete', old.id, old.text, old.answer);
+        END""",
+    ]
+    
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file or Config.HISTORY_DB_FILE)
+        self.fts_enabled = False
+        self.queue = queue.Queue()
+        self._local = threading.local()
+        self._init_db()
+        self._thread = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_file), timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            try:
+                for statement in self.FTS_SCHEMA:
+                    conn.execute(statement)
+                self.fts_enabled = True
+            except sqlite3.OperationalError as e:
+                Logger.error(f"FTS5 unavailable, history search will scan: {e}")
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+    
+    def record(self, text, lang="en", intent=None, entity=None, answer=None, timings=None, ts=None):
+        """Queue a turn for writing"""
+        self.queue.put((
+            ts or time.time(), text, lang, intent,
+            entity if entity is None else str(entity),
+            answer, json.dumps(timings or {})
+        ))
+    
+    def flush(self, timeout=2.0):
+        """Wait until everything queued so far has been written"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(5)
+    
+    def _write_loop(self):
+        conn = self._connect()
+        running = True
+        while running:
+            item = self.queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + Config.HISTORY_FLUSH_INTERVAL
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= Config.HISTORY_BATCH_SIZE:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO turns (ts, text, lang, intent, entity, answer, timings) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            batch
+                        )
+                except Exception as e:
+                    Logger.error(f"Failed to write history: {e}")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+    
+    def recent(self, start_ts, end_ts, limit=10, exclude_intents=()):
+        """Turns in a time range, newest first (uses the ts index)"""
+        sql = "SELECT * FROM turns WHERE ts >= ? AND ts < ?"
+        params = [start_ts, end_ts]
+        if exclude_intents:
+            sql += f" AND intent NOT IN ({','.join('?' * len(exclude_intents))})"
+            params.extend(exclude_intents)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        return self._reader().execute(sql, params).fetchall()
+    
+    def search(self, terms, start_ts=0.0, end_ts=None, limit=10, exclude_intents=()):
+        """Full-text search over questions and answers, newest first"""
+        words = re.findall(r"\w+", terms.lower())
+        if not words:
+            return self.recent(start_ts, end_ts or time.time() + 1, limit, exclude_intents)
+        end_ts = end_ts or time.time() + 1
+        if self.fts_enabled:
+            match = " OR ".join('"' + w.replace('"', '""') + '"' for w in words)
+            sql = (
+                "SELECT t.* FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid "
+                "WHERE turns_fts MATCH ? AND t.ts >= ? AND t.ts < ?"
+            )
+            params = [match, start_ts, end_ts]
+        else:
+            sql = "SELECT * FROM turns t WHERE t.ts >= ? AND t.ts < ? AND (" + \
+                " OR ".join("t.text LIKE ?" for _ in words) + ")"
+            params = [start_ts, end_ts] + [f"%{w}%" for w in words]
+        if exclude_intents:
+            sql += f" AND t.intent NOT IN ({','.join('?' * len(exclude_intents))})"
+            params.extend(exclude_intents)
+        sql += " ORDER BY t.ts DESC LIMIT ?"
+        params.append(limit)
+        return self._reader().execute(sql, params).fetchall()
+    
+    @staticmethod
+    def parse_recall(text, now=None):
+        """Extract (label, start_ts, end_ts, topic) from a recall question"""
+        now = now or datetime.now()
+        lowered = text.lower()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        label, start, end = "in the last week", now - timedelta(days=7), now
+        
+        days = re.search(r'(?:last|past) (\d+) days', lowered)
+        if days:
+            label = f"in the last {days.group(1)} days"
+            start = now - timedelta(days=int(days.group(1)))
+        elif 'yesterday' in lowered or 'kal' in lowered.split():
+            label, start, end = "yesterday", midnight - timedelta(days=1), midnight
+        elif 'today' in lowered or 'aaj' in lowered.split():
+            label, start = "today", midnight
+        elif 'last week' in lowered:
+            week_start = midnight - timedelta(days=midnight.weekday())
+            label, start, end = "last week", week_start - timedelta(days=7), week_start
+        elif 'this week' in lowered:
+            label, start = "this week", midnight - timedelta(days=midnight.weekday())
+        elif 'last month' in lowered or 'past month' in lowered:
+            label, start = "in the last month", now - timedelta(days=30)
+        
+        topic = ""
+        match = re.search(r'\babout (.+)', lowered)
+        if match:
+            topic = re.sub(
+                r'\b(yesterday|today|this week|last week|last month|past month|'
+                r'(?:last|past) \d+ days|earlier|recently|kal|aaj)\b',
+                ' ', match.group(1)
+            )
+            topic = re.sub(r'\b(the|a|an|me|you|i|on|in)\b', ' ', topic)
+            topic = " ".join(topic.split())
+        return label, start.timestamp(), end.timestamp() + 1, topic
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+class ResponseCache:
+    """LRU memory cache in front of a SQLite store for LLM completions
+    
+    Keys combine the kind of call, normalized query text, language, model
+    and prompt version. Each kind has its own TTL, and answers to questions
+    about the present moment are never cached.
+    """
+    TIME_SENSITIVE = re.compile(
+        r"\b(today|tonight|tomorrow|yesterday|now|current|currently|latest|recent|news|"
+        r"score|price|stock|weather|time|date|this (week|month|year)|aaj|abhi)\b"
+    )
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires REAL NOT NULL,
+            used REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_responses_used ON responses(used)",
+    ]
+    
+    def __init__(self, db_file=None, memory_entries=None):
+        self.db_file = Path(db_file or Config.RESPONSE_CACHE_FILE)
+        self.memory_entries = memory_entries or Config.RESPONSE_CACHE_MEMORY_ENTRIES
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "skipped": 0}
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def normalize(text):
+        return " ".join(re.findall(r"\w+", (text or "").lower()))
+    
+    def key(self, kind, text, lang="en", *extra):
+        parts = [kind, self.normalize(text), lang, Config.GROQ_MODEL, str(Config.PROMPT_VERSION)]
+        parts.extend(str(part) for part in extra)
+        return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+    
+    def ttl_for(self, kind, text):
+        if kind != "intent" and self.TIME_SENSITIVE.search(self.normalize(text)):
+            return 0
+        return Config.RESPONSE_CACHE_TTLS.get(kind, 0)
+    
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+        Tracer.count(f"response_cache_{stat}")
+    
+    def get(self, key):
+        """Return the cached value or None; expired entries count as misses"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[1] > now:
+                self.memory.move_to_end(key)
+            else:
+                entry = None
+        if entry is not None:
+            self._count("memory_hits")
+            return entry[0]
+        
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+                conn.commit()
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._count("disk_hits")
+                return value
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache read failed: {e}")
+        self._count("misses")
+        return None
+    
+    def put(self, key, value, ttl, kind=""):
+        if ttl <= 0:
+            self._count("skipped")
+            return
+        now = time.time()
+        expires = now + ttl
+        self._remember(key, value, expires)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, expires, used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value), expires, now)
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (Config.RESPONSE_CACHE_MAX_ROWS,)
+            )
+            conn.commit()
+            self._count("stores")
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache write failed: {e}")
+    
+    def _remember(self, key, value, expires):
+        with self.lock:
+            self.memory[key] = (value, expires)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        conn = self._conn()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+    
+    def summary(self):
+        conn = self._conn()
+        now = time.time()
+        rows, live = conn.execute(
+            "SELECT COUNT(*), SUM(expires > ?) FROM responses", (now,)
+        ).fetchone()
+        with self.lock:
+            stats = dict(self.stats)
+        return {"rows": rows, "live": live or 0, **stats}
+
+
+class HashingVectorizer:
+    """Character n-gram and word features hashed into a fixed-size unit vector"""
+    def __init__(self, dim=None, ngram_range=(3, 5)):
+        self.dim = dim or Config.SEMANTIC_CACHE_DIM
+        self.ngram_range = ngram_range
+    
+    @staticmethod
+    def normalize(text):
+        text = re.sub(r"'s\b", "", (text or "").lower())
+        return " ".join(re.findall(r"\w+", text))
+    
+    def features(self, text):
+        normalized = self.normalize(text)
+        padded = f" {normalized} "
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                yield padded[i:i + n]
+        for word in normalized.split():
+            yield "w:" + word
+    
+    def transform(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self.features(text):
+            # crc32 is stable across runs, unlike hash()
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+
+class SemanticCache:
+    """Answers for near-duplicate questions, found by cosine similarity
+    
+    Vectors live in one contiguous float32 matrix so a lookup is a single
+    matrix-vector product plus a top-k partition. A hit also needs enough
+    shared content words, so questions that look alike but ask about
+    different things ("president" vs "prime minister") do not collide.
+    When full, the least recently used row is overwritten. Questions the
+    response cache treats as time-sensitive (weather, news, "today",
+    "current") are neither stored nor looked up, so paraphrases like
+    "weather in pune" / "pune mausam" are left to the weather handler.
+    """
+    def __init__(self, capacity=None, dim=None, threshold=None):
+        self.capacity = capacity or Config.SEMANTIC_CACHE_CAPACITY
+        self.vectorizer = HashingVectorizer(dim)
+        self.threshold = Config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.matrix = np.zeros((self.capacity, self.vectorizer.dim), dtype=np.float32)
+        self.expires = np.zeros(self.capacity, dtype=np.float64)
+        self.used = np.zeros(self.capacity, dtype=np.float64)
+        self.entries = [None] * self.capacity
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+    
+    @staticmethod
+    def content_words(text):
+        return set(KnowledgeIndex.query_terms(HashingVectorizer.normalize(text)))
+    
+    def lookup(self, text, lang="en", k=5):
+        """Return (answer, similarity) for the closest cached question, or (None, best similarity)"""
+        vector = self.vectorizer.transform(text)
+        words = self.content_words(text)
+        now = time.time()
+        with self.lock:
+            if not self.size:
+                self.stats["misses"] += 1
+                return None, 0.0
+            scores = self.matrix[:self.size] @ vector
+            scores[self.expires[:self.size] <= now] = -1.0
+            k = min(k, self.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            best = float(scores[top[0]])
+            for row in top:
+                score = float(scores[row])
+                if score < self.threshold:
+                    break
+                entry_lang, entry_words, answer = self.entries[row]
+                if entry_lang != lang:
+                    continue
+                union = words | entry_words
+                if union and len(words & entry_words) / len(union) < Config.SEMANTIC_CACHE_MIN_OVERLAP:
+                    continue
+                self.used[row] = now
+                self.stats["hits"] += 1
+                return answer, score
+            self.stats["misses"] += 1
+            return None, best
+    
+    def add(self, text, answer, ttl, lang="en"):
+        if ttl <= 0 or not answer:
+            return
+        vector = self.vectorizer.transform(text)
+        now = time.time()
+        with self.lock:
+            if self.size < self.capacity:
+                row = self.size
+                self.size += 1
+            else:
+                row = int(np.argmin(self.used))
+                self.stats["evictions"] += 1
+            self.matrix[row] = vector
+            self.expires[row] = now + ttl
+            self.used[row] = now
+            self.entries[row] = (lang, self.content_words(text), answer)
+
+
+# ============================================================================
+# KNOWLEDGE INDEX
+# ============================================================================
+class KnowledgeIndex:
+    """Offline article summaries in SQLite FTS5, ranked with BM25
+    
+    Summaries are bulk-imported from a dump or saved from live lookups.
+    Reads go through a memory-mapped database so warm queries avoid
+    read() calls entirely.
+    """
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE,
+            summary TEXT NOT NULL,
+            source TEXT,
+            added REAL
+        )""",
+    ]
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, summary, content='articles', content_rowid='id', tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+            INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+        END""",
+    ]
+    # An upsert, not INSERT OR REPLACE: the rows REPLACE deletes do not fire articles_ad,
+    # which would leave stale entries in the external-content FTS table
+    UPSERT = (
+        "INSERT INTO articles (title, summary, source, added) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(title) DO UPDATE SET summary = excluded.summary, source = excluded.source, added = excluded.added"
+    )
+    QUESTION_WORDS = {
+        "who", "what", "whats", "where", "when", "which", "why", "how", "is", "are", "was", "were",
+        "the", "a", "an", "of", "in", "on", "for", "to", "tell", "me", "about", "do", "does", "did",
+        "you", "know", "explain", "define", "meaning", "please", "can", "could", "give", "info",
+        "information", "kaun", "hai", "kya", "batao", "ke", "ka", "ki", "baare", "mein",
+    }
+    
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file or Config.KNOWLEDGE_DB_FILE)
+        self.fts_enabled = False
+        self._local = threading.local()
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        try:
+            for statement in self.FTS_SCHEMA:
+                conn.execute(statement)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            Logger.error(f"FTS5 unavailable, knowledge lookups will scan: {e}")
+        conn.commit()
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(Config.KNOWLEDGE_MMAP_BYTES)}")
+            self._local.conn = conn
+        return conn
+    
+    def add(self, title, summary, source="lookup"):
+        """Insert or replace one article"""
+        conn = self._conn()
+        conn.execute(self.UPSERT, (title.strip(), summary.strip(), source, time.time()))
+        conn.commit()
+    
+    def import_records(self, records, source="import", batch_size=5000):
+        """Bulk-load (title, summary) pairs in large transactions; returns the count"""
+        conn = self._conn()
+        count = 0
+        batch = []
+        
+        def flush():
+            conn.executemany(self.UPSERT, batch)
+            conn.commit()
+            batch.clear()
+        
+        now = time.time()
+        for title, summary in records:
+            if not title or not summary:
+                continue
+            batch.append((title.strip(), summary.strip(), source, now))
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        if self.fts_enabled:
+            conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+            conn.commit()
+        return count
+    
+    @classmethod
+    def query_terms(cls, text):
+        return [w for w in re.findall(r"\w+", (text or "").lower()) if w not in cls.QUESTION_WORDS]
+    
+    def lookup(self, query, sentences=2):
+        """Best-matching summary for query, or None when nothing relevant is indexed"""
+        terms = self.query_terms(query)
+        if not terms:
+            return None
+        conn = self._conn()
+        if self.fts_enabled:
+            either = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+            rows = []
+            # Titles are few and short, so try them alone before ranking whole summaries
+            for match in (f"title : ({either})", either):
+                rows = conn.execute(
+                    "SELECT a.title, a.summary FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                    "WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts, 10.0, 1.0) LIMIT 5",
+                    (match,)
+                ).fetchall()
+                if rows:
+                    break
+        else:
+            rows = conn.execute(
+                "SELECT title, summary FROM articles WHERE " + " OR ".join("title LIKE ?" for _ in terms) + " LIMIT 5",
+                [f"%{t}%" for t in terms]
+            ).fetchall()
+        
+        # Only answer when the article is about the question, not merely mentioning a word of it
+        wanted = set(terms)
+        for title, summary in rows:
+            title_words = set(re.findall(r"\w+", title.lower()))
+            if len(title_words & wanted) * 2 >= min(len(title_words), len(wanted)):
+                parts = re.split(r"(?<=[.!?])\s+", summary.strip())
+                return " ".join(parts[:sentences])
+        return None
+    
+    def summary(self):
+        conn = self._conn()
+        count = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        size = sum(p.stat().st_size for p in self.db_file.parent.glob(self.db_file.name + "*"))
+        return count, size
+
+
+def read_knowledge_dump(path):
+    """Yield (title, summary) from a JSONL file or a Wikipedia abstract XML dump (optionally .gz)"""
+    path = str(path)
+    opener = gzip.open if path.endswith(".gz") else open
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith(".xml"):
+        import xml.etree.ElementTree as ET
+        with opener(path, 'rb') as f:
+            title = None
+            for _, element in ET.iterparse(f, events=("end",)):
+                if element.tag == "title":
+                    title = (element.text or "").replace("Wikipedia: ", "", 1)
+                elif element.tag == "abstract":
+                    if title and element.text:
+                        yield title, element.text
+                elif element.tag == "doc":
+                    title = None
+                    element.clear()
+        return
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record.get("title", ""), record.get("summary") or record.get("abstract") or record.get("text", "")
+
+
+# ============================================================================
+# FILE INDEX
+# ============================================================================
+class FileIndex:
+    """Persistent filename index for voice file search
+    
+    Names live in SQLite with an FTS5 trigram index, so a query only
+    touches files that share trigrams with it. A background thread keeps
+    the index current by comparing directory mtimes: a directory is only
+    listed again when its own mtime changed, so a sweep of an unchanged
+    tree costs one stat() per directory.
+    """
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS dirs (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            parent INTEGER,
+            mtime REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent)",
+        """CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            dir INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            mtime REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS files_dir ON files(dir)",
+        # Document frequency per trigram, so fuzzy queries can skip the common ones
+        "CREATE TABLE IF NOT EXISTS grams (gram TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID",
+    ]
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+            key, content='files', content_rowid='id', tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+            INSERT INTO files_fts(rowid, key) VALUES (new.id, new.key);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+            INSERT INTO files_fts(files_fts, rowid, key) VALUES ('delete', old.id, old.key);
+        END""",
+    ]
+    
+    def __init__(self, db_file=None, roots=None):
+        self.db_file = Path(db_file or Config.FILE_INDEX_DB_FILE)
+        self.roots = [Path(r).expanduser() for r in (roots or Config.FILE_INDEX_ROOTS)] or self.default_roots()
+        self.fts_enabled = False
+        self._local = threading.local()
+        self.refresh_lock = threading.Lock()
+        self._df = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.refresh_listeners = []
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        try:
+            for statement in self.FTS_SCHEMA:
+                conn.execute(statement)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            Logger.error(f"FTS5 trigram tokenizer unavailable, file search will scan names: {e}")
+        conn.commit()
+        # A previous run's index is good enough to answer from while the first sweep runs
+        self.ready = conn.execute("SELECT 1 FROM dirs LIMIT 1").fetchone() is not None
+    
+    @staticmethod
+    def default_roots():
+        return [Path.home() / "Desktop", Path.home() / "Documents", Path.home() / "Downloads"]
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def normalize(name):
+        """Lowercase words of a name: Budget_Report-2024.xlsx becomes 'budget report 2024 xlsx'"""
+        return " ".join(re.findall(r"[^\W_]+", name.lower()))
+    
+    @staticmethod
+    def trigrams(text):
+        padded = f" {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    @staticmethod
+    def key_grams(key):
+        """Trigrams as the FTS5 trigram tokenizer sees them (no padding)"""
+        return {key[i:i + 3] for i in range(len(key) - 2)}
+    
+    def start(self, interval=None):
+        """Sweep now and then every interval seconds on a background thread"""
+        interval = interval or Config.FILE_INDEX_REFRESH_INTERVAL
+        
+        def run():
+            while not self.stop_event.is_set():
+                try:
+                    started = time.perf_counter()
+                    stats = self.refresh()
+                    if stats["added"] or stats["removed"]:
+                        Logger.info(
+                            f"File index: {stats['listed']} folders listed, +{stats['added']} "
+                            f"-{stats['removed']} files in {time.perf_counter() - started:.1f}s"
+                        )
+                except Exception as e:
+                    Logger.error(f"File index refresh failed: {e}")
+                for listener in self.refresh_listeners:
+                    try:
+                        listener()
+                    except Exception as e:
+                        Logger.error(f"File index listener failed: {e}")
+                self.stop_event.wait(interval)
+        
+        self.thread = threading.Thread(target=run, name="file-index", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def refresh(self):
+        """Bring the index up to date with the roots; returns sweep counters"""
+        stats = {"dirs": 0, "listed": 0, "added": 0, "removed": 0}
+        with self.refresh_lock:
+            conn = self._conn()
+            self._df = {}
+            roots = [str(root) for root in self.roots]
+            for dir_id, path in conn.execute("SELECT id, path FROM dirs WHERE parent IS NULL").fetchall():
+                if path not in roots:
+                    self._drop_dir(conn, dir_id, stats)
+            
+            stack = [(root, None) for root in roots]
+            while stack:
+                path, parent = stack.pop()
+                stats["dirs"] += 1
+                row = conn.execute("SELECT id, mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    if row:
+                        self._drop_dir(conn, row[0], stats)
+                    continue
+                if row and row[1] == mtime:
+                    stack.extend((child, row[0]) for (child,) in
+                                 conn.execute("SELECT path FROM dirs WHERE parent = ?", (row[0],)))
+                    continue
+                
+                if row is None:
+                    dir_id = conn.execute("INSERT INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+                                          (path, parent, mtime)).lastrowid
+                else:
+                    dir_id = row[0]
+                    conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (mtime, dir_id))
+                files, subdirs = self._list_dir(path)
+                
+                known = dict(conn.execute("SELECT name, id FROM files WHERE dir = ?", (dir_id,)))
+                removed = [(name, file_id) for name, file_id in known.items() if name not in files]
+                added = [(dir_id, name, self.normalize(name), file_mtime)
+                         for name, file_mtime in files.items() if name not in known]
+                for name, _ in removed:
+                    self._count_grams(self.normalize(name), -1)
+                for _, _, key, _ in added:
+                    self._count_grams(key, 1)
+                conn.executemany("DELETE FROM files WHERE id = ?", [(file_id,) for _, file_id in removed])
+                conn.executemany("INSERT INTO files (dir, name, key, mtime) VALUES (?, ?, ?, ?)", added)
+                stats["removed"] += len(removed)
+                stats["added"] += len(added)
+                
+                for child_id, child in conn.execute("SELECT id, path FROM dirs WHERE parent = ?", (dir_id,)).fetchall():
+                    if child not in subdirs:
+                        self._drop_dir(conn, child_id, stats)
+                stack.extend((child, dir_id) for child in subdirs)
+                stats["listed"] += 1
+                # Let searches see a first build as it progresses
+                if stats["listed"] % 500 == 0:
+                    self._flush_grams(conn)
+                    conn.commit()
+            self._flush_grams(conn)
+            conn.commit()
+            self.ready = True
+        return stats
+    
+    @staticmethod
+    def _list_dir(path):
+        files, subdirs = {}, set()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in Config.FILE_INDEX_SKIP_DIRS:
+                                subdirs.add(entry.path)
+                        elif entry.is_file():
+                            files[entry.name] = entry.stat().st_mtime
+                    except OSError:
+                        continue
+        except OSError as e:
+            Logger.debug(f"File index cannot list {path}: {e}")
+        return files, subdirs
+    
+    def _count_grams(self, key, delta):
+        for gram in self.key_grams(key):
+            self._df[gram] = self._df.get(gram, 0) + delta
+    
+    def _flush_grams(self, conn):
+        conn.executemany(
+            "INSERT INTO grams (gram, df) VALUES (?, ?) ON CONFLICT(gram) DO UPDATE SET df = df + excluded.df",
+            [(gram, delta) for gram, delta in self._df.items() if delta]
+        )
+        self._df = {}
+    
+    def _drop_dir(self, conn, dir_id, stats):
+        subtree = [row[0] for row in conn.execute(
+            "WITH RECURSIVE sub(id) AS (SELECT ? UNION ALL SELECT d.id FROM dirs d JOIN sub ON d.parent = sub.id) "
+            "SELECT id FROM sub", (dir_id,)
+        )]
+        for sub_id in subtree:
+            for (key,) in conn.execute("SELECT key FROM files WHERE dir = ?", (sub_id,)).fetchall():
+                self._count_grams(key, -1)
+            stats["removed"] += conn.execute("DELETE FROM files WHERE dir = ?", (sub_id,)).rowcount
+            conn.execute("DELETE FROM dirs WHERE id = ?", (sub_id,))
+    
+    def search(self, term, max_results=5):
+        """Best-matching paths for a spoken file name, most relevant first"""
+        query = self.normalize(term)
+        if not query:
+            return []
+        conn = self._conn()
+        limit = Config.FILE_INDEX_CANDIDATES
+        select = "SELECT f.id, d.path, f.name, f.key, f.mtime FROM files f JOIN dirs d ON d.id = f.dir "
+        rows = {}
+        if self.fts_enabled and len(query) >= 3:
+            # Exact substrings, shortest names first (closest to what was said)
+            for row in conn.execute(
+                select + "WHERE f.id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ?) ORDER BY length(f.key) LIMIT ?",
+                ('"' + query.replace('"', '""') + '"', limit)
+            ):
+                rows[row[0]] = row
+            if not rows:
+                # Misheard names: rank by the query's rarest trigrams; common ones would match half the tree
+                grams = sorted(self.key_grams(query))
+                df = dict(conn.execute(
+                    f"SELECT gram, df FROM grams WHERE gram IN ({', '.join('?' * len(grams))})", grams
+                ).fetchall())
+                present = sorted((g for g in grams if df.get(g, 0) > 0), key=lambda g: df[g])
+                rare = [g for g in present if df[g] <= limit * 10] or present[:3]
+                if rare:
+                    either = " OR ".join('"' + g.replace('"', '""') + '"' for g in rare)
+                    for row in conn.execute(
+                        select + "WHERE f.id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ? ORDER BY rank LIMIT ?)",
+                        (either, limit)
+                    ):
+                        rows[row[0]] = row
+        else:
+            for row in conn.execute(select + "WHERE f.key LIKE ? LIMIT ?", (f"%{query}%", limit)):
+                rows[row[0]] = row
+        
+        wanted = self.trigrams(query)
+        now = time.time()
+        scored = []
+        for _, directory, name, key, mtime in rows.values():
+            score = len(wanted & self.trigrams(key)) / len(wanted)
+            if query in key:
+                score += 1.0 + (0.25 if key.startswith(query) else 0.0)
+            elif score < Config.FILE_INDEX_MIN_SCORE:
+                continue
+            # Prefer names close to what was said, then recently touched files
+            score += 0.25 * len(query) / max(len(key), len(query))
+            if mtime and now - mtime < 30 * 86400:
+                score += 0.1
+            scored.append((score, directory, name))
+        scored.sort(key=lambda item: -item[0])
+        return [Path(directory) / name for _, directory, name in scored[:max_results]]
+    
+    def paths(self, extensions=None):
+        """Every indexed file path, optionally only those with the given extensions"""
+        rows = self._conn().execute("SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir").fetchall()
+        return [os.path.join(directory, name) for directory, name in rows
+                if not extensions or os.path.splitext(name)[1].lower() in extensions]
+    
+    def summary(self):
+        conn = self._conn()
+        files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        dirs = conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+        size = sum(p.stat().st_size for p in self.db_file.parent.glob(self.db_file.name + "*"))
+        return files, dirs, size
+
+
+def extract_document_text(job):
+    """(path, max_file_bytes, max_text_bytes) -> (path, plain text or None); runs in worker processes"""
+    path, max_file_bytes, max_text_bytes = job
+    try:
+        size = os.path.getsize(path)
+        if not size or size > max_file_bytes:
+            return path, None
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix in (".docx", ".odt"):
+            import zipfile
+            import html
+            member = "word/document.xml" if suffix == ".docx" else "content.xml"
+            with zipfile.ZipFile(path) as archive:
+                with archive.open(member) as f:
+                    raw = f.read(max_text_bytes * 4).decode('utf-8', 'replace')
+            raw = re.sub(r"</(?:w:p|text:p|text:h)>", "\n", raw)
+            text = html.unescape(re.sub(r"<[^>]+>", "", raw))
+        else:
+            with open(path, 'rb') as f:
+                # Map instead of read so oversized files only fault in the prefix we index
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if mapped.find(b"\0", 0, 4096) != -1:
+                        return path, None
+                    data = mapped[:max_text_bytes]
+            text = data.decode('utf-8', 'replace')
+            if suffix in (".html", ".htm", ".xml"):
+                text = re.sub(r"<[^>]+>", " ", text)
+        text = " ".join(text.split())[:max_text_bytes]
+        return path, text or None
+    except Exception:
+        return path, None
+
+
+class ContentIndex:
+    """Full-text index over the contents of documents in the file index
+    
+    Text is pulled out in a process pool (memory-mapped reads, size caps)
+    and stored in an SQLite FTS5 inverted index. Each refresh only
+    re-reads files whose size or mtime changed since the last one.
+    Without FTS5 the text goes into a plain table that is scanned.
+    """
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS docs (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            mtime REAL,
+            size INTEGER
+        )""",
+    ]
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+            name, body, tokenize='porter unicode61'
+        )""",
+    ]
+    PLAIN_SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS docs_text (id INTEGER PRIMARY KEY, name TEXT, body TEXT)",
+    ]
+    STOP_WORDS = KnowledgeIndex.QUESTION_WORDS | {
+        "find", "search", "look", "show", "open", "my", "any", "all", "document", "documents", "file", "files",
+        "note", "notes", "that", "which", "mentions", "mention", "mentioning", "mentioned", "contains",
+        "contain", "containing", "with", "word", "words", "text", "says", "say", "talks", "talk", "inside",
+        "has", "have", "for", "where", "i", "wrote",
+    }
+    
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file or Config.CONTENT_INDEX_DB_FILE)
+        self._local = threading.local()
+        self.refresh_lock = threading.Lock()
+        self.fts_enabled = False
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        try:
+            for statement in self.FTS_SCHEMA:
+                conn.execute(statement)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            Logger.error(f"FTS5 unavailable, content search will scan: {e}")
+            for statement in self.PLAIN_SCHEMA:
+                conn.execute(statement)
+        self.text_table = "docs_fts" if self.fts_enabled else "docs_text"
+        conn.commit()
+        self.ready = conn.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is not None
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _extract(self, paths, workers=None):
+        jobs = [(path, Config.CONTENT_INDEX_MAX_FILE_BYTES, Config.CONTENT_INDEX_MAX_TEXT_BYTES) for path in paths]
+        workers = workers or Config.CONTENT_INDEX_WORKERS or os.cpu_count() or 1
+        if workers <= 1 or len(jobs) < Config.CONTENT_INDEX_POOL_MIN:
+            yield from map(extract_document_text, jobs)
+            return
+        # Processes, since markup stripping and decoding hold the GIL
+        chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(extract_document_text, jobs, chunksize=chunksize)
+    
+    def refresh(self, paths, workers=None):
+        """Index new and changed files among paths and forget missing ones; returns counters"""
+        stats = {"checked": 0, "indexed": 0, "unreadable": 0, "removed": 0, "bytes": 0}
+        with self.refresh_lock:
+            conn = self._conn()
+            known = {path: (doc_id, mtime, size) for doc_id, path, mtime, size in
+                     conn.execute("SELECT id, path, mtime, size FROM docs")}
+            seen = set()
+            changed = {}
+            for path in paths:
+                if os.path.splitext(path)[1].lower() not in Config.CONTENT_INDEX_EXTENSIONS:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+                stats["checked"] += 1
+                old = known.get(path)
+                if old is None or old[1] != st.st_mtime or old[2] != st.st_size:
+                    changed[path] = (st.st_mtime, st.st_size)
+            
+            for path, (doc_id, _, _) in known.items():
+                if path not in seen:
+                    conn.execute(f"DELETE FROM {self.text_table} WHERE rowid = ?", (doc_id,))
+                    conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+                    stats["removed"] += 1
+            
+            for path, text in self._extract(list(changed), workers):
+                mtime, size = changed[path]
+                old = known.get(path)
+                if old is None:
+                    doc_id = conn.execute("INSERT INTO docs (path, mtime, size) VALUES (?, ?, ?)",
+                                          (path, mtime, size)).lastrowid
+                else:
+                    doc_id = old[0]
+                    conn.execute(f"DELETE FROM {self.text_table} WHERE rowid = ?", (doc_id,))
+                    conn.execute("UPDATE docs SET mtime = ?, size = ? WHERE id = ?", (mtime, size, doc_id))
+                # Unreadable files keep their docs row so they are not retried until they change
+                if text:
+                    conn.execute(f"INSERT INTO {self.text_table} (rowid, name, body) VALUES (?, ?, ?)",
+                                 (doc_id, FileIndex.normalize(os.path.basename(path)), text))
+                    stats["indexed"] += 1
+                    stats["bytes"] += size
+                else:
+                    stats["unreadable"] += 1
+                if (stats["indexed"] + stats["unreadable"]) % 500 == 0:
+                    conn.commit()
+            conn.commit()
+            self.ready = True
+        return stats
+    
+    @classmethod
+    def query_terms(cls, text):
+        return [w for w in re.findall(r"\w+", (text or "").lower()) if w not in cls.STOP_WORDS]
+    
+    def search(self, query, limit=None):
+        """Ranked (path, snippet) pairs for documents mentioning the query's words"""
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+        conn = self._conn()
+        if not self.fts_enabled:
+            return self._scan(conn, terms, limit or Config.CONTENT_INDEX_RESULTS)
+        quoted = ['"' + t.replace('"', '""') + '"' for t in terms]
+        # Every word first; any word only when no document has them all
+        for match in dict.fromkeys([" AND ".join(quoted), " OR ".join(quoted)]):
+            rows = conn.execute(
+                "SELECT d.path, snippet(docs_fts, 1, '', '', '...', 16) FROM docs_fts "
+                "JOIN docs d ON d.id = docs_fts.rowid WHERE docs_fts MATCH ? "
+                "ORDER BY bm25(docs_fts, 5.0, 1.0) LIMIT ?",
+                (match, limit or Config.CONTENT_INDEX_RESULTS)
+            ).fetchall()
+            if rows:
+                return [(Path(path), snippet) for path, snippet in rows]
+        return []
+    
+    @staticmethod
+    def _scan(conn, terms, limit):
+        """Substring search over the plain text table, used without FTS5"""
+        for joiner in dict.fromkeys([" AND ", " OR "]):
+            rows = conn.execute(
+                "SELECT d.path, t.body FROM docs_text t JOIN docs d ON d.id = t.id WHERE "
+                + joiner.join("(t.body LIKE ? OR t.name LIKE ?)" for _ in terms) + " LIMIT ?",
+                [f"%{t}%" for t in terms for _ in range(2)] + [limit]
+            ).fetchall()
+            if rows:
+                results = []
+                for path, body in rows:
+                    words = body.split()
+                    lowered = [w.lower() for w in words]
+                    first = next((i for i, w in enumerate(lowered) if any(t in w for t in terms)), 0)
+                    start = max(0, first - 8)
+                    snippet = " ".join(words[start:start + 16])
+                    results.append((Path(path), ("..." if start else "") + snippet
+                                    + ("..." if start + 16 < len(words) else "")))
+                return results
+        return []
+    
+    def summary(self):
+        conn = self._conn()
+        docs = conn.execute(f"SELECT COUNT(*) FROM {self.text_table}").fetchone()[0]
+        size = sum(p.stat().st_size for p in self.db_file.parent.glob(self.db_file.name + "*"))
+        return docs, size
+
+
+def walk_search(roots, term, max_results=5):
+    """Substring search by walking the roots; used until the file index is ready"""
+    matches = []
+    for base in roots:
+        if not base.exists():
+            continue
+        try:
+            for root, _, files in os.walk(base):
+                for filename in files:
+                    if term in filename.lower():
+                        matches.append(Path(root) / filename)
+                        if len(matches) >= max_results:
+                            return matches
+        except Exception as e:
+            Logger.error(f"File search error in {base}: {e}")
+    return matches
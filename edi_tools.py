@@ -0,0 +1,981 @@
+"""
+E.D.I - Benchmarks and command-line tools
+"""
+
+import os
+import json
+import shutil
+import ssl
+import tempfile
+import threading
+import itertools
+import random
+import time
+import argparse
+import subprocess
+import http.server
+from pathlib import Path
+
+# Core imports
+import speech_recognition as sr
+from groq import Groq
+
+# Optional imports
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except:
+    HTTPX_AVAILABLE = False
+
+from edi_core import Config, trace_report, percentile
+from edi_storage import (
+    NUMPY_AVAILABLE, ResponseCache, HashingVectorizer, SemanticCache, KnowledgeIndex,
+    read_knowledge_dump, FileIndex, ContentIndex, walk_search,
+)
+from edi_speech import (
+    LANGDETECT_AVAILABLE, TTSEngine, STTEngine, GoogleBackend, FileBackend, FileAudioSource,
+    chunk_rms, langdetect_language, LanguageDetector, WakeWordDetector, read_wav_samples, enroll_wake_word,
+)
+from edi_llm import IntentClassifier, AIAssistant, ConversationContext, estimate_tokens
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / float(len(ref))
+
+
+def benchmark_stt(directory, backend):
+    """Run recorded utterances through the STT pipeline without a microphone"""
+    Config.PERSISTENT_MIC = False
+    Config.STT_BACKEND = backend
+    Config.STT_FILE_DIR = Path(directory)
+    stt = STTEngine()
+    if not isinstance(stt.mic, FileAudioSource):
+        stt.mic = FileAudioSource(directory)
+    files = list(stt.mic.files)
+    if not files:
+        return f"No .wav files found in {directory}"
+    
+    first_partial = []
+    stt.partial_listeners.append(lambda text: first_partial.append(time.perf_counter()))
+    lines = [f"{'file':<32}{'latency ms':>12}{'1st partial':>13}{'WER':>7}  transcript"]
+    latencies, errors = [], []
+    for path in files:
+        first_partial.clear()
+        started = time.perf_counter()
+        text, _ = stt.listen()
+        latency = (time.perf_counter() - started) * 1000
+        partial = f"{(first_partial[0] - started) * 1000:.0f}" if first_partial else "-"
+        expected = FileBackend.transcript_for(path)
+        wer = word_error_rate(expected, text) if expected else float("nan")
+        latencies.append(latency)
+        if expected:
+            errors.append(wer)
+        lines.append(f"{path.name[:31]:<32}{latency:>12.1f}{partial:>13}{wer:>7.2f}  {text}")
+    latencies.sort()
+    lines.append("")
+    lines.append(
+        f"backend={stt.backend.name} files={len(files)} "
+        f"p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+        f"mean WER={sum(errors) / len(errors) if errors else float('nan'):.3f}"
+    )
+    return "\n".join(lines)
+
+
+class StandInRecognitionServer:
+    """Local HTTP stand-in for the Google v2 endpoint with a throttled uplink"""
+    def __init__(self, uplink_kbps=256, transcript="stand in transcript"):
+        self.received = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = b""
+                while len(body) < length:
+                    block = self.rfile.read(min(4096, length - len(body)))
+                    if not block:
+                        break
+                    body += block
+                    if uplink_kbps:
+                        time.sleep(len(block) * 8 / (uplink_kbps * 1000.0))
+                server.received.append(len(body))
+                payload = json.dumps({"result": [{"alternative": [{"transcript": transcript, "confidence": 0.9}]}]})
+                data = ('{"result":[]}\n' + payload + "\n").encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/speech-api/v2/recognize"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.httpd.shutdown()
+
+
+class StandInLLMServer:
+    """Local HTTPS stand-in for the Groq chat API with simulated network delay
+    
+    A self-signed certificate is generated with openssl. Each new
+    connection pays handshake_ms before it is served and every request
+    pays request_ms, so connection reuse shows up in the timings. Faults
+    can be injected: error_rate of requests fail with error_status and
+    slow_rate of requests take an extra slow_ms.
+    """
+    def __init__(self, handshake_ms=120, request_ms=60, content="OK.",
+                 error_rate=0.0, error_status=429, slow_rate=0.0, slow_ms=0, seed=7):
+        self.tmpdir = tempfile.mkdtemp(prefix="edi-standin-")
+        self.cert_file = os.path.join(self.tmpdir, "cert.pem")
+        key_file = os.path.join(self.tmpdir, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-keyout", key_file, "-out", self.cert_file, "-subj", "/CN=localhost",
+             "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+            check=True, capture_output=True
+        )
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        rng = random.Random(seed)
+        rng_lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def setup(self):
+                super().setup()
+                server.connections += 1
+                time.sleep(handshake_ms / 1000.0)
+            
+            def _reply(self, payload):
+                server.requests += 1
+                with rng_lock:
+                    fail = rng.random() < server.error_rate
+                    slow = rng.random() < server.slow_rate
+                time.sleep((request_ms + (slow_ms if slow else 0)) / 1000.0)
+                status = 200
+                if fail:
+                    server.errors += 1
+                    status = error_status
+                    payload = {"error": {"message": "injected failure", "type": "standin"}}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                self._reply({"object": "list", "data": []})
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                self._reply({
+                    "id": "standin", "object": "chat.completion", "created": int(time.time()),
+                    "model": body.get("model", ""),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                })
+            
+            def log_message(self, *args):
+                pass
+        
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file, key_file)
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        # Clients that hit their deadline hang up mid-reply; that is expected here
+        self.httpd.handle_error = lambda request, client_address: None
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.url = f"https://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def benchmark_llm_connection(requests_count=10, handshake_ms=120, request_ms=60):
+    """Compare a fresh connection per request with the warm keep-alive pool"""
+    if not HTTPX_AVAILABLE:
+        return "The connection pool needs httpx: pip install httpx"
+    server = StandInLLMServer(handshake_ms, request_ms)
+    Config.GROQ_BASE_URL = server.url
+    Config.GROQ_CA_BUNDLE = server.cert_file
+    Config.RESPONSE_CACHE_ENABLED = False
+    messages = [{"role": "user", "content": "ping"}]
+    
+    def timed(ai):
+        started = time.perf_counter()
+        ai.groq_client.chat.completions.create(model=Config.GROQ_MODEL, messages=messages, max_tokens=5)
+        return (time.perf_counter() - started) * 1000
+    
+    try:
+        Config.ensure_dirs()
+        ai = AIAssistant()
+        cold = []
+        for _ in range(requests_count):
+            ai.close()
+            ai._init_groq()
+            cold.append(timed(ai))
+        cold_connections = server.connections
+        
+        ai.close()
+        ai._init_groq()
+        warm_ms = ai.warm_up() or 0.0
+        pooled = [timed(ai) for _ in range(requests_count)]
+        pooled_connections = server.connections - cold_connections
+        ai.close()
+    finally:
+        server.close()
+    
+    steady = sorted(pooled[1:]) or pooled
+    lines = [
+        f"Local HTTPS stand-in: {handshake_ms} ms per new connection, {request_ms} ms per request",
+        f"{'mode':<28}{'first ms':>10}{'p50 ms':>10}{'conns':>7}",
+        f"{'new connection per request':<28}{cold[0]:>10.0f}{percentile(sorted(cold), 50):>10.0f}{cold_connections:>7}",
+        f"{'warm pool':<28}{pooled[0]:>10.0f}{percentile(steady, 50):>10.0f}{pooled_connections:>7}",
+        f"Pre-connection took {warm_ms:.0f} ms off the critical path",
+    ]
+    return "\n".join(lines)
+
+
+def benchmark_llm_resilience(requests_count=30, error_rate=0.2, slow_rate=0.1, slow_ms=4000, interval=0.3, error_status=500):
+    """Compare plain SDK calls with the resilience layer against a faulty stand-in"""
+    if not HTTPX_AVAILABLE:
+        return "The stand-in benchmark needs httpx: pip install httpx"
+    server = StandInLLMServer(handshake_ms=20, request_ms=80, error_rate=error_rate, error_status=error_status,
+                              slow_rate=slow_rate, slow_ms=slow_ms)
+    Config.GROQ_BASE_URL = server.url
+    Config.GROQ_CA_BUNDLE = server.cert_file
+    Config.RESPONSE_CACHE_ENABLED = False
+    Config.LLM_HEDGE_ENABLED = True
+    Config.LLM_BREAKER_RESET = 2.0
+    Config.LLM_RATE_PER_SECOND = max(Config.LLM_RATE_PER_SECOND, 2.0 / interval)
+    request = {"model": Config.GROQ_MODEL, "messages": [{"role": "user", "content": "ping"}], "max_tokens": 5}
+    
+    def run(call):
+        latencies, fallbacks = [], 0
+        for _ in range(requests_count):
+            started = time.perf_counter()
+            try:
+                call()
+            except Exception:
+                fallbacks += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(interval)
+        return sorted(latencies), fallbacks
+    
+    try:
+        plain_http = httpx.Client(verify=server.cert_file)
+        plain = Groq(api_key="standin", base_url=server.url, http_client=plain_http)
+        plain_result = run(lambda: plain.chat.completions.create(**request))
+        plain_http.close()
+        
+        Config.ensure_dirs()
+        ai = AIAssistant()
+        gateway_result = run(lambda: ai.llm.create("intent", **request))
+        stats = dict(ai.llm.stats)
+        ai.close()
+    finally:
+        server.close()
+    
+    lines = [
+        f"Stand-in: {error_rate:.0%} errors ({error_status}), {slow_rate:.0%} slow by {slow_ms} ms, {requests_count} calls each",
+        f"{'client':<22}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'fallbacks':>11}",
+    ]
+    for name, (latencies, fallbacks) in (("SDK defaults", plain_result), ("resilience layer", gateway_result)):
+        lines.append(
+            f"{name:<22}{percentile(latencies, 50):>9.0f}{percentile(latencies, 95):>9.0f}"
+            f"{latencies[-1]:>9.0f}{fallbacks:>11}"
+        )
+    lines.append(
+        f"Gateway: {stats['short_circuits']} short-circuited, {stats['rate_limited']} rate limited, "
+        f"{stats['retries']} retried, {stats['hedges']} hedged ({stats['hedge_wins']} hedge wins), "
+        f"{stats['failures']} failed calls"
+    )
+    return "\n".join(lines)
+
+
+def benchmark_stt_payload(directory, uplink_kbps):
+    """Compare raw and compacted uploads against a local stand-in endpoint"""
+    files = sorted(Path(directory).glob("*.wav"))
+    if not files:
+        return f"No .wav files found in {directory}"
+    server = StandInRecognitionServer(uplink_kbps)
+    Config.GOOGLE_STT_ENDPOINT = server.url
+    backend = GoogleBackend(sr.Recognizer())
+    lines = [f"{'file':<28}{'raw bytes':>11}{'sent bytes':>12}{'raw ms':>9}{'compact ms':>12}"]
+    totals = [0, 0, 0.0, 0.0]
+    try:
+        for path in files:
+            source = FileAudioSource(directory)
+            source.files = [path]
+            audio = source.capture(None, None, None)
+            
+            started = time.perf_counter()
+            backend._post(audio.get_flac_data(), audio.sample_rate)
+            raw_ms = (time.perf_counter() - started) * 1000
+            raw_bytes = server.received[-1]
+            
+            started = time.perf_counter()
+            backend.recognize(audio)
+            compact_ms = (time.perf_counter() - started) * 1000
+            sent = server.received[-1]
+            totals = [totals[0] + raw_bytes, totals[1] + sent, totals[2] + raw_ms, totals[3] + compact_ms]
+            lines.append(f"{path.name[:27]:<28}{raw_bytes:>11}{sent:>12}{raw_ms:>9.0f}{compact_ms:>12.0f}")
+    finally:
+        server.close()
+    lines.append("")
+    lines.append(
+        f"uplink {uplink_kbps} kbps: sent {totals[1]} of {totals[0]} bytes "
+        f"({100.0 * totals[1] / max(1, totals[0]):.0f}%), "
+        f"request time {totals[3]:.0f} ms vs {totals[2]:.0f} ms"
+    )
+    return "\n".join(lines)
+
+
+def benchmark_wake_word(wav_file, events, templates_file=None):
+    """Measure detector CPU and detection latency on a recorded stream
+    
+    events are the times (seconds) at which each spoken wake word ends.
+    """
+    templates = WakeWordDetector.load_templates(templates_file)
+    if not templates:
+        return "No wake word templates; run wakeword-enroll first"
+    samples, rate = read_wav_samples(wav_file)
+    raw = samples.tobytes()
+    chunk = int(rate * Config.MIC_CHUNK / float(Config.MIC_SAMPLE_RATE))
+    chunk_seconds = chunk / float(rate)
+    detector = WakeWordDetector(templates, rate, chunk_seconds)
+    step = chunk * 2
+    energies = [chunk_rms(raw[i:i + step], 2) for i in range(0, len(raw) - step + 1, step)]
+    threshold = max(Config.MIC_MIN_ENERGY, percentile(sorted(energies), 20) * Config.MIC_ENERGY_RATIO)
+    
+    detections = []
+    cpu_started = time.thread_time()
+    for index in range(len(energies)):
+        chunk = raw[index * step:(index + 1) * step]
+        if detector.process_chunk(chunk, chunk_rms(chunk, 2), threshold):
+            detections.append(detector.audio_time)
+    cpu_total = time.thread_time() - cpu_started
+    duration = len(energies) * chunk_seconds
+    
+    latencies, matched = [], set()
+    for event in events:
+        hits = [d for d in detections if event <= d <= event + 2.0 and d not in matched]
+        if hits:
+            matched.add(hits[0])
+            latencies.append((hits[0] - event) * 1000)
+    latencies.sort()
+    gated = (cpu_total - detector.cpu_used) / duration * 100 if duration else 0.0
+    return "\n".join([
+        f"audio {duration:.1f}s, {len(events)} wake words, {len(detections)} detections, "
+        f"{len(latencies)} hits, {len(detections) - len(matched)} false alarms, {detector.skipped} skipped (budget)",
+        f"CPU: {cpu_total / duration * 100 if duration else 0:.2f}% of one core overall, "
+        f"{gated:.2f}% for the energy gate alone (budget {Config.WAKE_WORD_CPU_BUDGET * 100:.1f}%)",
+        f"detection latency after wake word ends: p50={percentile(latencies, 50):.0f}ms "
+        f"p95={percentile(latencies, 95):.0f}ms",
+    ])
+
+
+LANGUAGE_BENCH_SAMPLES = [
+    ("open youtube", "en"),
+    ("what is the weather today", "en"),
+    ("send an email to my manager", "en"),
+    ("play some music", "en"),
+    ("search for quarterly report", "en"),
+    ("who is the prime minister of india", "en"),
+    ("mujhe gaana bajao", "hi"),
+    ("aaj mausam kaisa hai", "hi"),
+    ("youtube kholo yaar", "hi"),
+    ("mujhe batao time kya hai", "hi"),
+    ("मुझे क्या करना चाहिए", "hi"),
+    ("आज मौसम कैसा है", "hi"),
+    ("यूट्यूब खोलो", "hi"),
+    ("मला गाणे लाव", "mr"),
+    ("आज हवामान कसे आहे", "mr"),
+    ("तुम्ही काय करत आहात", "mr"),
+    ("mala gaana lav", "mr"),
+    ("aata kiti vajle aahe", "mr"),
+    ("તમે કેમ છો", "gu"),
+    ("આજે હવામાન કેવું છે", "gu"),
+    ("kem cho tame", "gu"),
+    ("shu chhe aaje", "gu"),
+    ("ਤੁਸੀਂ ਕਿਵੇਂ ਹੋ", "pa"),
+    ("ਅੱਜ ਮੌਸਮ ਕਿਹੋ ਜਿਹਾ ਹੈ", "pa"),
+    ("tusi kiddan ho", "pa"),
+    ("mainu gaana suna do kithe hai", "pa"),
+]
+
+
+def benchmark_language(samples_file=None, rounds=20):
+    """Compare accuracy and per-call cost of langdetect and the script detector"""
+    samples = LANGUAGE_BENCH_SAMPLES
+    if samples_file:
+        samples = []
+        with open(samples_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    samples.append((record["text"], record["lang"]))
+    
+    def measure(detect_fn):
+        correct = sum(1 for text, lang in samples if detect_fn(text) == lang)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for text, _ in samples:
+                detect_fn(text)
+        per_call = (time.perf_counter() - started) / (rounds * len(samples)) * 1e6
+        return correct, per_call
+    
+    fresh = LanguageDetector(memo_size=0)
+    memoized = LanguageDetector()
+    rows = [("langdetect", measure(langdetect_language))]
+    rows.append(("script (no memo)", measure(fresh.detect)))
+    rows.append(("script (memoized)", measure(memoized.detect)))
+    
+    lines = [f"{len(samples)} samples, {rounds} timed rounds"]
+    if not LANGDETECT_AVAILABLE:
+        lines.append("langdetect is not installed; its row always answers 'en'")
+    lines.append(f"{'detector':<20}{'accuracy':>10}{'us/call':>10}")
+    for name, (correct, per_call) in rows:
+        lines.append(f"{name:<20}{100.0 * correct / len(samples):>9.0f}%{per_call:>10.1f}")
+    lines.append(f"langdetect fallbacks: {fresh.fallbacks // (rounds + 1)} of {len(samples)} samples")
+    return "\n".join(lines)
+
+
+def evaluate_intents(corpus_file=None, threshold=None, rounds=50):
+    """Score the local classifier on a labeled corpus of utterances"""
+    corpus_file = corpus_file or Path(__file__).with_name("intent_corpus.jsonl")
+    threshold = Config.LOCAL_INTENT_THRESHOLD if threshold is None else threshold
+    samples = []
+    with open(corpus_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record["text"], record["intent"]))
+    if not samples:
+        return f"No samples in {corpus_file}"
+    
+    classifier = IntentClassifier()
+    top1 = 0
+    local = 0
+    local_correct = 0
+    misroutes = []
+    for text, expected in samples:
+        result = classifier.classify(text)
+        top1 += result["intent"] == expected
+        if result["confidence"] >= threshold:
+            local += 1
+            if result["intent"] == expected:
+                local_correct += 1
+            else:
+                misroutes.append(f"  {text!r}: expected {expected}, got {result['intent']} ({result['confidence']})")
+    
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in samples:
+            classifier.classify(text)
+    per_call = (time.perf_counter() - started) / (rounds * len(samples)) * 1e6
+    
+    lines = [
+        f"{len(samples)} utterances from {corpus_file}, threshold {threshold}",
+        f"Skipped the network:  {local} ({100.0 * local / len(samples):.0f}%)",
+        f"Accuracy when local:  {100.0 * local_correct / max(1, local):.1f}%",
+        f"Top-1 accuracy (all): {100.0 * top1 / len(samples):.1f}%",
+        f"Classifier cost:      {per_call:.1f} us/call",
+    ]
+    if misroutes:
+        lines.append("Confident misroutes:")
+        lines.extend(misroutes)
+    return "\n".join(lines)
+
+
+def benchmark_context(turns=40, budget=None):
+    """Show that prompt size stays flat as a simulated session grows"""
+    context = ConversationContext(budget=budget)
+    question = "And what about the second largest city in that country, and how old is it?"
+    answer = ("The second largest city there has a long history going back many centuries, "
+              "and it is known for its markets, its river front and its universities.")
+    lines = [f"{'turn':>5}{'prompt tokens':>15}{'add us':>9}{'build us':>10}"]
+    raw_tokens = 0
+    for turn in range(1, turns + 1):
+        started = time.perf_counter()
+        messages = context.messages(question)
+        build_us = (time.perf_counter() - started) * 1e6
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        started = time.perf_counter()
+        context.add(question, answer)
+        add_us = (time.perf_counter() - started) * 1e6
+        raw_tokens += estimate_tokens(question) + estimate_tokens(answer)
+        if turn in (1, 2, 5) or turn % 10 == 0:
+            lines.append(f"{turn:>5}{prompt_tokens:>15}{add_us:>9.0f}{build_us:>10.0f}")
+    lines.append(f"Full history would have been ~{raw_tokens} tokens by turn {turns}; "
+                 f"budget {context.budget}")
+    return "\n".join(lines)
+
+
+def import_knowledge(dump_file, limit=None):
+    """Bulk-load a dump into the knowledge index and report build time and size"""
+    Config.ensure_dirs()
+    index = KnowledgeIndex()
+    records = read_knowledge_dump(dump_file)
+    if limit:
+        records = itertools.islice(records, limit)
+    started = time.perf_counter()
+    count = index.import_records(records, source=Path(dump_file).name)
+    elapsed = time.perf_counter() - started
+    total, size = index.summary()
+    return (f"Imported {count} articles in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.0f}/s); "
+            f"index holds {total} articles, {size / 1024 / 1024:.1f} MB")
+
+
+def benchmark_knowledge(articles=50000, queries=500, seed=11):
+    """Build a synthetic index and measure build time, size and lookup latency"""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "ten", "vor", "shi", "an", "del", "qu", "bri", "os", "nak", "te", "zu", "pel"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)]
+    titles = [" ".join(rng.choice(vocabulary).title() for _ in range(rng.randint(1, 3))) for _ in range(articles)]
+    
+    def generate():
+        for title in titles:
+            body = " ".join(rng.choice(vocabulary) for _ in range(40))
+            yield title, f"{title} is a {body}. It is known for {rng.choice(vocabulary)}."
+    
+    tmpdir = tempfile.mkdtemp(prefix="edi-knowledge-")
+    try:
+        index = KnowledgeIndex(Path(tmpdir) / "knowledge.db")
+        started = time.perf_counter()
+        count = index.import_records(generate(), source="synthetic")
+        build_s = time.perf_counter() - started
+        _, size = index.summary()
+        
+        latencies = []
+        found = 0
+        for title in rng.sample(titles, min(queries, len(titles))):
+            started = time.perf_counter()
+            found += index.lookup(f"who is {title}") is not None
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    
+    return "\n".join([
+        f"Built {count} articles in {build_s:.1f} s ({count / build_s:.0f}/s), {size / 1024 / 1024:.1f} MB on disk",
+        f"{len(latencies)} lookups: p50 {percentile(latencies, 50):.2f} ms, "
+        f"p95 {percentile(latencies, 95):.2f} ms, p99 {percentile(latencies, 99):.2f} ms; {found} answered",
+    ])
+
+
+def benchmark_file_search(files=100000, queries=200, walk_queries=20, seed=3):
+    """Compare the filename index with a directory walk on a synthetic tree"""
+    rng = random.Random(seed)
+    words = ["budget", "report", "invoice", "notes", "draft", "final", "summary", "photo", "scan", "resume",
+             "project", "meeting", "plan", "letter", "receipt", "contract", "slides", "thesis", "backup", "export"]
+    extensions = [".pdf", ".docx", ".xlsx", ".txt", ".jpg", ".png", ".pptx", ".csv"]
+    tmpdir = Path(tempfile.mkdtemp(prefix="edi-files-"))
+    names = []
+    try:
+        folders = []
+        for i in range(max(1, files // 50)):
+            depth = rng.randint(1, 4)
+            folder = tmpdir.joinpath(*[f"{rng.choice(words)}_{rng.randint(0, 30)}" for _ in range(depth)], f"f{i}")
+            folder.mkdir(parents=True, exist_ok=True)
+            folders.append(folder)
+        for i in range(files):
+            name = "_".join(rng.sample(words, rng.randint(1, 3))) + f"_{i}" + rng.choice(extensions)
+            (rng.choice(folders) / name).touch()
+            names.append(name)
+        
+        index = FileIndex(tmpdir / "index.db", roots=[tmpdir])
+        started = time.perf_counter()
+        index.refresh()
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        stats = index.refresh()
+        sweep_ms = (time.perf_counter() - started) * 1000
+        for folder in rng.sample(folders, 10):
+            (folder / f"new_{rng.randint(0, 10 ** 6)}.txt").touch()
+        started = time.perf_counter()
+        changed = index.refresh()
+        changed_ms = (time.perf_counter() - started) * 1000
+        indexed, dirs, size = index.summary()
+        
+        targets = rng.sample(names, min(queries, len(names)))
+        latencies = []
+        exact_top = fuzzy_top = 0
+        for name in targets:
+            spoken = FileIndex.normalize(Path(name).stem)
+            started = time.perf_counter()
+            results = index.search(spoken)
+            latencies.append((time.perf_counter() - started) * 1000)
+            exact_top += bool(results) and results[0].name == name
+            # Drop one letter to mimic a misheard word
+            cut = rng.randrange(len(spoken))
+            results = index.search(spoken[:cut] + spoken[cut + 1:])
+            fuzzy_top += any(path.name == name for path in results)
+        latencies.sort()
+        common = []
+        for word in words:
+            started = time.perf_counter()
+            index.search(word)
+            common.append((time.perf_counter() - started) * 1000)
+        common.sort()
+        
+        walk_latencies = []
+        for name in targets[:walk_queries]:
+            started = time.perf_counter()
+            walk_search([tmpdir], Path(name).stem.lower())
+            walk_latencies.append((time.perf_counter() - started) * 1000)
+        walk_latencies.sort()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    
+    return "\n".join([
+        f"Indexed {indexed} files in {dirs} folders in {build_s:.1f} s, {size / 1024 / 1024:.1f} MB on disk",
+        f"Unchanged sweep: {sweep_ms:.0f} ms ({stats['dirs']} folders stat'ed, {stats['listed']} listed); "
+        f"after 10 new files: {changed_ms:.0f} ms ({changed['listed']} listed, +{changed['added']})",
+        f"Index search:  p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms; "
+        f"exact name ranked first {exact_top}/{len(targets)}, one-letter typo found in top 5 {fuzzy_top}/{len(targets)}",
+        f"Common words:  p50 {percentile(common, 50):.2f} ms, p95 {percentile(common, 95):.2f} ms "
+        f"({len(common)} single-word queries matching ~10% of files each)",
+        f"Walk search:   p50 {percentile(walk_latencies, 50):.0f} ms, p95 {percentile(walk_latencies, 95):.0f} ms "
+        f"({len(walk_latencies)} queries, substring only)",
+    ])
+
+
+def benchmark_content_search(files=5000, queries=200, seed=7):
+    """Measure content indexing throughput, incremental refresh and query latency"""
+    import zipfile
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "ten", "vor", "shi", "an", "del", "qu", "bri", "os", "nak", "te", "zu", "pel"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(30000)]
+    # Zipf-like word frequencies, as in real text
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    tmpdir = Path(tempfile.mkdtemp(prefix="edi-content-"))
+    docs = {}
+    try:
+        for i in range(files):
+            folder = tmpdir / f"d{i % 100}"
+            folder.mkdir(exist_ok=True)
+            words = rng.choices(vocabulary, weights, k=rng.randint(300, 1500))
+            text = ". ".join(" ".join(words[j:j + 12]) for j in range(0, len(words), 12))
+            if i % 50 == 0:
+                path = folder / f"report_{i}.docx"
+                with zipfile.ZipFile(path, "w") as archive:
+                    archive.writestr("word/document.xml", f"<w:document><w:p><w:t>{text}</w:t></w:p></w:document>")
+            else:
+                path = folder / f"notes_{i}.txt"
+                path.write_text(text, encoding='utf-8')
+            docs[str(path)] = words
+        paths = list(docs)
+        cpus = os.cpu_count() or 1
+        
+        lines = []
+        for workers in sorted({1, cpus}):
+            index = ContentIndex(tmpdir / f"content_{workers}.db")
+            started = time.perf_counter()
+            stats = index.refresh(paths, workers=workers)
+            elapsed = time.perf_counter() - started
+            lines.append(
+                f"Indexed {stats['indexed']} files ({stats['bytes'] / 1024 / 1024:.1f} MB) with {workers} "
+                f"worker(s) in {elapsed:.1f} s: {stats['indexed'] / elapsed:.0f} files/s, "
+                f"{stats['bytes'] / 1024 / 1024 / elapsed:.1f} MB/s"
+            )
+        if cpus == 1:
+            lines.append("Only one CPU here, so the process pool could not be compared")
+        
+        started = time.perf_counter()
+        index.refresh(paths)
+        unchanged_ms = (time.perf_counter() - started) * 1000
+        for path in rng.sample(paths, 20):
+            with open(path, "a", encoding='utf-8') as f:
+                f.write(" appended text")
+        removed = rng.sample(paths, 5)
+        for path in removed:
+            os.remove(path)
+        remaining = [path for path in paths if path not in removed]
+        started = time.perf_counter()
+        stats = index.refresh(remaining)
+        changed_ms = (time.perf_counter() - started) * 1000
+        lines.append(f"Refresh with nothing changed: {unchanged_ms:.0f} ms; after 20 edits and 5 deletions: "
+                     f"{changed_ms:.0f} ms ({stats['indexed']} re-read, {stats['removed']} removed)")
+        
+        # People search for what sets a document apart, so ask for its two rarest words
+        df = {}
+        for words in docs.values():
+            for word in set(words):
+                df[word] = df.get(word, 0) + 1
+        latencies = []
+        found = 0
+        for path in rng.sample(remaining, min(queries, len(remaining))):
+            query = " ".join(sorted(set(docs[path]), key=lambda word: df[word])[:2])
+            started = time.perf_counter()
+            hits = index.search(f"find the document that mentions {query}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            found += any(str(hit) == path for hit, _ in hits)
+        latencies.sort()
+        count, size = index.summary()
+        lines.append(f"{len(latencies)} two-word queries over {count} documents ({size / 1024 / 1024:.1f} MB index): "
+                     f"p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms; "
+                     f"source document in the top {Config.CONTENT_INDEX_RESULTS} for {found}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return "\n".join(lines)
+
+
+SEMANTIC_BENCH_PARAPHRASES = [
+    ("who is the prime minister of india", "who is india's prime minister"),
+    ("what is the capital of france", "whats the capital of france"),
+    ("explain photosynthesis", "explain photosynthesis to me"),
+    ("what is machine learning", "what's machine learning"),
+    ("how does a rainbow form", "how do rainbows form"),
+    ("who invented the telephone", "who was the inventor of the telephone"),
+]
+SEMANTIC_BENCH_DISTINCT = [
+    ("who is the prime minister of india", "who is the president of india"),
+    ("what is the capital of france", "what is the capital of germany"),
+    ("how tall is mount everest", "how tall is the eiffel tower"),
+    ("who wrote hamlet", "who wrote macbeth"),
+]
+
+
+def benchmark_semantic_cache(sizes=(1000, 10000, 50000), queries=500, seed=5):
+    """Measure semantic-cache lookup latency as the cache grows, plus paraphrase matching"""
+    rng = random.Random(seed)
+    subjects = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9))) for _ in range(5000)]
+    templates = ["what is {}", "who is {}", "tell me about {}", "explain {} simply", "history of {}"]
+    lines = []
+    
+    started = time.perf_counter()
+    vectorizer = HashingVectorizer()
+    for _ in range(queries):
+        vectorizer.transform(rng.choice(templates).format(rng.choice(subjects)))
+    embed_ms = (time.perf_counter() - started) * 1000 / queries
+    lines.append(f"Embedding: {embed_ms:.3f} ms per query ({vectorizer.dim} dims)")
+    
+    for size in sizes:
+        cache = SemanticCache(capacity=size)
+        for _ in range(size):
+            text = rng.choice(templates).format(" ".join(rng.sample(subjects, 2)))
+            cache.add(text, text, 3600)
+        latencies = []
+        for _ in range(queries):
+            text = rng.choice(templates).format(rng.choice(subjects))
+            started = time.perf_counter()
+            cache.lookup(text)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        matrix_mb = cache.matrix.nbytes / 1024 / 1024
+        lines.append(f"{size:>7} entries ({matrix_mb:.0f} MB): p50 {percentile(latencies, 50):.2f} ms, "
+                     f"p95 {percentile(latencies, 95):.2f} ms")
+    
+    cache = SemanticCache(capacity=64)
+    for original, _ in SEMANTIC_BENCH_PARAPHRASES + SEMANTIC_BENCH_DISTINCT:
+        cache.add(original, original, 3600)
+    hits = sum(cache.lookup(p)[0] == o for o, p in SEMANTIC_BENCH_PARAPHRASES)
+    false_hits = sum(cache.lookup(d)[0] is not None for _, d in SEMANTIC_BENCH_DISTINCT)
+    lines.append(f"Paraphrases matched: {hits}/{len(SEMANTIC_BENCH_PARAPHRASES)}; "
+                 f"distinct questions wrongly matched: {false_hits}/{len(SEMANTIC_BENCH_DISTINCT)} "
+                 f"(threshold {cache.threshold})")
+    return "\n".join(lines)
+
+
+# ============================================================================
+# COMMAND-LINE TOOLS
+# ============================================================================
+def build_cli():
+    """Argument parser for the maintenance and benchmark commands"""
+    parser = argparse.ArgumentParser(prog="edi_assistant", description="E.D.I maintenance tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    report = commands.add_parser("trace-report", help="Print p50/p95/p99 latency per stage and intent")
+    report.add_argument("--file", default=None, help="Trace file (default: %(default)s)")
+    report.add_argument("--days", type=float, default=None, help="Only include the last N days")
+    
+    commands.add_parser("prerender-phrases", help="Render the fixed assistant phrases into the audio cache")
+    
+    stt_bench = commands.add_parser("stt-bench", help="Benchmark speech recognition on recorded WAV files")
+    stt_bench.add_argument("directory", help="Folder of .wav files with matching .txt transcripts")
+    stt_bench.add_argument("--backend", choices=["file", "vosk", "google"], default="file")
+    
+    payload_bench = commands.add_parser("stt-payload-bench", help="Measure compacted STT uploads against a local stand-in")
+    payload_bench.add_argument("directory", help="Folder of .wav utterances")
+    payload_bench.add_argument("--uplink-kbps", type=float, default=256, help="Simulated upload bandwidth")
+    
+    lang_bench = commands.add_parser("lang-bench", help="Compare language detectors for accuracy and speed")
+    lang_bench.add_argument("--file", default=None, help="JSONL of {\"text\", \"lang\"} samples")
+    lang_bench.add_argument("--rounds", type=int, default=20)
+    
+    intent_eval = commands.add_parser("intent-eval", help="Measure local intent accuracy and network skip rate")
+    intent_eval.add_argument("--file", default=None, help="Labeled JSONL corpus (default: intent_corpus.jsonl)")
+    intent_eval.add_argument("--threshold", type=float, default=None, help="Confidence needed to skip the LLM")
+    
+    cache_cmd = commands.add_parser("response-cache", help="Show or clear the LLM response cache")
+    cache_cmd.add_argument("--clear", action="store_true", help="Delete every cached response")
+    
+    warm_bench = commands.add_parser("llm-warm-bench", help="Measure first vs steady LLM latency with the warm pool")
+    warm_bench.add_argument("--requests", type=int, default=10)
+    warm_bench.add_argument("--handshake-ms", type=float, default=120, help="Simulated connection setup cost")
+    warm_bench.add_argument("--request-ms", type=float, default=60, help="Simulated per-request cost")
+    
+    context_bench = commands.add_parser("context-bench", help="Simulate a long session and report prompt size per turn")
+    context_bench.add_argument("--turns", type=int, default=40)
+    context_bench.add_argument("--budget", type=int, default=None, help="Token budget (default: CONTEXT_TOKEN_BUDGET)")
+    
+    resilience_bench = commands.add_parser("llm-resilience-bench", help="Exercise deadlines, breaker and hedging on a faulty stand-in")
+    resilience_bench.add_argument("--requests", type=int, default=30)
+    resilience_bench.add_argument("--error-rate", type=float, default=0.2)
+    resilience_bench.add_argument("--slow-rate", type=float, default=0.1)
+    resilience_bench.add_argument("--slow-ms", type=float, default=4000)
+    resilience_bench.add_argument("--error-status", type=int, default=500, help="429 also exercises Retry-After")
+    
+    knowledge_import = commands.add_parser("knowledge-import", help="Load article summaries into the offline index")
+    knowledge_import.add_argument("dump", help="JSONL of {title, summary} or a Wikipedia abstract XML dump (.gz ok)")
+    knowledge_import.add_argument("--limit", type=int, default=None, help="Stop after N articles")
+    
+    knowledge_bench = commands.add_parser("knowledge-bench", help="Benchmark index build and lookup on synthetic articles")
+    knowledge_bench.add_argument("--articles", type=int, default=50000)
+    knowledge_bench.add_argument("--queries", type=int, default=500)
+    
+    semantic_bench = commands.add_parser("semantic-cache-bench", help="Measure semantic cache lookup latency against cache size")
+    semantic_bench.add_argument("--sizes", default="1000,10000,50000", help="Comma-separated cache sizes")
+    semantic_bench.add_argument("--queries", type=int, default=500)
+    
+    commands.add_parser("file-index", help="Update the filename index now and show its size")
+    
+    content_cmd = commands.add_parser("content-index", help="Update the document content index, optionally searching it")
+    content_cmd.add_argument("query", nargs="?", default=None, help="Words to look for inside documents")
+    
+    content_bench = commands.add_parser("content-search-bench", help="Measure content indexing throughput and query latency")
+    content_bench.add_argument("--files", type=int, default=5000)
+    content_bench.add_argument("--queries", type=int, default=200)
+    
+    file_bench = commands.add_parser("file-search-bench", help="Compare the filename index with a directory walk")
+    file_bench.add_argument("--files", type=int, default=100000)
+    file_bench.add_argument("--queries", type=int, default=200)
+    
+    enroll = commands.add_parser("wakeword-enroll", help="Create wake-word templates from recorded clips")
+    enroll.add_argument("clips", nargs="+", help="WAV recordings of the wake word")
+    
+    wake_bench = commands.add_parser("wakeword-bench", help="Measure wake-word CPU use and latency on a recording")
+    wake_bench.add_argument("recording", help="16-bit WAV of background audio with spoken wake words")
+    wake_bench.add_argument("--events", default="", help="Comma-separated times (s) where each wake word ends")
+    return parser
+
+
+def run_cli(argv):
+    """Run a command-line tool and return its exit code"""
+    args = build_cli().parse_args(argv)
+    if args.command == "trace-report":
+        since = time.time() - args.days * 86400 if args.days else None
+        print(trace_report(args.file, since=since))
+    elif args.command == "prerender-phrases":
+        Config.ensure_dirs()
+        tts = TTSEngine()
+        print(f"Rendered {tts.prerender()} new phrases into {Config.AUDIO_CACHE_DIR}")
+    elif args.command == "stt-bench":
+        print(benchmark_stt(args.directory, args.backend))
+    elif args.command == "stt-payload-bench":
+        print(benchmark_stt_payload(args.directory, args.uplink_kbps))
+    elif args.command == "lang-bench":
+        print(benchmark_language(args.file, args.rounds))
+    elif args.command == "intent-eval":
+        print(evaluate_intents(args.file, args.threshold))
+    elif args.command == "response-cache":
+        Config.ensure_dirs()
+        cache = ResponseCache()
+        if args.clear:
+            cache.clear()
+            print(f"Cleared {Config.RESPONSE_CACHE_FILE}")
+        else:
+            summary = cache.summary()
+            print(f"{summary['rows']} cached responses ({summary['live']} unexpired) in {Config.RESPONSE_CACHE_FILE}")
+    elif args.command == "llm-warm-bench":
+        print(benchmark_llm_connection(args.requests, args.handshake_ms, args.request_ms))
+    elif args.command == "context-bench":
+        print(benchmark_context(args.turns, args.budget))
+    elif args.command == "llm-resilience-bench":
+        print(benchmark_llm_resilience(args.requests, args.error_rate, args.slow_rate, args.slow_ms,
+                                       error_status=args.error_status))
+    elif args.command == "knowledge-import":
+        print(import_knowledge(args.dump, args.limit))
+    elif args.command == "knowledge-bench":
+        print(benchmark_knowledge(args.articles, args.queries))
+    elif args.command == "file-index":
+        Config.ensure_dirs()
+        index = FileIndex()
+        started = time.perf_counter()
+        stats = index.refresh()
+        files, dirs, size = index.summary()
+        print(f"Swept {stats['dirs']} folders in {time.perf_counter() - started:.1f} s "
+              f"(+{stats['added']} -{stats['removed']} files)")
+        print(f"{files} files in {dirs} folders, {size / 1024 / 1024:.1f} MB in {index.db_file}")
+    elif args.command == "content-index":
+        Config.ensure_dirs()
+        files = FileIndex()
+        files.refresh()
+        index = ContentIndex()
+        started = time.perf_counter()
+        stats = index.refresh(files.paths(Config.CONTENT_INDEX_EXTENSIONS))
+        count, size = index.summary()
+        print(f"Checked {stats['checked']} documents in {time.perf_counter() - started:.1f} s "
+              f"({stats['indexed']} read, {stats['removed']} removed); "
+              f"{count} indexed, {size / 1024 / 1024:.1f} MB in {index.db_file}")
+        if args.query:
+            for path, snippet in index.search(args.query):
+                print(f"{path}\n    {snippet}")
+    elif args.command == "content-search-bench":
+        print(benchmark_content_search(args.files, args.queries))
+    elif args.command == "file-search-bench":
+        print(benchmark_file_search(args.files, args.queries))
+    elif args.command == "semantic-cache-bench":
+        if not NUMPY_AVAILABLE:
+            print("The semantic cache needs numpy: pip install numpy")
+            return 1
+        sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+        print(benchmark_semantic_cache(sizes, args.queries))
+    elif args.command in ("wakeword-enroll", "wakeword-bench"):
+        if not NUMPY_AVAILABLE:
+            print("The wake word needs numpy: pip install numpy")
+            return 1
+        Config.ensure_dirs()
+        if args.command == "wakeword-enroll":
+            count = enroll_wake_word(args.clips)
+            print(f"Saved {count} templates to {Config.WAKE_WORD_TEMPLATES_FILE}")
+        else:
+            events = [float(t) for t in args.events.split(",") if t.strip()]
+            print(benchmark_wake_word(args.recording, events))
+    return 0
@@ -0,0 +1,74 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from edi_core import Config
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Point every file the assistant writes at a per-test directory"""
+    monkeypatch.setattr(Config, "BASE_DIR", tmp_path)
+    for name in dir(Config):
+        value = getattr(Config, name)
+        if name.endswith(("_FILE", "_DIR")) and isinstance(value, Path):
+            monkeypatch.setattr(Config, name, tmp_path / value.name)
+    yield tmp_path
+
+
+class FakeStream:
+    """A streamed completion delivered a few characters per chunk
+
+    With a gate, only the first chunk is sent until the gate is set.
+    """
+    def __init__(self, content, size=5, gate=None):
+        self.pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        self.gate = gate
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        for index, piece in enumerate(self.pieces):
+            if index and self.gate is not None:
+                self.gate.wait(5)
+            if self.closed:
+                return
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class FakeLLM:
+    """Stands in for LLMGateway: returns canned completions and records each request"""
+    def __init__(self, *contents, gate=None):
+        self.contents = list(contents)
+        self.gate = gate
+        self.calls = []
+        self.streams = []
+
+    def create(self, kind, **request):
+        self.calls.append((kind, request))
+        content = self.contents.pop(0) if len(self.contents) > 1 else self.contents[0]
+        if request.get("stream"):
+            self.streams.append(FakeStream(content, gate=self.gate))
+            return self.streams[-1]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def assistant():
+    from edi_llm import AIAssistant
+    ai = AIAssistant()
+    yield ai
+    ai.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time(); advance it with clock.advance(seconds)"""
+    import time
+    state = SimpleNamespace(now=time.time())
+    state.advance = lambda seconds: setattr(state, "now", state.now + seconds)
+    monkeypatch.setattr(time, "time", lambda: state.now)
+    return state
@@ -0,0 +1,129 @@
+import json
+
+from edi_core import Config, Tracer
+
+from tests.conftest import FakeLLM
+
+
+def combined(intent, answer=""):
+    return json.dumps({"intent": intent, "entity": "", "answer": answer})
+
+
+def test_combined_answer_expires_with_the_answer_ttl(assistant, clock, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.semantic_cache = None
+    assistant.llm = FakeLLM(combined("ask_info", "Paris is the capital of France."))
+    question = "what is the capital of france"
+
+    first = assistant.get_intent(question, with_answer=True)
+    assert first["answer"] == "Paris is the capital of France."
+
+    clock.advance(3600)
+    cached = assistant.get_intent(question, with_answer=True)
+    assert cached["answer"] == "Paris is the capital of France."
+    assert len(assistant.llm.calls) == 1
+
+    clock.advance(2 * 86400)
+    stale = assistant.get_intent(question, with_answer=True)
+    assert stale["intent"] == "ask_info"
+    assert "answer" not in stale
+    assert len(assistant.llm.calls) == 1
+
+
+def test_intent_entry_never_holds_the_answer(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = FakeLLM(combined("unknown", "I am not sure."))
+    question = "tell me something odd"
+
+    assistant.get_intent(question, with_answer=True)
+    stored = assistant.cache.get(assistant.cache.key("intent", question, "en", 1))
+    assert "answer" not in stored
+
+
+def test_time_sensitive_combined_answer_is_not_reused(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = FakeLLM(combined("ask_info", "It is sunny."), combined("ask_info", "It is raining."))
+    question = "is it going to rain now in pune"
+
+    assert assistant.get_intent(question, with_answer=True)["answer"] == "It is sunny."
+    again = assistant.get_intent(question, with_answer=True)
+    assert "answer" not in again
+
+
+def test_prefetch_asks_for_the_intent_alone_and_skips_the_cache(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = FakeLLM(combined("ask_info", "Half an answer."))
+    partial = "what is the capital"
+
+    guess = assistant.get_intent(partial, prefetch=True)
+    assert guess["intent"] == "ask_info"
+    kind, request = assistant.llm.calls[0]
+    assert request["reserve"] == Config.PREFETCH_RESERVE_TOKENS
+    assert "answer" not in request["messages"][0]["content"]
+    for with_answer in (0, 1):
+        assert assistant.cache.get(assistant.cache.key("intent", partial, "en", with_answer)) is None
+
+    assistant.get_intent(partial, with_answer=True)
+    assert len(assistant.llm.calls) == 2
+    assert assistant.llm.calls[1][1]["reserve"] == 0
+
+
+def test_prefetch_returns_none_when_the_llm_cannot_be_asked(assistant, monkeypatch):
+    from edi_llm import LLMUnavailable
+
+    class Exhausted:
+        def create(self, kind, **request):
+            raise LLMUnavailable("local LLM rate limit reached")
+
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = Exhausted()
+    assert assistant.get_intent("open the pod bay", prefetch=True) is None
+    assert assistant.get_intent("open the pod bay")["intent"] is not None
+
+
+def test_semantic_cache_is_skipped_for_time_sensitive_questions(assistant):
+    for question, answer in [("who won the cricket match between india and australia", "India, by 5 wickets."),
+                             ("who is the ceo of twitter", "Someone.")]:
+        assistant._store_answer(assistant.cache.key("answer", question, "en"), question, answer)
+
+    paraphrase = "who won the cricket match between australia and india"
+    assert assistant._cached_answer(paraphrase, "en")[1] == "India, by 5 wickets."
+    assert assistant._cached_answer(paraphrase + " today", "en")[1] is None
+    assert assistant._cached_answer("who is the current ceo of twitter", "en")[1] is None
+
+
+def test_combined_mode_answers_in_the_intent_request(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = FakeLLM(combined("ask_info", "Mount Everest, at 8,849 metres."))
+
+    with Tracer.turn() as trace:
+        result = assistant.get_intent("what is the highest mountain", with_answer=True)
+
+    assert result["answer"] == "Mount Everest, at 8,849 metres."
+    kind, request = assistant.llm.calls[0]
+    assert request["response_format"] == {"type": "json_object"}
+    assert trace.attrs["llm_round_trips"] == 1
+    assert trace.attrs["intent_json_failed"] is False
+
+
+def test_answer_is_dropped_for_intents_that_do_not_speak_it(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    assistant.llm = FakeLLM(combined("open_app", "Opening it now."))
+
+    result = assistant.get_intent("fire up the spreadsheet thing", with_answer=True)
+    assert result["intent"] == "open_app"
+    assert "answer" not in result
+
+
+def test_fenced_json_is_parsed_and_prose_counts_as_a_failure(assistant, monkeypatch):
+    monkeypatch.setattr(Config, "LOCAL_INTENT_ENABLED", False)
+    fenced = "```json\n" + combined("ask_info", "Canberra.") + "\n```"
+    assistant.llm = FakeLLM(fenced, "Sure! The capital is Canberra.")
+
+    assert assistant.get_intent("capital of australia", with_answer=True)["answer"] == "Canberra."
+    with Tracer.turn() as trace:
+        fallback = assistant.get_intent("and of new zealand", with_answer=True)
+
+    assert trace.attrs["intent_json_failed"] is True
+    assert trace.attrs["intent_source"] == "fallback"
+    assert "answer" not in fallback
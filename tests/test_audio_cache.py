@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+from edi_speech import AudioCache
+
+
+def rendered(cache, name, size):
+    path = cache.cache_dir / f"{name}.tmp.wav"
+    path.write_bytes(b"\0" * size)
+    return path
+
+
+def test_key_covers_text_voice_rate_and_volume():
+    base = AudioCache.key("Good morning", "zira", 175, 0.9)
+    assert base == AudioCache.key("Good morning", "zira", 175, 0.9)
+    assert len({
+        base,
+        AudioCache.key("Good evening", "zira", 175, 0.9),
+        AudioCache.key("Good morning", "hazel", 175, 0.9),
+        AudioCache.key("Good morning", "zira", 200, 0.9),
+        AudioCache.key("Good morning", "zira", 175, 1.0),
+    }) == 5
+
+
+def test_added_files_are_found_again_after_a_restart(tmp_path):
+    cache = AudioCache(tmp_path / "audio")
+    path = cache.add("hello", rendered(cache, "hello", 100))
+
+    assert cache.lookup("hello") == path
+    assert path.read_bytes() == b"\0" * 100
+    assert cache.lookup("missing") is None
+    assert AudioCache(tmp_path / "audio").lookup("hello") == path
+
+
+def test_least_recently_played_files_are_evicted_over_the_cap(tmp_path, clock):
+    cache = AudioCache(tmp_path / "audio", max_bytes=250)
+    for name in ("one", "two"):
+        cache.add(name, rendered(cache, name, 100))
+        clock.advance(1)
+    cache.lookup("one")
+    clock.advance(1)
+    cache.add("three", rendered(cache, "three", 100))
+
+    assert set(cache.entries) == {"one", "three"}
+    assert not cache.path_for("two").exists()
+
+
+def test_an_oversized_file_still_evicts_everything_else_but_itself(tmp_path, clock):
+    cache = AudioCache(tmp_path / "audio", max_bytes=150)
+    cache.add("small", rendered(cache, "small", 100))
+    clock.advance(1)
+    cache.add("large", rendered(cache, "large", 400))
+
+    assert set(cache.entries) == {"large"}
+    assert cache.lookup("large") is not None
+
+
+def test_a_file_deleted_behind_its_back_is_forgotten(tmp_path):
+    cache = AudioCache(tmp_path / "audio")
+    cache.add("gone", rendered(cache, "gone", 10)).unlink()
+
+    assert cache.lookup("gone") is None
+    assert "gone" not in cache.entries
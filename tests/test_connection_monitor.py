@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from edi_core import Config
+from edi_llm import AIAssistant, ConnectionMonitor
+
+
+def exchange(monitor):
+    request = object()
+    monitor.on_request(request)
+    monitor.on_response(SimpleNamespace(request=request))
+
+
+def test_requests_are_labelled_first_steady_and_after_idle():
+    monitor = ConnectionMonitor(idle_after=0.05)
+    assert monitor.idle_seconds() is None
+
+    exchange(monitor)
+    exchange(monitor)
+    time.sleep(0.1)
+    exchange(monitor)
+    with monitor.labelled("keepalive"):
+        exchange(monitor)
+    exchange(monitor)
+
+    assert {label: len(samples) for label, samples in monitor.samples.items()} == {
+        "first": 1, "steady": 2, "after_idle": 1, "keepalive": 1,
+    }
+    assert monitor.idle_seconds() < 0.05
+
+
+def test_labels_do_not_leak_across_threads():
+    monitor = ConnectionMonitor()
+    with monitor.labelled("warmup"):
+        worker = threading.Thread(target=exchange, args=(monitor,))
+        worker.start()
+        worker.join()
+
+    assert list(monitor.samples) == ["first"]
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Plain-HTTP stand-in for the Groq endpoint that counts TCP connections"""
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def reply(self, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.reply({"object": "list", "data": []})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.reply({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": Config.GROQ_MODEL,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Warm and ready."}}],
+        })
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    StandIn.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(Config, "GROQ_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    yield StandIn
+    server.shutdown()
+    server.server_close()
+
+
+def test_warm_up_opens_the_connection_the_first_answer_reuses(stand_in):
+    ai = AIAssistant()
+    ai.cache = None
+    try:
+        assert ai.warm_up() is not None
+        assert ai.get_ai_response("are you there") == "Warm and ready."
+    finally:
+        ai.close()
+
+    assert list(ai.connections.samples) == ["warmup", "steady"]
+    assert stand_in.connections == 1
+
+
+def test_failed_warm_up_is_reported_not_raised(monkeypatch):
+    monkeypatch.setattr(Config, "GROQ_BASE_URL", "http://127.0.0.1:9")
+    ai = AIAssistant()
+    try:
+        assert ai.warm_up() is None
+    finally:
+        ai.close()
@@ -0,0 +1,82 @@
+import os
+import zipfile
+
+from edi_core import Config
+from edi_storage import ContentIndex
+
+
+def write_docs(folder):
+    folder.mkdir()
+    paths = {
+        "budget": folder / "budget.txt",
+        "trip": folder / "trip_plan.md",
+        "report": folder / "report.docx",
+        "binary": folder / "blob.txt",
+    }
+    paths["budget"].write_text("Quarterly budget for the lighthouse restoration.", encoding="utf-8")
+    paths["trip"].write_text("Pack the tent and the kayak for the lake trip.", encoding="utf-8")
+    with zipfile.ZipFile(paths["report"], "w") as archive:
+        archive.writestr("word/document.xml",
+                         "<w:document><w:p><w:t>Annual report on otter populations</w:t></w:p></w:document>")
+    paths["binary"].write_bytes(b"header\0\0\0binary")
+    return {name: str(path) for name, path in paths.items()}
+
+
+def test_finds_documents_by_their_contents(tmp_path):
+    docs = write_docs(tmp_path / "docs")
+    index = ContentIndex()
+
+    stats = index.refresh(list(docs.values()))
+    assert stats["indexed"] == 3
+    assert stats["unreadable"] == 1
+    assert [str(path) for path, _ in index.search("find my notes about the kayak")] == [docs["trip"]]
+    assert [str(path) for path, _ in index.search("otter")] == [docs["report"]]
+
+
+def test_refresh_only_rereads_changed_files_and_forgets_missing_ones(tmp_path):
+    docs = write_docs(tmp_path / "docs")
+    index = ContentIndex()
+    index.refresh(list(docs.values()))
+
+    assert index.refresh(list(docs.values()))["indexed"] == 0
+
+    with open(docs["budget"], "a", encoding="utf-8") as f:
+        f.write(" Includes a new fresnel lens.")
+    os.remove(docs["trip"])
+    stats = index.refresh(list(docs.values()))
+    assert stats["indexed"] == 1
+    assert stats["removed"] == 1
+    assert [str(path) for path, _ in index.search("fresnel")] == [docs["budget"]]
+    assert index.search("kayak") == []
+
+
+def test_pooled_extraction_matches_inline(tmp_path, monkeypatch):
+    folder = tmp_path / "many"
+    folder.mkdir()
+    paths = []
+    for i in range(40):
+        path = folder / f"note_{i}.txt"
+        path.write_text(f"note number {i} mentions word{i}", encoding="utf-8")
+        paths.append(str(path))
+    monkeypatch.setattr(Config, "CONTENT_INDEX_POOL_MIN", 8)
+
+    inline = ContentIndex(tmp_path / "inline.db")
+    pooled = ContentIndex(tmp_path / "pooled.db")
+    assert inline.refresh(paths, workers=1)["indexed"] == 40
+    assert pooled.refresh(paths, workers=4)["indexed"] == 40
+    for i in (0, 17, 39):
+        assert inline.search(f"word{i}") == pooled.search(f"word{i}")
+
+
+def test_scans_plain_text_when_fts5_is_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(ContentIndex, "FTS_SCHEMA", ["CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING nofts5(body)"])
+    docs = write_docs(tmp_path / "docs")
+    index = ContentIndex()
+    assert not index.fts_enabled
+
+    assert index.refresh(list(docs.values()))["indexed"] == 3
+    results = index.search("find my notes about the kayak")
+    assert [str(path) for path, _ in results] == [docs["trip"]]
+    assert "kayak" in results[0][1]
+    assert {str(path) for path, _ in index.search("otter lighthouse")} == {docs["budget"], docs["report"]}
+    assert index.summary()[0] == 3
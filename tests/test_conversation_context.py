@@ -0,0 +1,64 @@
+import threading
+import time
+
+from edi_llm import ConversationContext, estimate_tokens
+
+
+def slow_summarizer(delay):
+    def summarize(previous, text, max_tokens):
+        time.sleep(delay)
+        questions = [line[len("User: "):] for line in text.split("\n") if line.startswith("User: ")]
+        return " ".join(filter(None, [previous] + questions))
+    return summarize
+
+
+def test_queued_folds_build_on_each_other():
+    context = ConversationContext(summarize=slow_summarizer(0.2), budget=130, summary_tokens=100)
+    questions = [f"question number {i} about topic {i}" for i in range(6)]
+    for question in questions:
+        context.add(question, "a short answer")
+    context.wait_idle(timeout=5)
+
+    kept = {q for q, _, _ in context.turns}
+    folded = [q for q in questions if q not in kept]
+    assert len(folded) >= 3
+    for question in folded:
+        assert question in context.summary
+
+
+def test_prompt_stays_within_budget():
+    context = ConversationContext(budget=200, summary_tokens=50)
+    for i in range(50):
+        context.add(f"what about item {i}?", "It is a fairly long answer that takes up some room. " * 2)
+        context.wait_idle()
+        assert context.prompt_tokens() <= 200 + estimate_tokens(context.turns[-1][1]) + 20
+
+
+def test_reset_drops_folds_in_flight():
+    release = threading.Event()
+
+    def summarize(previous, text, max_tokens):
+        release.wait(5)
+        return "stale summary"
+
+    context = ConversationContext(summarize=summarize, budget=40, summary_tokens=10)
+    for i in range(4):
+        context.add(f"question {i} with several words", "answer with several words too")
+    context.reset()
+    release.set()
+    context.wait_idle()
+
+    assert context.summary == ""
+    assert not context.active()
+
+
+def test_messages_put_summary_first_and_prompt_last():
+    context = ConversationContext(budget=60, summary_tokens=20)
+    for i in range(5):
+        context.add(f"question {i} with a few extra words", f"answer {i} with a few extra words")
+    context.wait_idle()
+
+    messages = context.messages("next question")
+    assert messages[0]["role"] == "system"
+    assert "Asked: question" in messages[0]["content"]
+    assert messages[-1] == {"role": "user", "content": "next question"}
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from edi_storage import ConversationHistory
+
+
+@pytest.fixture
+def history():
+    store = ConversationHistory()
+    yield store
+    store.close()
+
+
+def test_recorded_turns_are_searchable_after_a_flush(history):
+    now = time.time()
+    history.record("what is the weather in Oslo", intent="weather", entity="Oslo", ts=now - 60)
+    history.record("tell me about volcanoes", intent="ask_info", answer="Volcanoes vent magma.", ts=now - 30)
+    history.record("what did we talk about", intent="recall_history", ts=now)
+    assert history.flush()
+
+    assert [row["text"] for row in history.search("magma")] == ["tell me about volcanoes"]
+    assert [row["entity"] for row in history.search("oslo")] == ["Oslo"]
+    recent = history.recent(now - 120, now + 1, exclude_intents=("recall_history",))
+    assert [row["intent"] for row in recent] == ["ask_info", "weather"]
+
+
+def test_search_respects_the_time_range(history):
+    now = time.time()
+    history.record("remind me about the dentist", ts=now - 3 * 86400)
+    history.record("the dentist called back", ts=now - 60)
+    history.flush()
+
+    rows = history.search("dentist", start_ts=now - 86400)
+    assert [row["text"] for row in rows] == ["the dentist called back"]
+
+
+def test_turns_survive_a_restart(history):
+    history.record("first turn")
+    history.close()
+
+    reopened = ConversationHistory()
+    try:
+        assert [row["text"] for row in reopened.search("first")] == ["first turn"]
+    finally:
+        reopened.close()
+
+
+def test_parse_recall_reads_the_period_and_topic():
+    now = datetime(2024, 5, 15, 14, 30)
+    label, start, end, topic = ConversationHistory.parse_recall("what did we say yesterday about the budget", now)
+    assert label == "yesterday"
+    assert datetime.fromtimestamp(start) == datetime(2024, 5, 14)
+    assert datetime.fromtimestamp(end - 1) == datetime(2024, 5, 15)
+    assert topic == "budget"
+
+    label, start, _, _ = ConversationHistory.parse_recall("what did I ask in the last 3 days", now)
+    assert label == "in the last 3 days"
+    assert datetime.fromtimestamp(start) == now - timedelta(days=3)
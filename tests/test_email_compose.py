@@ -0,0 +1,105 @@
+import concurrent.futures
+import time
+import urllib.parse
+from types import SimpleNamespace
+
+import pytest
+
+from edi_core import Config, Tracer
+
+from tests.conftest import FakeLLM
+
+
+DRAFT = "Hello Team,\nThe quarterly budget review is on Friday.\n\nBest regards,\nAsha"
+
+
+def test_streamed_draft_reports_progress_and_matches_the_full_draft(assistant):
+    assistant.cache = None
+    assistant.llm = FakeLLM(DRAFT)
+    previews = []
+
+    streamed = assistant.compose_email_body("Budget review", on_partial=previews.append)
+    blocking = assistant.compose_email_body("Budget review")
+
+    assert streamed == blocking == DRAFT
+    assert previews[-1] == DRAFT
+    assert all(DRAFT.startswith(preview) for preview in previews)
+    assert len(previews) > 1
+
+
+def test_draft_is_cached_per_subject_and_signature(assistant):
+    assistant.llm = FakeLLM(DRAFT)
+
+    assistant.compose_email_body("Budget review")
+    assistant.compose_email_body("Budget review")
+    assert len(assistant.llm.calls) == 1
+
+    assistant.memory.set("user_name", "Asha")
+    assistant.compose_email_body("Budget review")
+    assert len(assistant.llm.calls) == 2
+
+
+def test_failed_draft_falls_back_to_the_template(assistant):
+    class Down:
+        def create(self, kind, **request):
+            raise ConnectionError("offline")
+
+    assistant.llm = Down()
+    body = assistant.compose_email_body("Budget review")
+    assert '"Budget review"' in body
+    assert body.startswith("Hello,")
+
+
+class FakeTTS:
+    """Plays utterances one after another on a worker, recording when each ends"""
+    def __init__(self, events, seconds=0.15):
+        self.events = events
+        self.seconds = seconds
+        self.player = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def speak_async(self, text, priority=5):
+        def play():
+            time.sleep(self.seconds)
+            self.events.append(("spoken", text))
+            return True
+        future = self.player.submit(play)
+        return SimpleNamespace(wait=lambda timeout=None: future.result(timeout))
+
+    def speak(self, text, priority=5):
+        return self.speak_async(text).wait()
+
+
+def test_drafting_overlaps_the_confirmations_and_opens_the_browser_first(monkeypatch):
+    pytest.importorskip("pyttsx3")
+    pytest.importorskip("PyQt6")
+    import edi_assistant
+
+    events = []
+
+    class DraftingAI:
+        def compose_email_body(self, subject, on_partial=None):
+            events.append(("draft", subject))
+            time.sleep(0.15)
+            return DRAFT
+
+    controller = edi_assistant.AssistantController.__new__(edi_assistant.AssistantController)
+    controller.ai = DraftingAI()
+    controller.tts = FakeTTS(events)
+    controller.status_listeners = []
+    controller._last_preview = 0.0
+    controller._draft_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    controller._prompt_for_input = lambda prompt, **kwargs: "Budget review"
+    monkeypatch.setattr(Config, "EMAIL_DRAFT_PREVIEW", False)
+    monkeypatch.setattr(edi_assistant.webbrowser, "open", lambda url: events.append(("open", url)))
+
+    with Tracer.turn() as trace:
+        controller._handle_send_email()
+
+    kinds = [kind if kind != "spoken" else detail for kind, detail in events]
+    assert kinds.index("draft") < kinds.index("Subject is Budget review.")
+    assert kinds.index("open") < kinds.index("Great. Let me draft the email for you.")
+    assert kinds[-1].startswith("All set.")
+    url = dict(events)["open"]
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+    assert query["su"] == ["Budget review"] and query["body"] == [DRAFT]
+    assert "email.subject_to_browser" in trace.stage_ms
@@ -0,0 +1,72 @@
+import struct
+
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+import speech_recognition as sr
+from edi_speech import EndpointModel
+
+RATE = 16000
+THRESHOLD = 300
+
+
+def utterance(*segments):
+    """16-bit mono audio from (seconds, amplitude) segments"""
+    raw = b"".join(struct.pack("<h", amplitude) * int(seconds * RATE) for seconds, amplitude in segments)
+    return sr.AudioData(raw, RATE, 2)
+
+
+def paused(gap, trailing=0.6):
+    return utterance((0.3, 50), (0.6, 3000), (gap, 50), (0.6, 3000), (trailing, 50))
+
+
+def test_initial_thresholds_until_enough_pauses_are_seen():
+    model = EndpointModel()
+    for _ in range(4):
+        model.observe(paused(0.42), THRESHOLD, "command")
+
+    assert model.pause_threshold("command") == 0.6
+    assert model.pause_threshold("dictation") == 1.2
+
+
+def test_learned_pauses_set_the_threshold_within_the_mode_limits():
+    model = EndpointModel()
+    for _ in range(5):
+        model.observe(paused(0.42), THRESHOLD, "command")
+        model.observe(paused(0.42), THRESHOLD, "dictation")
+
+    assert model.pause_threshold("command") == pytest.approx(0.42 * 1.25)
+    assert model.pause_threshold("dictation") == 0.8
+
+
+def test_long_hesitations_are_capped():
+    model = EndpointModel()
+    for _ in range(5):
+        model.observe(paused(1.5), THRESHOLD, "command")
+
+    assert model.pause_threshold("command") == 0.9
+
+
+def test_syllable_breaks_are_not_pauses():
+    model = EndpointModel()
+    for _ in range(10):
+        model.observe(paused(0.06), THRESHOLD, "command")
+
+    assert len(model.pauses["command"]) == 0
+    assert model.pause_threshold("command") == 0.6
+
+
+def test_observe_reports_trailing_silence_and_tracks_the_noise_floor():
+    model = EndpointModel()
+
+    assert model.observe(paused(0.42, trailing=0.45), THRESHOLD, "command") == pytest.approx(450)
+    assert model.noise_floor == pytest.approx(50)
+    assert model.observe(utterance((1.0, 50)), THRESHOLD, "command") is None
+
+
+def test_calibration_is_smoothed_across_listens():
+    model = EndpointModel()
+
+    assert model.calibrated(1000) == 1000
+    assert model.calibrated(2000) == pytest.approx(1300)
@@ -0,0 +1,93 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from edi_storage import FileIndex
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("x", encoding="utf-8")
+    # Directory mtimes can be coarse; make every change visible to the sweep
+    stamp = time.time() + touch.offset
+    touch.offset += 1
+    os.utime(path.parent, (stamp, stamp))
+
+
+touch.offset = 10
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "home"
+    for name in ("Documents/Budget_Report-2024.xlsx", "Documents/letters/cover letter.docx",
+                 "Downloads/holiday photos.zip", "Downloads/node_modules/budget.js", "Desktop/.hidden budget.txt"):
+        touch(root / name)
+    return root
+
+
+def names(paths):
+    return [path.name for path in paths]
+
+
+def test_finds_files_by_spoken_and_misheard_names(tree):
+    index = FileIndex(roots=[tree])
+    stats = index.refresh()
+    assert stats["added"] == 3
+
+    assert names(index.search("budget report")) == ["Budget_Report-2024.xlsx"]
+    assert names(index.search("cover leter")) == ["cover letter.docx"]
+    # Skipped folders and hidden files are never indexed
+    assert names(index.search("budget", max_results=10)) == ["Budget_Report-2024.xlsx"]
+
+
+def test_unchanged_sweep_lists_nothing(tree):
+    index = FileIndex(roots=[tree])
+    index.refresh()
+    stats = index.refresh()
+    assert stats["listed"] == 0
+    assert stats["dirs"] > 0
+
+
+def test_sweep_picks_up_new_and_removed_files(tree):
+    index = FileIndex(roots=[tree])
+    index.refresh()
+
+    touch(tree / "Documents/letters/thank you note.txt")
+    shutil.rmtree(tree / "Downloads")
+    stats = index.refresh()
+    assert stats["added"] == 1
+    assert stats["removed"] == 1
+    assert stats["listed"] == 2
+    assert names(index.search("thank you")) == ["thank you note.txt"]
+    assert index.search("holiday photos") == []
+
+
+def test_trigram_counts_follow_the_tree(tree):
+    index = FileIndex(roots=[tree])
+    index.refresh()
+    conn = index._conn()
+    assert conn.execute("SELECT df FROM grams WHERE gram = 'bud'").fetchone() == (1,)
+
+    os.remove(tree / "Documents/Budget_Report-2024.xlsx")
+    touch(tree / "Documents/placeholder.txt")
+    index.refresh()
+    assert conn.execute("SELECT df FROM grams WHERE gram = 'bud'").fetchone() == (0,)
+    # Raises if the trigram index disagrees with the files table
+    conn.execute("INSERT INTO files_fts(files_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_index_persists_and_drops_removed_roots(tree, tmp_path):
+    FileIndex(roots=[tree]).refresh()
+    reopened = FileIndex(roots=[tree])
+    assert reopened.ready
+    assert names(reopened.search("holiday")) == ["holiday photos.zip"]
+
+    elsewhere = tmp_path / "other"
+    touch(elsewhere / "notes.txt")
+    moved = FileIndex(roots=[elsewhere])
+    stats = moved.refresh()
+    assert stats["removed"] == 3
+    assert names(moved.search("notes")) == ["notes.txt"]
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from edi_core import Config
+from edi_llm import IntentClassifier, KeywordAutomaton
+
+from tests.conftest import FakeLLM
+
+CORPUS = Path(__file__).resolve().parent.parent / "intent_corpus.jsonl"
+
+
+def corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_automaton_finds_overlapping_phrases():
+    automaton = KeywordAutomaton([("he", 1), ("she", 2), ("hers", 3)])
+    assert sorted(automaton.find("ushers")) == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+
+def test_local_results_on_the_corpus_are_right():
+    classifier = IntentClassifier()
+    local = [(sample, classifier.classify(sample["text"])) for sample in corpus()]
+    local = [(sample, result) for sample, result in local if result["confidence"] >= Config.LOCAL_INTENT_THRESHOLD]
+    assert len(local) >= len(corpus()) // 2
+    assert [s["text"] for s, r in local if r["intent"] != s["intent"]] == []
+
+
+def test_no_everyday_sentence_reads_as_a_system_command():
+    classifier = IntentClassifier()
+    for sample in corpus():
+        if sample["intent"] == "system_command":
+            continue
+        result = classifier.classify(sample["text"])
+        assert result["intent"] != "system_command" or result["confidence"] < Config.LOCAL_INTENT_THRESHOLD, sample
+
+
+def test_longest_phrase_wins_over_nested_keywords():
+    classifier = IntentClassifier()
+    assert classifier.classify("what time does the sun set in paris")["intent"] == "ask_info"
+    assert classifier.classify("what time is it")["intent"] == "time"
+
+
+def test_system_commands_are_always_confirmed_by_the_llm(assistant):
+    assistant.llm = FakeLLM(json.dumps({"intent": "system_command", "entity": "restart"}))
+    assert assistant.classifier.classify("restart my pc")["confidence"] >= Config.LOCAL_INTENT_THRESHOLD
+
+    assert assistant.get_intent("restart my pc", with_answer=False)["intent"] == "system_command"
+    assert len(assistant.llm.calls) == 1
+
+
+@pytest.mark.parametrize("text", ["I need more sleep", "should I restart my router", "lock"])
+def test_offline_fallback_never_guesses_a_system_command(assistant, text):
+    assert assistant._fallback_intent(text)["intent"] != "system_command"
@@ -0,0 +1,37 @@
+from edi_storage import KnowledgeIndex
+
+
+def check_fts_integrity(index):
+    """Raises sqlite3.DatabaseError when the FTS index disagrees with the articles table"""
+    index._conn().execute("INSERT INTO articles_fts(articles_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_reimport_replaces_text_in_fts(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.db")
+    index.import_records([("Python", "Python is a large snake found in Asia.")])
+    index.import_records([("Python", "Python is a programming language.")])
+    index.import_records([("Python", "Python is a programming language created by Guido.")])
+
+    conn = index._conn()
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 1
+    assert conn.execute("SELECT rowid FROM articles_fts WHERE articles_fts MATCH 'snake'").fetchall() == []
+    check_fts_integrity(index)
+    assert "Guido" in index.lookup("what is python")
+
+
+def test_add_and_import_share_rows(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.db")
+    index.add("Pune", "Pune is a city in Maharashtra.")
+    index.import_records([("Pune", "Pune is a city in western India."), ("Delhi", "Delhi is the capital of India.")])
+
+    check_fts_integrity(index)
+    assert index.lookup("tell me about pune") == "Pune is a city in western India."
+    assert index.summary()[0] == 2
+
+
+def test_lookup_ignores_passing_mentions(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.db")
+    index.import_records([("Mount Everest", "Mount Everest is the highest mountain. It is in Nepal.")])
+
+    assert index.lookup("who is the president of nepal") is None
+    assert index.lookup("how tall is mount everest") == "Mount Everest is the highest mountain. It is in Nepal."
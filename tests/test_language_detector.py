@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+from edi_speech import LanguageDetector
+
+
+class CountingFallback:
+    def __init__(self, answer="en"):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return self.answer
+
+
+@pytest.mark.parametrize("text, lang", [
+    ("open chrome and play some music", "en"),
+    ("मुझे आज का मौसम बताओ", "hi"),
+    ("मला आजचे हवामान सांग", "mr"),
+    ("આજે હવામાન કેવું છે", "gu"),
+    ("ਅੱਜ ਮੌਸਮ ਕਿਹੋ ਜਿਹਾ ਹੈ", "pa"),
+    ("mujhe gaana bajao yaar", "hi"),
+    ("mala gaana vajav na", "mr"),
+    ("tame kem cho, shu che", "gu"),
+    ("tusi kiddan ho, mainu dasso", "pa"),
+])
+def test_script_and_keywords_decide_without_langdetect(text, lang):
+    fallback = CountingFallback("xx")
+    assert LanguageDetector(fallback=fallback).detect(text) == lang
+    assert fallback.calls == []
+
+
+@pytest.mark.parametrize("text", [
+    "नमस्ते",                     # Devanagari with no Hindi or Marathi marker
+    "kya aahe",                   # one Hindi and one Marathi marker
+    "café au lait s'il vous plaît",  # non-ASCII Latin without markers
+])
+def test_ambiguous_text_goes_to_the_fallback(text):
+    fallback = CountingFallback("mr")
+    assert LanguageDetector(fallback=fallback).detect(text) == "mr"
+    assert fallback.calls == [text]
+
+
+def test_results_are_memoized_case_insensitively_with_lru_eviction():
+    fallback = CountingFallback("hi")
+    detector = LanguageDetector(memo_size=2, fallback=fallback)
+
+    detector.detect("नमस्ते")
+    detector.detect("  नमस्ते ")
+    assert len(fallback.calls) == 1
+    assert detector.detect("Open Chrome") == detector.detect("open chrome") == "en"
+
+    detector.detect("नमस्ते")
+    detector.detect("set an alarm")
+    assert list(detector.memo) == ["नमस्ते", "set an alarm"]
+    assert detector.fallbacks == 1
+
+
+def test_empty_text_is_english():
+    assert LanguageDetector(fallback=CountingFallback("hi")).detect("") == "en"
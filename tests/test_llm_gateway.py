@@ -0,0 +1,187 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from edi_core import Config
+from edi_llm import CircuitBreaker, DeadlineStream, LLMGateway, LLMUnavailable, TokenBucket
+
+
+class ServerError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class FakeClient:
+    """chat.completions.create that plays back a script of delays, errors and replies"""
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, timeout=None, **request):
+        with self.lock:
+            self.calls += 1
+            step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        delay, outcome = step if isinstance(step, tuple) else (0, step)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def gateway_config(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(Config, "LLM_BREAKER_RESET", 0.1)
+    monkeypatch.setattr(Config, "LLM_RATE_BURST", 100)
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", False)
+
+
+def test_bucket_reserve_leaves_tokens_for_later_calls():
+    bucket = TokenBucket(rate=0.001, capacity=3)
+
+    assert bucket.acquire(reserve=2)
+    assert not bucket.acquire(reserve=2)
+    assert bucket.acquire()
+    assert bucket.acquire()
+    assert not bucket.acquire()
+
+
+def test_bucket_waits_for_a_refill_within_the_timeout():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0.5)
+
+
+def test_breaker_lets_one_trial_through_after_the_cool_down():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_open_circuit_short_circuits_without_calling_the_client(gateway_config):
+    client = FakeClient(ConnectionError("connection refused"))
+    gateway = LLMGateway(client)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            gateway.create("intent")
+
+    with pytest.raises(LLMUnavailable):
+        gateway.create("intent")
+    assert client.calls == 2
+    assert gateway.stats["short_circuits"] == 1
+
+    time.sleep(0.12)
+    client.script = ["ok"]
+    assert gateway.create("intent") == "ok"
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limit_answer_opens_the_circuit_for_retry_after(gateway_config):
+    gateway = LLMGateway(FakeClient(ServerError(429, retry_after="5")))
+    with pytest.raises(ServerError):
+        gateway.create("intent")
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+    assert gateway.breaker.opened_until - time.monotonic() > 4
+
+
+def test_server_errors_are_retried_once_and_client_errors_are_not(gateway_config):
+    client = FakeClient(ServerError(503), "ok")
+    gateway = LLMGateway(client)
+    assert gateway.create("intent") == "ok"
+    assert gateway.stats["retries"] == 1
+
+    client = FakeClient(ServerError(400), "ok")
+    gateway = LLMGateway(client)
+    with pytest.raises(ServerError):
+        gateway.create("intent")
+    assert client.calls == 1
+
+
+def test_exhausted_rate_limit_falls_back_at_once(gateway_config, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RATE_BURST", 1)
+    monkeypatch.setattr(Config, "LLM_RATE_WAIT", 0)
+    gateway = LLMGateway(FakeClient("ok"))
+    assert gateway.create("intent") == "ok"
+    with pytest.raises(LLMUnavailable):
+        gateway.create("intent")
+    assert gateway.stats["rate_limited"] == 1
+
+
+def test_slow_call_is_hedged_after_the_recent_p95(gateway_config, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 5)
+    client = FakeClient((1.0, "slow"), "fast")
+    gateway = LLMGateway(client)
+    for _ in range(5):
+        gateway._observe("intent", 0.02)
+
+    started = time.monotonic()
+    assert gateway.create("intent") == "fast"
+    assert time.monotonic() - started < 0.5
+    assert gateway.stats["hedges"] == 1
+    assert gateway.stats["hedge_wins"] == 1
+
+
+def test_client_errors_never_open_the_circuit(gateway_config):
+    client = FakeClient(ServerError(400))
+    gateway = LLMGateway(client)
+    for _ in range(5):
+        with pytest.raises(ServerError):
+            gateway.create("intent")
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+    assert client.calls == 5
+    assert LLMGateway.is_outage(ServerError(503))
+    assert LLMGateway.is_outage(TimeoutError())
+    assert not LLMGateway.is_outage(ServerError(401))
+
+
+class DrippingStream:
+    """Yields a chunk every interval until closed"""
+    def __init__(self, interval):
+        self.interval = interval
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        while not self.closed.wait(self.interval):
+            yield "token"
+
+    def close(self):
+        self.closed.set()
+
+
+def test_slow_stream_is_cut_off_at_the_total_deadline(gateway_config, monkeypatch):
+    monkeypatch.setitem(Config.LLM_DEADLINES, "stream", 0.3)
+    dripping = DrippingStream(0.05)
+    gateway = LLMGateway(FakeClient(dripping))
+
+    chunks = []
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        for chunk in gateway.create("stream", stream=True):
+            chunks.append(chunk)
+    assert time.monotonic() - started < 0.6
+    assert dripping.closed.is_set()
+    assert 0 < len(chunks) < 10
+    assert gateway.stats["failures"] == 1
+
+
+def test_stream_finishing_in_time_is_untouched():
+    stream = DeadlineStream(iter(["a", "b"]), 5.0)
+    assert list(stream) == ["a", "b"]
+    assert not stream.expired
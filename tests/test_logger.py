@@ -0,0 +1,43 @@
+import threading
+
+from edi_core import Config, Logger, BatchedFileWriter
+
+
+def writer_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("writer-") and t.is_alive()]
+
+
+def test_lines_print_before_the_batch_flushes(monkeypatch, capsys):
+    monkeypatch.setattr(Config, "LOG_FLUSH_INTERVAL", 60.0)
+    monkeypatch.setattr(Logger, "_writer", None)
+
+    Logger.info("turn started")
+    assert "[INFO] turn started" in capsys.readouterr().out
+
+    Logger.shutdown()
+    assert "turn started" in Config.LOG_FILE.read_text(encoding="utf-8")
+
+
+def test_logging_after_shutdown_writes_directly(monkeypatch, capsys):
+    monkeypatch.setattr(Logger, "_writer", None)
+    Logger.info("before shutdown")
+    Logger.shutdown()
+    threads = len(writer_threads())
+
+    Logger.error("from an atexit handler")
+    assert len(writer_threads()) == threads
+    assert "from an atexit handler" in Config.LOG_FILE.read_text(encoding="utf-8")
+    assert "from an atexit handler" in capsys.readouterr().out
+
+
+def test_writer_flushes_batches_in_order_and_rotates(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    writer = BatchedFileWriter(path, batch_size=10, flush_interval=60.0, max_bytes=200, backup_count=2)
+    for i in range(40):
+        writer.write(f"line {i:03d}")
+    writer.close()
+
+    assert (tmp_path / "trace.jsonl.1.gz").exists()
+    assert not (tmp_path / "trace.jsonl.3.gz").exists()
+    tail = path.read_text(encoding="utf-8").split()
+    assert tail[-1] == "039"
@@ -0,0 +1,76 @@
+import json
+import threading
+
+import edi_core
+from edi_core import Config, Memory
+
+
+def test_changes_survive_a_restart():
+    memory = Memory()
+    memory.set("name", "Ada")
+    memory.set("city", "Turin")
+    memory.delete("city")
+    memory.close()
+
+    assert Memory().data == {"name": "Ada"}
+
+
+def test_torn_journal_tail_is_discarded():
+    memory = Memory()
+    memory.set("name", "Ada")
+    memory.close()
+    with open(Config.MEMORY_JOURNAL_FILE, "ab") as journal:
+        journal.write(b"0000beef\t{\"op\":\"set\",\"key\":\"na")
+
+    assert Memory().data == {"name": "Ada"}
+
+
+def test_compaction_keeps_the_journal_of_an_unfinished_one(monkeypatch):
+    memory = Memory()
+    real_dump = json.dump
+
+    def failing_dump(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(edi_core.json, "dump", failing_dump)
+    memory.set("first", 1)
+    memory.compact()
+    memory.set("second", 2)
+    memory.compact()
+    memory.close()
+    monkeypatch.setattr(edi_core.json, "dump", real_dump)
+
+    assert Memory().data == {"first": 1, "second": 2}
+
+
+def test_compaction_writes_a_snapshot_and_drops_the_journals():
+    memory = Memory()
+    memory.set("name", "Ada")
+    memory.compact()
+    memory.close()
+
+    assert json.loads(Config.MEMORY_FILE.read_text(encoding="utf-8")) == {"name": "Ada"}
+    assert not memory.pending_file.exists()
+    assert Memory().data == {"name": "Ada"}
+
+
+def test_changes_wait_for_a_compaction_in_progress():
+    memory = Memory()
+    memory.set("city", "Turin")
+    writers = [
+        threading.Thread(target=memory.set, args=("name", "Ada"), daemon=True),
+        threading.Thread(target=memory.delete, args=("city",), daemon=True),
+    ]
+    with memory.lock:
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join(0.2)
+        seen_during_compaction = dict(memory.data)
+    for writer in writers:
+        writer.join()
+    memory.close()
+
+    assert seen_during_compaction == {"city": "Turin"}
+    assert memory.data == {"name": "Ada"}
+    assert Memory().data == {"name": "Ada"}
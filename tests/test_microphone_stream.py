@@ -0,0 +1,115 @@
+import queue
+import struct
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+from edi_core import Config
+from edi_speech import MicrophoneStream
+
+
+class FakeDevice:
+    """Microphone stream that hands out the chunks a test pushes"""
+    def __init__(self, mic):
+        self.mic = mic
+        self.chunks = queue.Queue()
+
+    def read(self, size):
+        return self.chunks.get()
+
+    def push(self, level, count=1):
+        target = self.mic.chunks_read + count
+        for _ in range(count):
+            self.chunks.put(struct.pack("<h", level) * self.mic.chunk)
+        deadline = time.time() + 5
+        while self.mic.chunks_read < target:
+            assert time.time() < deadline, "reader stalled"
+            time.sleep(0.005)
+
+
+@pytest.fixture
+def mic():
+    mic = MicrophoneStream()
+    mic.noise_floor = 10
+    mic.device = FakeDevice(mic)
+    mic.source = SimpleNamespace(stream=mic.device)
+    mic._running = True
+    reader = threading.Thread(target=mic._read_loop, daemon=True)
+    reader.start()
+    yield mic
+    mic._running = False
+    mic.device.chunks.put(b"\0\0" * mic.chunk)
+    reader.join(2)
+
+
+def levels(audio, mic):
+    step = mic.chunk * 2
+    return [struct.unpack_from("<h", audio.frame_data, offset)[0] for offset in range(0, len(audio.frame_data), step)]
+
+
+def capture(mic, speak):
+    """Run capture() while speak() feeds the utterance"""
+    result = {}
+    listener = threading.Thread(target=lambda: result.setdefault("audio", mic.capture(5, 5, 0.09)))
+    listener.start()
+    deadline = time.time() + 5
+    while not mic.subscribers:
+        assert time.time() < deadline, "capture never subscribed"
+        time.sleep(0.005)
+    speak()
+    listener.join(5)
+    return levels(result["audio"], mic)
+
+
+def pre_roll_chunks(mic):
+    return int(Config.MIC_PRE_ROLL_SECONDS / mic.chunk_seconds)
+
+
+def test_ring_buffer_keeps_only_the_last_few_seconds(mic):
+    mic.device.push(20, mic.ring.maxlen + 5)
+
+    assert len(mic.ring) == mic.ring.maxlen
+    assert len(mic.recent(Config.MIC_RING_SECONDS * 2)) == mic.ring.maxlen
+
+
+def test_capture_starts_with_the_pre_roll_before_speech(mic):
+    for level in range(1, 21):
+        mic.device.push(level)
+
+    def speak():
+        mic.device.push(3000, 3)
+        mic.device.push(5, 4)
+
+    captured = capture(mic, speak)
+    count = pre_roll_chunks(mic)
+    assert captured[:count] == list(range(21 - count, 21))
+    assert captured[count:count + 3] == [3000] * 3
+    assert set(captured[count + 3:]) == {5}
+
+
+def test_pre_roll_never_holds_our_own_speech(mic):
+    speaking = [True]
+    mic.speech_active = lambda: speaking[0]
+    mic.device.push(100, 20)
+    speaking[0] = False
+    tail = round(Config.PROMPT_SETTLE_SECONDS / mic.chunk_seconds)
+    mic.device.push(1, tail)
+
+    assert mic.recent(Config.MIC_PRE_ROLL_SECONDS) == []
+    mic.device.push(2, 2)
+    assert len(mic.recent(Config.MIC_PRE_ROLL_SECONDS)) == 2
+
+    def speak():
+        speaking[0] = True
+        mic.device.push(100, 5)
+        speaking[0] = False
+        mic.device.push(3000, 2)
+        mic.device.push(5, 4)
+
+    captured = capture(mic, speak)
+    assert 100 not in captured
+    assert captured[:2] == [3000, 3000]
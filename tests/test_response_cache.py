@@ -0,0 +1,54 @@
+from edi_core import Config
+from edi_storage import ResponseCache
+
+
+def test_values_survive_a_restart(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    key = cache.key("answer", "What is the capital of France?")
+    cache.put(key, "Paris.", 3600, "answer")
+
+    reopened = ResponseCache(tmp_path / "cache.db")
+    assert reopened.get(key) == "Paris."
+    assert reopened.stats["disk_hits"] == 1
+    assert reopened.get(key) == "Paris."
+    assert reopened.stats["memory_hits"] == 1
+
+
+def test_entries_expire(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "cache.db")
+    key = cache.key("answer", "who wrote hamlet")
+    cache.put(key, "Shakespeare.", 60, "answer")
+    clock.advance(61)
+
+    assert cache.get(key) is None
+    assert ResponseCache(tmp_path / "cache.db").get(key) is None
+
+
+def test_keys_ignore_case_and_punctuation_but_not_language(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    assert cache.key("answer", "Who wrote Hamlet?") == cache.key("answer", "who wrote hamlet")
+    assert cache.key("answer", "who wrote hamlet", "en") != cache.key("answer", "who wrote hamlet", "hi")
+
+
+def test_time_sensitive_answers_are_not_cached(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    assert cache.ttl_for("ask_info", "what is the weather today") == 0
+    assert cache.ttl_for("intent", "what is the weather today") > 0
+    cache.put("k", "value", 0)
+    assert cache.get("k") is None
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db", memory_entries=2)
+    for i in range(5):
+        cache.put(f"k{i}", i, 3600)
+    assert list(cache.memory) == ["k3", "k4"]
+    assert cache.get("k0") == 0
+
+
+def test_disk_rows_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RESPONSE_CACHE_MAX_ROWS", 3)
+    cache = ResponseCache(tmp_path / "cache.db")
+    for i in range(6):
+        cache.put(f"k{i}", i, 3600)
+    assert cache.summary()["rows"] == 3
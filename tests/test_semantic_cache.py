@@ -0,0 +1,53 @@
+from edi_storage import HashingVectorizer, SemanticCache
+
+
+def test_vectors_are_stable_unit_length():
+    vectorizer = HashingVectorizer(dim=256)
+    first = vectorizer.transform("What is the capital of France?")
+    again = vectorizer.transform("what is the capital of france")
+    assert abs(float(first @ first) - 1.0) < 1e-5
+    assert float(first @ again) > 0.999
+
+
+def test_paraphrase_hits_and_a_different_subject_misses():
+    cache = SemanticCache(capacity=16)
+    cache.add("what is the capital of france", "Paris.", ttl=60)
+
+    answer, similarity = cache.lookup("what's the capital of france")
+    assert answer == "Paris."
+    assert similarity >= cache.threshold
+
+    assert cache.lookup("what is the capital of spain")[0] is None
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_language_and_expiry_are_respected(clock):
+    cache = SemanticCache(capacity=16)
+    cache.add("who wrote hamlet", "Shakespeare.", ttl=60)
+
+    assert cache.lookup("who wrote hamlet", lang="de")[0] is None
+    clock.advance(61)
+    assert cache.lookup("who wrote hamlet")[0] is None
+
+
+def test_full_cache_overwrites_the_least_recently_used_row(clock):
+    cache = SemanticCache(capacity=2)
+    cache.add("how tall is mount everest", "8849 m.", ttl=600)
+    clock.advance(1)
+    cache.add("how deep is the mariana trench", "About 11 km.", ttl=600)
+    clock.advance(1)
+    assert cache.lookup("how tall is mount everest")[0] == "8849 m."
+
+    clock.advance(1)
+    cache.add("how long is the river nile", "About 6650 km.", ttl=600)
+    assert cache.stats["evictions"] == 1
+    assert cache.lookup("how deep is the mariana trench")[0] is None
+    assert cache.lookup("how tall is mount everest")[0] == "8849 m."
+    assert cache.lookup("how long is the river nile")[0] == "About 6650 km."
+
+
+def test_nothing_is_stored_without_an_answer_or_ttl():
+    cache = SemanticCache(capacity=4)
+    cache.add("what time is it", "Noon.", ttl=0)
+    cache.add("what day is it", "", ttl=60)
+    assert cache.size == 0
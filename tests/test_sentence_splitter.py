@@ -0,0 +1,64 @@
+import pytest
+
+from edi_llm import SentenceSplitter
+
+from tests.conftest import FakeLLM
+
+
+ANSWER = ("Dr. Rao discovered the comet in 1998. It returns every 76 years! "
+          "Would you like to know more? The next pass is in 2074.")
+
+
+def split(text, size):
+    splitter = SentenceSplitter()
+    sentences = []
+    for i in range(0, len(text), size):
+        sentences.extend(splitter.feed(text[i:i + size]))
+    return sentences + splitter.flush()
+
+
+def test_sentences_are_released_as_soon_as_they_end():
+    splitter = SentenceSplitter()
+    assert splitter.feed("The comet is bright tonight.") == []
+    assert splitter.feed(" Look to the") == ["The comet is bright tonight."]
+    assert splitter.feed(" east.") == []
+    assert splitter.flush() == ["Look to the east."]
+    assert splitter.flush() == []
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(ANSWER)])
+def test_chunking_never_changes_the_sentences(size):
+    assert split(ANSWER, size) == [
+        "Dr. Rao discovered the comet in 1998.",
+        "It returns every 76 years!",
+        "Would you like to know more?",
+        "The next pass is in 2074.",
+    ]
+
+
+def test_short_fragments_and_abbreviations_stay_attached():
+    assert split("Yes. Mr. Smith lives on Baker St. in London. OK.", 4) == [
+        "Yes. Mr. Smith lives on Baker St. in London.",
+        "OK.",
+    ]
+
+
+def test_hindi_danda_ends_a_sentence():
+    assert split("मौसम आज साफ रहेगा। शाम को हल्की हवा चलेगी।", 2) == [
+        "मौसम आज साफ रहेगा।",
+        "शाम को हल्की हवा चलेगी।",
+    ]
+
+
+def test_streamed_answer_matches_the_blocking_answer(assistant):
+    assistant.cache = None
+    assistant.llm = FakeLLM(ANSWER)
+
+    streamed = list(assistant.stream_ai_response("tell me about the comet"))
+    blocking = assistant.get_ai_response("tell me about the comet")
+
+    assert " ".join(streamed) == blocking == ANSWER
+    assert len(streamed) == 4
+    (_, stream_request), (_, blocking_request) = assistant.llm.calls
+    assert stream_request.pop("stream") is True
+    assert stream_request == blocking_request
@@ -0,0 +1,43 @@
+import threading
+
+from edi_core import Tracer
+from edi_llm import estimate_tokens
+
+from tests.conftest import FakeLLM
+
+
+QUESTION = "how far away is the moon"
+ANSWER = "About 384,400 kilometres on average. Light covers it in just over a second."
+
+
+def test_used_speculation_yields_the_whole_answer(assistant):
+    assistant.llm = FakeLLM(ANSWER)
+
+    with Tracer.turn() as trace:
+        speculation = assistant.speculate_answer(QUESTION)
+        saved_ms = speculation.use()
+        sentences = list(speculation)
+
+    assert " ".join(sentences) == ANSWER
+    assert saved_ms >= 0
+    assert "speculation.saved" in trace.stage_ms
+    assert trace.attrs["speculation"] == "used"
+    assert assistant.cache.get(assistant.cache.key("answer", QUESTION, "en")) == ANSWER
+
+
+def test_discarded_speculation_closes_the_stream_and_caches_nothing(assistant):
+    gate = threading.Event()
+    assistant.llm = FakeLLM(ANSWER, gate=gate)
+
+    with Tracer.turn() as trace:
+        speculation = assistant.speculate_answer(QUESTION)
+        wasted = speculation.discard()
+        gate.set()
+        leftovers = list(speculation)
+
+    assert " ".join(leftovers) != ANSWER
+    assert assistant.llm.streams[0].closed
+    assert wasted >= estimate_tokens(speculation.prompt)
+    assert trace.attrs["speculation"] == "discarded"
+    assert trace.attrs["speculation_wasted_tokens"] == wasted
+    assert assistant.cache.get(assistant.cache.key("answer", QUESTION, "en")) is None
@@ -0,0 +1,140 @@
+import json
+import struct
+import wave
+
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+import edi_speech
+import speech_recognition as sr
+from edi_core import Config
+from edi_speech import FileAudioSource, STTEngine, VoskBackend
+
+
+def record(directory, name, transcript, seconds=0.6, channels=1, rate=16000):
+    directory.mkdir(exist_ok=True)
+    frames = [(1500 if i % 40 < 20 else -1500) for i in range(int(seconds * rate))]
+    with wave.open(str(directory / f"{name}.wav"), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"".join(struct.pack("<h", value) * channels for value in frames))
+    if transcript is not None:
+        (directory / f"{name}.txt").write_text(transcript, encoding="utf-8")
+
+
+@pytest.fixture
+def file_stt(monkeypatch):
+    """Build an STTEngine on the file backend once the recordings exist"""
+    monkeypatch.setattr(Config, "STT_BACKEND", "file")
+    engines = []
+
+    def build():
+        engines.append(STTEngine())
+        return engines[-1]
+
+    yield build
+    for stt in engines:
+        stt.close()
+
+
+def test_file_backend_replays_recordings_in_order_with_partials(file_stt):
+    record(Config.STT_FILE_DIR, "01", "open the downloads folder")
+    record(Config.STT_FILE_DIR, "02", "what is the weather in pune")
+    stt = file_stt()
+    partials = []
+    stt.partial_listeners.append(partials.append)
+
+    assert stt.listen() == ("open the downloads folder", "en")
+    assert partials[-1] == "open the downloads folder"
+    assert all("open the downloads folder".startswith(partial) for partial in partials)
+    assert len(partials) > 1
+    assert stt.listen() == ("what is the weather in pune", "en")
+    assert stt.listen() == ("", "en")
+
+
+def test_recording_without_a_transcript_is_not_understood(file_stt):
+    record(Config.STT_FILE_DIR, "01", None)
+
+    assert file_stt().listen() == ("", "en")
+
+
+def test_stereo_recordings_are_downmixed_to_mono(tmp_path):
+    record(tmp_path, "stereo", "hello", seconds=0.3, channels=2, rate=8000)
+    source = FileAudioSource(tmp_path)
+
+    audio = source.capture(5, 5, 0.5)
+    assert audio.sample_width == 2
+    assert audio.sample_rate == 8000
+    assert len(audio.frame_data) == int(0.3 * 8000) * 2
+    assert struct.unpack_from("<h", audio.frame_data)[0] == 1500
+
+
+class FakeKaldi:
+    """Finalizes a segment every few chunks and reports partials in between"""
+    def __init__(self, model, rate):
+        self.words = list(model.words)
+        self.fed = 0
+        self.segment = []
+
+    def AcceptWaveform(self, chunk):
+        self.fed += 1
+        if self.words:
+            self.segment.append(self.words.pop(0))
+        return self.fed % 3 == 0
+
+    def Result(self):
+        text, self.segment = " ".join(self.segment), []
+        return json.dumps({"text": text})
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.segment)})
+
+    def FinalResult(self):
+        self.segment, self.words = self.segment + self.words, []
+        return self.Result()
+
+
+@pytest.fixture
+def vosk(monkeypatch):
+    class FakeVosk:
+        KaldiRecognizer = FakeKaldi
+
+        @staticmethod
+        def SetLogLevel(level):
+            pass
+
+        @staticmethod
+        def Model(path):
+            return type("Model", (), {"words": "turn the volume down a little".split()})
+
+    monkeypatch.setattr(edi_speech, "vosk", FakeVosk, raising=False)
+
+
+def test_vosk_stream_grows_partials_across_finalized_segments(vosk):
+    backend = VoskBackend("model")
+    stream = backend.open_stream(16000, 2)
+
+    partials = [stream.feed(b"\0\0" * 160) for _ in range(5)]
+    assert partials == [
+        "turn", "turn the", "turn the volume", "turn the volume down", "turn the volume down a",
+    ]
+    assert stream.finish() == "turn the volume down a little"
+
+
+def test_vosk_silence_is_not_understood(vosk, monkeypatch):
+    monkeypatch.setattr(FakeKaldi, "AcceptWaveform", lambda self, chunk: False)
+    stream = VoskBackend("model").open_stream(16000, 2)
+    stream.kaldi.words = []
+
+    assert stream.feed(b"\0\0" * 160) is None
+    with pytest.raises(sr.UnknownValueError):
+        stream.finish()
+
+
+def test_vosk_falls_back_to_buffering_for_non_16_bit_audio(vosk):
+    stream = VoskBackend("model").open_stream(16000, 1)
+
+    assert not isinstance(stream, edi_speech.VoskStream)
+    assert stream.feed(b"\0" * 160) is None
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from edi_core import Config, Tracer, load_trace_records, percentile, trace_report
+
+
+@pytest.fixture
+def records(monkeypatch):
+    """Trace into this test's directory; call the result to flush and read the records"""
+    monkeypatch.setattr(Tracer, "_writer", None)
+
+    def read():
+        Tracer.shutdown()
+        return load_trace_records()
+
+    yield read
+    Tracer.shutdown()
+
+
+def test_nested_spans_join_their_turn(records):
+    with Tracer.turn(source="mic") as trace:
+        with Tracer.span("stt"):
+            pass
+        with Tracer.span("intent"):
+            with Tracer.span("intent.llm"):
+                pass
+        Tracer.annotate(intent="weather")
+        Tracer.count("llm_round_trips")
+        Tracer.count("llm_round_trips")
+
+    spans = {r["name"]: r for r in records() if r["type"] == "span"}
+    assert set(spans) == {"stt", "intent", "intent.llm"}
+    assert spans["intent.llm"]["parent_id"] == spans["intent"]["span_id"]
+    assert spans["stt"]["parent_id"] is None
+    assert set(trace.stage_ms) == set(spans)
+    assert trace.attrs == {"source": "mic", "intent": "weather", "llm_round_trips": 2}
+    assert Tracer.current() is None
+
+
+def test_worker_threads_report_into_the_activated_turn(records):
+    with Tracer.turn() as trace:
+        def work():
+            with Tracer.activate(trace):
+                with Tracer.span("tts.render"):
+                    pass
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+
+    spans = [r for r in records() if r["type"] == "span"]
+    assert [(s["name"], s["trace_id"]) for s in spans] == [("tts.render", trace.trace_id)]
+
+
+def test_spans_outside_a_turn_and_disabled_tracing_write_nothing(records, monkeypatch):
+    with Tracer.span("orphan") as attrs:
+        assert attrs is None
+    monkeypatch.setattr(Config, "TRACING_ENABLED", False)
+    assert Tracer.begin_turn() is None
+    assert records() == []
+
+
+def test_failed_span_records_the_error(records):
+    with pytest.raises(KeyError):
+        with Tracer.turn():
+            with Tracer.span("handler"):
+                raise KeyError("missing")
+
+    span = next(r for r in records() if r["type"] == "span")
+    assert span["attrs"]["error"] == "KeyError"
+
+
+def test_report_summarizes_stages_and_intents(records):
+    for intent in ("time", "time", "weather"):
+        with Tracer.turn():
+            with Tracer.span("stt"):
+                pass
+            Tracer.annotate(intent=intent, intent_source="local")
+    records()
+
+    report = trace_report()
+    assert "stt" in report
+    assert "weather" in report
+    assert "local 3" in report
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pyttsx3")
+
+import edi_speech
+from edi_core import Config
+from edi_speech import TTSEngine
+
+
+class FakeEngine:
+    """pyttsx3 stand-in; runAndWait blocks until released or stopped"""
+    def __init__(self):
+        self.properties = {"voices": []}
+        self.spoken = []
+        self.released = threading.Event()
+        self.stops = 0
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def runAndWait(self):
+        self.released.wait(5)
+
+    def stop(self):
+        self.stops += 1
+        self.released.set()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def tts(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(Config, "AUDIO_CACHE_ENABLED", False)
+    monkeypatch.setattr(edi_speech.pyttsx3, "init", lambda *args: engine)
+    tts = TTSEngine()
+    yield tts
+    engine.released.set()
+    tts.close()
+
+
+def test_urgent_speech_jumps_the_queue(tts):
+    first = tts.speak_async("Reading your messages")
+    wait_for(lambda: tts.is_speaking)
+    later = [
+        tts.speak_async("Background tip", TTSEngine.PRIORITY_BACKGROUND),
+        tts.speak_async("Second message"),
+        tts.speak_async("Battery low", TTSEngine.PRIORITY_URGENT),
+        tts.speak_async("Third message"),
+    ]
+    tts.engine.released.set()
+
+    assert all(handle.wait(5) for handle in [first] + later)
+    assert tts.engine.spoken == [
+        "Reading your messages", "Battery low", "Second message", "Third message", "Background tip",
+    ]
+
+
+def test_barge_in_stops_current_speech_and_drops_the_queue(tts):
+    current = tts.speak_async("A very long answer")
+    wait_for(lambda: tts.is_speaking)
+    queued = [tts.speak_async("More of it"), tts.speak_async("And more")]
+
+    tts.barge_in()
+
+    assert current.wait(5) is False
+    assert all(handle.wait(5) is False for handle in queued)
+    assert tts.engine.stops == 1
+    assert tts.engine.spoken == ["A very long answer"]
+    assert tts.speak("Yes?") is True
+    assert tts.engine.spoken[-1] == "Yes?"
+
+
+def test_barge_in_while_idle_is_harmless(tts):
+    tts.barge_in()
+
+    assert tts.engine.stops == 0
+    tts.engine.released.set()
+    assert tts.speak("Still here") is True
+
+
+def test_on_speak_sees_text_as_it_is_queued(tts):
+    shown = []
+    tts.on_speak = shown.append
+    tts.engine.released.set()
+
+    tts.speak("Hello")
+    assert shown == ["Hello"]
+    assert not tts.is_speaking